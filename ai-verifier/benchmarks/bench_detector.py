@@ -0,0 +1,291 @@
+"""
+Per-layer micro-benchmarks for the anomaly detector.
+
+Times result validation, each detector layer and the full verify path on
+synthetic results (training/fetch_data.py generators), over a range of
+batch and peer-list sizes:
+
+    validate_result_structure   one result
+    _check_statistical_bounds   one result;  _score_statistical_bounds per batch
+    _check_isolation_forest     one result;  _score_isolation_forest per batch
+    _check_consistency          one result against N peers
+    _verify_fitness_result      one fitness_verify result
+    verify                      one result with N peers
+    verify_many                 a batch (all task types mixed) with N peers each
+
+Each case is run like timeit: calls are looped until one sample takes
+~MIN_SAMPLE_S, then REPEATS samples are taken and the median per call is
+reported. Results are written as JSON (benchmarks/results/ by default);
+pass --baseline with an earlier file to flag cases whose median got more
+than --threshold slower.
+
+Runs offline. Trained artifacts in models/trained/ are used if present;
+otherwise (or with --model bootstrap) a model per task type is trained on
+synthetic data into a temporary directory, with config default bounds.
+
+Usage:
+    python benchmarks/bench_detector.py
+    python benchmarks/bench_detector.py --quick --model bootstrap
+    python benchmarks/bench_detector.py --baseline benchmarks/results/<earlier>.json --fail-on-regression
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import IsolationForest
+
+from benchmarks.workload import fitness_result, peer_results, samples_by_type
+from config import CONTAMINATION, ML_SCORER, MODEL_DIR, N_ESTIMATORS, STAT_BOUNDS
+from models.anomaly_detector import AnomalyDetector
+from models.features import feature_matrix
+from models.model_registry import ModelRegistry, model_path_for, publish_model
+from models.result_validator import validate_result_structure
+from models.stat_bounds import StatBounds
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+BATCH_SIZES = [1, 16, 64, 256, 1024]
+PEER_SIZES = [0, 1, 5, 20, 100]
+MIN_SAMPLE_S = 0.01
+REPEATS = 7
+
+
+def bootstrap_detector(model: str = "auto") -> tuple[AnomalyDetector, str, tempfile.TemporaryDirectory | None]:
+    """
+    Detector scoring with trained artifacts, or with models bootstrapped
+    from synthetic data. Returns (detector, model source, temp dir to keep
+    alive while the detector is in use).
+    """
+    registry = ModelRegistry()
+    if model != "bootstrap" and registry.has_any_model():
+        return AnomalyDetector(models=registry), "trained", None
+    if model == "trained":
+        raise SystemExit(f"No trained model artifacts in {MODEL_DIR}")
+
+    tmp = tempfile.TemporaryDirectory(prefix="bench-models-")
+    for task_type, samples in samples_by_type(seed=42).items():
+        matrix = feature_matrix(
+            task_type, [s["result"] for s in samples], [s["compute_time_ms"] for s in samples],
+        )
+        forest = IsolationForest(
+            n_estimators=N_ESTIMATORS, contamination=CONTAMINATION, random_state=42,
+        ).fit(matrix.X)
+        publish_model(forest, model_path_for(task_type, tmp.name))
+
+    detector = AnomalyDetector(
+        models=ModelRegistry(model_dir=tmp.name, fallback_path=None),
+        bounds=StatBounds(STAT_BOUNDS),
+    )
+    return detector, "bootstrap", tmp
+
+
+def time_call(fn: Callable[[], Any], min_sample_s: float = MIN_SAMPLE_S, repeats: int = REPEATS) -> dict[str, Any]:
+    """Median and spread of per-call time in microseconds."""
+    fn()  # Warm up (lazy model loads, plan compilation)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_sample_s:
+            break
+        number *= 2
+
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": round(statistics.median(samples), 3),
+        "min_us": round(min(samples), 3),
+        "max_us": round(max(samples), 3),
+        "calls": number * repeats,
+    }
+
+
+def run_cases(
+    detector: AnomalyDetector,
+    batch_sizes: list[int],
+    peer_sizes: list[int],
+    min_sample_s: float = MIN_SAMPLE_S,
+) -> list[dict[str, Any]]:
+    """Time every case; one result dict per (name, task_type, batch, peers)."""
+    rng = random.Random(0)
+    grouped = samples_by_type(per_type=max(batch_sizes), seed=0)
+    results = []
+
+    def case(name: str, task_type: str, fn: Callable[[], Any], batch: int = 1, peers: int = 0):
+        timing = time_call(fn, min_sample_s)
+        results.append({
+            "name": name,
+            "task_type": task_type,
+            "batch": batch,
+            "peers": peers,
+            **timing,
+            "per_item_us": round(timing["median_us"] / batch, 3),
+        })
+        print(
+            f"{name:<28} {task_type:<14} batch={batch:<5} peers={peers:<4} "
+            f"{timing['median_us']:>11.1f} µs  ({results[-1]['per_item_us']:.1f} µs/item)"
+        )
+
+    for task_type, samples in grouped.items():
+        s = samples[0]
+        result, compute_time = s["result"], s["compute_time_ms"]
+
+        case("validate_result_structure", task_type, lambda: validate_result_structure(task_type, result))
+        case("_check_statistical_bounds", task_type,
+             lambda: detector._check_statistical_bounds(task_type, result, compute_time, []))
+        case("_check_isolation_forest", task_type,
+             lambda: detector._check_isolation_forest(task_type, result, compute_time, []))
+
+        for batch in batch_sizes:
+            results_batch = [x["result"] for x in samples[:batch]]
+            times = np.array([x["compute_time_ms"] for x in samples[:batch]], dtype=np.float64)
+            case("_score_statistical_bounds", task_type,
+                 lambda: detector._score_statistical_bounds(task_type, results_batch, times, [[] for _ in times]),
+                 batch=batch)
+            case("_score_isolation_forest", task_type,
+                 lambda: detector._score_isolation_forest(task_type, results_batch, times, [[] for _ in times]),
+                 batch=batch)
+
+        for n_peers in peer_sizes:
+            peers = peer_results(result, n_peers, rng)
+            case("_check_consistency", task_type,
+                 lambda: detector._check_consistency(result, peers, []), peers=n_peers)
+            case("verify", task_type,
+                 lambda: detector.verify(task_type, result, compute_time, peers), peers=n_peers)
+
+    fitness = fitness_result(rng)
+    case("validate_result_structure", "fitness_verify",
+         lambda: validate_result_structure("fitness_verify", fitness))
+    case("_verify_fitness_result", "fitness_verify", lambda: detector._verify_fitness_result(fitness, []))
+
+    # Mixed batches as /verify/batch sees them
+    mixed = [s for samples in grouped.values() for s in samples]
+    rng.shuffle(mixed)
+    for n_peers in peer_sizes:
+        for batch in batch_sizes:
+            items = [
+                {**s, "peer_results": peer_results(s["result"], n_peers, rng)}
+                for s in mixed[:batch]
+            ]
+            case("verify_many", "mixed", lambda: detector.verify_many(items), batch=batch, peers=n_peers)
+
+    return results
+
+
+def compare(results: list[dict[str, Any]], baseline: dict[str, Any], threshold: float) -> list[dict[str, Any]]:
+    """Annotate results with the baseline median and flag regressions. Returns the regressions."""
+    def key(r: dict[str, Any]) -> tuple:
+        return r["name"], r["task_type"], r["batch"], r["peers"]
+
+    previous = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = previous.get(key(r))
+        if before is None:
+            continue
+        change = r["median_us"] / before["median_us"] - 1 if before["median_us"] else 0.0
+        r["baseline_us"] = before["median_us"]
+        r["change"] = round(change, 4)
+        # A slower median that is also slower than the baseline's slowest sample
+        r["regression"] = change > threshold and r["median_us"] > before["max_us"]
+        if r["regression"]:
+            regressions.append(r)
+    return regressions
+
+
+def environment(detector: AnomalyDetector, model_source: str) -> dict[str, Any]:
+    """Where and against what the benchmark ran, for comparing result files."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ml_scorer": ML_SCORER,
+        "model_source": model_source,
+        "model_versions": detector.models.versions(),
+        "bounds_version": detector.bounds.version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-layer anomaly detector micro-benchmarks")
+    parser.add_argument("--model", choices=["auto", "trained", "bootstrap"], default="auto",
+                        help="auto: trained artifacts if present, else bootstrap from synthetic data")
+    parser.add_argument("--batch-sizes", default=",".join(map(str, BATCH_SIZES)))
+    parser.add_argument("--peer-sizes", default=",".join(map(str, PEER_SIZES)))
+    parser.add_argument("--quick", action="store_true", help="Fewer sizes and shorter samples")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/bench_detector-<time>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any regression is flagged")
+    args = parser.parse_args()
+
+    batch_sizes = [int(n) for n in args.batch_sizes.split(",")]
+    peer_sizes = [int(n) for n in args.peer_sizes.split(",")]
+    min_sample_s = MIN_SAMPLE_S
+    if args.quick:
+        batch_sizes, peer_sizes, min_sample_s = [1, 64], [0, 5], MIN_SAMPLE_S / 5
+
+    detector, model_source, tmp = bootstrap_detector(args.model)
+    print(f"Model: {model_source} ({ML_SCORER} scorer)\n")
+    results = run_cases(detector, batch_sizes, peer_sizes, min_sample_s)
+    report = {"environment": environment(detector, model_source), "results": results}
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        report["baseline"] = {"path": args.baseline, "environment": baseline.get("environment")}
+        report["regressions"] = len(regressions)
+        if baseline.get("environment", {}).get("model_versions") != report["environment"]["model_versions"]:
+            print("\nNote: baseline was run against different model versions")
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} vs {args.baseline}")
+        for r in regressions:
+            print(f"  {r['name']} {r['task_type']} batch={r['batch']} peers={r['peers']}: "
+                  f"{r['baseline_us']:.1f} → {r['median_us']:.1f} µs ({r['change']:+.0%})")
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_detector-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if tmp is not None:
+        tmp.cleanup()
+    if args.fail_on_regression and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+End-to-end load generator for the verification service.
+
+Starts `uvicorn main:app` locally for each worker count (or targets a
+running server with --url) and sends /verify requests open-loop: request i
+is due at start + i / rate whether or not earlier ones have returned, and
+its latency is measured from when it was due. Slow responses therefore
+show up as latency instead of quietly lowering the offered load.
+
+The request mix is configurable: task types (weighted), peer-list sizes and
+a share of malformed payloads (missing fields, wrong types, unknown task
+types, invalid JSON). fitness_verify is left out, since the website checks
+it without calling /verify. Malformed requests count as correct when
+rejected with 400/422. Everything else (5xx, other statuses, timeouts,
+connection errors) counts as an error.
+
+Each stage reports throughput, p50/p95/p99 latency and error rate. With a
+ramp, the saturation point per worker count is the highest offered rate
+whose p99 stays under --slo-ms (default 5000, the AbortSignal.timeout the
+website's /api/mine/submit route gives the verifier) with an error rate
+under --max-error-rate and at least 90% of the offered rate achieved.
+The client timeout is the SLO too, as on the website.
+
+If no model is trained yet, one is bootstrapped from synthetic data first
+(training/retrain.py), so the ML layer is part of what is measured.
+
+Usage:
+    python benchmarks/load_test.py --workers 1,2,4 --ramp 50:800:50 --step-s 10
+    python benchmarks/load_test.py --rate 200 --duration 30 --malformed 0.05
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --rate 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+from benchmarks.workload import malformed_request, samples_by_type, verify_request
+from models.model_registry import ModelRegistry
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_MIX = "protein=1,climate=1,signal=1,drugscreen=1"
+PAYLOAD_POOL = 2000
+SATURATION_THROUGHPUT = 0.9  # Achieved / offered rate below this = saturated
+
+
+def build_payloads(
+    mix: dict[str, float],
+    peer_sizes: list[int],
+    malformed: float,
+    n: int = PAYLOAD_POOL,
+    seed: int = 0,
+) -> list[tuple[bool, bytes]]:
+    """Pre-encoded (malformed, body) pairs, so the client spends no time building them."""
+    rng = random.Random(seed)
+    grouped = samples_by_type(per_type=n // max(1, len(mix)) + 1, seed=seed)
+    task_types, weights = zip(*mix.items())
+
+    payloads = []
+    for _ in range(n):
+        sample = rng.choice(grouped[rng.choices(task_types, weights)[0]])
+
+        if rng.random() < malformed:
+            body = malformed_request(sample, rng)
+            payloads.append((True, body if isinstance(body, bytes) else json.dumps(body).encode()))
+        else:
+            body = verify_request(sample, rng.choice(peer_sizes), rng)
+            payloads.append((False, json.dumps(body).encode()))
+    return payloads
+
+
+async def run_stage(
+    client: httpx.AsyncClient,
+    url: str,
+    payloads: list[tuple[bool, bytes]],
+    rate: float,
+    duration_s: float,
+    timeout_s: float,
+) -> dict[str, Any]:
+    """Offer `rate` requests/s for `duration_s` and summarize the responses."""
+    loop = asyncio.get_running_loop()
+
+    async def send(malformed: bool, body: bytes, due: float) -> tuple[str, float]:
+        try:
+            response = await client.post(
+                url, content=body, headers={"Content-Type": "application/json"}, timeout=timeout_s,
+            )
+            if malformed:
+                outcome = "rejected" if response.status_code in (400, 422) else f"status_{response.status_code}"
+            else:
+                outcome = "ok" if response.status_code == 200 else f"status_{response.status_code}"
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        return outcome, loop.time() - due
+
+    n = max(1, int(rate * duration_s))
+    start = loop.time() + 0.01
+    tasks = []
+    for i in range(n):
+        due = start + i / rate
+        delay = due - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        malformed, body = payloads[i % len(payloads)]
+        tasks.append(asyncio.create_task(send(malformed, body, due)))
+    responses = await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    outcomes: dict[str, int] = {}
+    for outcome, _ in responses:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    errors = sum(count for outcome, count in outcomes.items() if outcome not in ("ok", "rejected"))
+    latencies = np.array([latency for _, latency in responses]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "offered_rps": rate,
+        "achieved_rps": round(n / elapsed, 2),
+        "requests": n,
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(latencies.max()), 2),
+        "error_rate": round(errors / n, 4),
+        "outcomes": outcomes,
+    }
+
+
+async def run_load(
+    base_url: str,
+    payloads: list[tuple[bool, bytes]],
+    rates: list[float],
+    step_s: float,
+    slo_ms: float,
+    max_error_rate: float,
+    connections: int,
+    warmup_s: float,
+) -> dict[str, Any]:
+    """Run the stages against one server; stop one stage after the SLO is broken."""
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    url = f"{base_url}/verify"
+    stages = []
+    async with httpx.AsyncClient(limits=limits) as client:
+        if warmup_s > 0:
+            await run_stage(client, url, payloads, min(rates), warmup_s, slo_ms / 1000)
+        for rate in rates:
+            stage = await run_stage(client, url, payloads, rate, step_s, slo_ms / 1000)
+            stage["within_slo"] = (
+                stage["p99_ms"] <= slo_ms
+                and stage["error_rate"] <= max_error_rate
+                and stage["achieved_rps"] >= SATURATION_THROUGHPUT * rate
+            )
+            stages.append(stage)
+            print(
+                f"  {rate:>7.0f} rps offered  {stage['achieved_rps']:>8.1f} achieved  "
+                f"p50 {stage['p50_ms']:>8.1f}  p95 {stage['p95_ms']:>8.1f}  p99 {stage['p99_ms']:>8.1f} ms  "
+                f"errors {stage['error_rate']:.2%}{'' if stage['within_slo'] else '  (over SLO)'}"
+            )
+            if not stage["within_slo"] and len(rates) > 1:
+                break
+
+    passing = [s for s in stages if s["within_slo"]]
+    return {
+        "stages": stages,
+        "saturation_rps": max((s["achieved_rps"] for s in passing), default=None),
+    }
+
+
+class LocalServer:
+    """uvicorn main:app with N workers on a free local port."""
+
+    def __init__(self, workers: int, env: dict[str, str] | None = None):
+        self.workers = workers
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **(env or {})}
+        self.process: subprocess.Popen | None = None
+
+    def __enter__(self) -> "LocalServer":
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--host", "127.0.0.1", "--port", str(self.port),
+                "--workers", str(self.workers), "--log-level", "warning",
+            ],
+            cwd=SERVICE_DIR,
+            env=self.env,
+        )
+        self._wait_ready()
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def _wait_ready(self, timeout_s: float = 60):
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {self.process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"uvicorn did not become ready within {timeout_s}s")
+
+
+def ensure_model():
+    """Bootstrap a model from synthetic data if none is trained, like the service would."""
+    if ModelRegistry().has_any_model():
+        return
+    print("No trained model; bootstrapping one from synthetic data...")
+    from training.retrain import retrain
+    retrain(fetch=False)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """"protein=1,climate=0.5" -> {"protein": 1.0, "climate": 0.5}"""
+    mix = {}
+    for part in value.split(","):
+        task_type, _, weight = part.partition("=")
+        mix[task_type.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_rates(args: argparse.Namespace) -> list[float]:
+    """Offered rates per stage: --ramp start:stop:step, or the single --rate."""
+    if not args.ramp:
+        return [args.rate]
+    start, stop, step = (float(x) for x in args.ramp.split(":"))
+    return [float(r) for r in np.arange(start, stop + step / 2, step)]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop /verify load generator")
+    parser.add_argument("--url", help="Target a running server instead of starting uvicorn")
+    parser.add_argument("--workers", default="1", help="Comma-separated uvicorn worker counts")
+    parser.add_argument("--rate", type=float, default=100, help="Requests/s (fixed-rate mode)")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds at --rate")
+    parser.add_argument("--ramp", help="start:stop:step requests/s, --step-s seconds each")
+    parser.add_argument("--step-s", type=float, default=10)
+    parser.add_argument("--warmup-s", type=float, default=2)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="task_type=weight,...")
+    parser.add_argument("--peers", default="0,1,5,20", help="Peer-list sizes, picked uniformly")
+    parser.add_argument("--malformed", type=float, default=0.02, help="Share of malformed payloads")
+    parser.add_argument("--slo-ms", type=float, default=5000, help="p99 target and client timeout")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--connections", type=int, default=256, help="Client connection pool size")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE for the server (repeatable)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load_test-<time>.json)")
+    args = parser.parse_args()
+
+    rates = parse_rates(args)
+    step_s = args.step_s if args.ramp else args.duration
+    payloads = build_payloads(parse_mix(args.mix), [int(n) for n in args.peers.split(",")], args.malformed)
+
+    def load(base_url: str) -> dict[str, Any]:
+        return asyncio.run(run_load(
+            base_url, payloads, rates, step_s, args.slo_ms, args.max_error_rate,
+            args.connections, args.warmup_s,
+        ))
+
+    runs = {}
+    if args.url:
+        print(f"Target {args.url}")
+        runs["external"] = load(args.url.rstrip("/"))
+    else:
+        ensure_model()
+        # Training in the background would compete with the load for CPU
+        env = {"AI_VERIFIER_RETRAIN_BOOTSTRAP": "false", "AI_VERIFIER_RETRAIN_INTERVAL_S": "0"}
+        env.update(kv.split("=", 1) for kv in args.env)
+        for workers in (int(n) for n in args.workers.split(",")):
+            print(f"{workers} worker(s)")
+            with LocalServer(workers, env) as server:
+                runs[str(workers)] = load(server.url)
+
+    print("\nSaturation point (p99 within SLO):")
+    for workers, run in runs.items():
+        saturation = run["saturation_rps"]
+        print(f"  workers={workers}: {f'{saturation:.0f} rps' if saturation else 'not reached at lowest rate'}")
+
+    report = {
+        "environment": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "cpu_count": os.cpu_count(),
+            "server_env": {k: v for k, v in os.environ.items() if k.startswith("AI_VERIFIER_")},
+        },
+        "config": {
+            "rates": rates, "step_s": step_s, "mix": parse_mix(args.mix), "peers": args.peers,
+            "malformed": args.malformed, "slo_ms": args.slo_ms,
+            "max_error_rate": args.max_error_rate, "connections": args.connections,
+        },
+        "runs": runs,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load_test-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
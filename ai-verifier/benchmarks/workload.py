@@ -0,0 +1,84 @@
+"""
+Synthetic verification workloads for the benchmarks.
+
+Results come from the same generator that bootstraps training
+(training/fetch_data.py), so benchmarks exercise realistic field sets.
+Peer results are perturbed copies of a result, like honest nodes
+recomputing the same task. Malformed requests mimic what a buggy or
+hostile miner submits; the service should reject them with 400/422.
+"""
+
+import random
+from typing import Any
+
+from training.fetch_data import generate_synthetic_data
+
+# Fields the service's result schemas require but the training generator omits
+REQUEST_FIELDS = {
+    "climate": lambda rng: {"gridSize": rng.choice([64, 128, 256]), "timeSteps": rng.randint(50, 500)},
+    "signal": lambda rng: {"sampleRate": 100, "duration": round(rng.uniform(50, 150), 1)},
+    "drugscreen": lambda rng: {"compoundName": rng.choice(["aspirin", "ibuprofen", "caffeine", "imatinib"])},
+}
+FITNESS_CHECKS = ["hrPlausible", "paceReasonable", "caloriesReasonable", "noTimeOverlap", "withinBaseline"]
+
+
+def samples_by_type(per_type: int = 250, seed: int = 0) -> dict[str, list[dict[str, Any]]]:
+    """Synthetic samples ({task_type, result, compute_time_ms}) with schema-valid results, by task type."""
+    rng = random.Random(seed)
+    grouped: dict[str, list[dict[str, Any]]] = {}
+    for sample in generate_synthetic_data(per_type, seed=seed):
+        extra = REQUEST_FIELDS.get(sample["task_type"])
+        if extra is not None:
+            sample["result"] = {**extra(rng), **sample["result"]}
+        grouped.setdefault(sample["task_type"], []).append(sample)
+    return grouped
+
+
+def peer_results(result: dict[str, Any], n: int, rng: random.Random, noise: float = 0.02) -> list[dict[str, Any]]:
+    """n peer results: the numeric fields of `result` with relative noise."""
+    peers = []
+    for _ in range(n):
+        peers.append({
+            key: value * (1 + rng.gauss(0, noise))
+            if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+            for key, value in result.items()
+        })
+    return peers
+
+
+def fitness_result(rng: random.Random) -> dict[str, Any]:
+    """A fitness_verify result as a verifying node submits it."""
+    checks = {name: rng.random() > 0.1 for name in rng.sample(FITNESS_CHECKS, rng.randint(2, 5))}
+    return {
+        "confidence": round(rng.uniform(0.5, 1.0), 3),
+        "verified": all(checks.values()),
+        "checks": checks,
+    }
+
+
+def verify_request(sample: dict[str, Any], n_peers: int, rng: random.Random) -> dict[str, Any]:
+    """/verify body as website/src/app/api/mine/submit/route.ts sends it."""
+    return {
+        "task_type": sample["task_type"],
+        "result": sample["result"],
+        "compute_time_ms": sample["compute_time_ms"],
+        "peer_results": peer_results(sample["result"], n_peers, rng),
+    }
+
+
+def malformed_request(sample: dict[str, Any], rng: random.Random) -> dict[str, Any] | bytes:
+    """A /verify body the service must reject (dict, or raw bytes for non-JSON)."""
+    kind = rng.choice(["missing_field", "wrong_type", "unknown_task", "not_json", "bad_compute_time"])
+    body = verify_request(sample, 0, rng)
+    if kind == "missing_field":
+        del body["compute_time_ms"]
+    elif kind == "wrong_type":
+        key = next(iter(body["result"]))
+        body["result"] = {**body["result"], key: "NaN-ish"}
+    elif kind == "unknown_task":
+        body["task_type"] = "mystery"
+    elif kind == "not_json":
+        return b'{"task_type": "protein", "result": {'
+    else:
+        body["compute_time_ms"] = "fast"
+    return body
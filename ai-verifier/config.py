@@ -9,18 +9,129 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
+# Training data fetch (keyset-paginated) and the columnar store it appends to
+TRAINING_STORE_DIR = os.getenv(
+    "AI_VERIFIER_TRAINING_STORE",
+    os.path.join(os.path.dirname(__file__), "training", "store"),
+)
+FETCH_PAGE_SIZE = int(os.getenv("AI_VERIFIER_FETCH_PAGE_SIZE", "1000"))
+FETCH_CONCURRENCY = int(os.getenv("AI_VERIFIER_FETCH_CONCURRENCY", "1"))  # Time slices fetched at once
+FETCH_SHARD_ROWS = int(os.getenv("AI_VERIFIER_FETCH_SHARD_ROWS", "100000"))
+FETCH_TIMEOUT_S = float(os.getenv("AI_VERIFIER_FETCH_TIMEOUT_S", "30"))
+# Delta fetches re-scan this far behind the checkpoint for rows verified late
+FETCH_LOOKBACK_S = float(os.getenv("AI_VERIFIER_FETCH_LOOKBACK_S", "21600"))
+
 # Server
 HOST = os.getenv("AI_VERIFIER_HOST", "0.0.0.0")
 PORT = int(os.getenv("AI_VERIFIER_PORT", "8000"))
+# Bearer token for /admin, /reload-model and POST /retrain (unset = disabled)
+ADMIN_TOKEN = os.getenv("AI_VERIFIER_ADMIN_TOKEN", "")
+BATCH_MAX_ITEMS = int(os.getenv("AI_VERIFIER_BATCH_MAX_ITEMS", "5000"))  # /verify/batch cap
+
+# Detector execution backend: "inline" | "thread" | "process"
+EXECUTOR_MODE = os.getenv("AI_VERIFIER_EXECUTOR", "thread")
+EXECUTOR_WORKERS = int(os.getenv("AI_VERIFIER_EXECUTOR_WORKERS", str(os.cpu_count() or 1)))
+EXECUTOR_MAX_CONCURRENCY = int(
+    os.getenv("AI_VERIFIER_EXECUTOR_MAX_CONCURRENCY", str(2 * EXECUTOR_WORKERS))
+)
+
+# Micro-batching of concurrent /verify calls
+MICROBATCH_ENABLED = os.getenv("AI_VERIFIER_MICROBATCH", "true").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("AI_VERIFIER_MICROBATCH_MAX_SIZE", "64"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("AI_VERIFIER_MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Admission control for /verify and the streams (0 in flight = off): past the
+# limit requests queue round-robin per device, and are shed to a
+# statistical-only verdict once their queue time would exceed the target
+ADMISSION_MAX_IN_FLIGHT = int(
+    os.getenv("AI_VERIFIER_ADMISSION_MAX_IN_FLIGHT", str(EXECUTOR_MAX_CONCURRENCY * MICROBATCH_MAX_SIZE))
+)
+ADMISSION_QUEUE_TARGET_MS = float(os.getenv("AI_VERIFIER_ADMISSION_QUEUE_TARGET_MS", "500"))
+ADMISSION_MAX_QUEUED_PER_DEVICE = int(os.getenv("AI_VERIFIER_ADMISSION_MAX_QUEUED_PER_DEVICE", "32"))
 
 # Thresholds
 CONFIDENCE_ACCEPT = 0.8    # >= this: accept result
 CONFIDENCE_REVIEW = 0.5    # >= this but < accept: flag for review
 # < CONFIDENCE_REVIEW: reject
 
+# Skip the remaining detector layers once a recommendation cannot change
+PIPELINE_EARLY_EXIT = os.getenv("AI_VERIFIER_PIPELINE_EARLY_EXIT", "true").lower() == "true"
+# Default /verify budget from arrival; layers that would overrun it are skipped
+# (the website aborts /verify after 5 s; 0 = no deadline)
+VERIFY_DEADLINE_MS = float(os.getenv("AI_VERIFIER_VERIFY_DEADLINE_MS", "4000"))
+
 # Model
-MODEL_PATH = os.path.join(os.path.dirname(__file__), "models", "trained", "model.joblib")
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "models", "trained")
+MODEL_PATH = os.path.join(MODEL_DIR, "model.joblib")  # Legacy shared model (fallback)
 CONTAMINATION = 0.05  # Expected anomaly rate for Isolation Forest
+N_ESTIMATORS = 100    # Trees per task-type forest
+# Memory-map compiled forests so worker processes share one copy of the node arrays
+MODEL_MMAP = os.getenv("AI_VERIFIER_MODEL_MMAP", "true").lower() == "true"
+# Poll model artifacts for changes and hot-swap them (0 = disabled)
+MODEL_WATCH_INTERVAL_S = float(os.getenv("AI_VERIFIER_MODEL_WATCH_INTERVAL_S", "0"))
+# "compiled": flat-array scorer (one tree walk per row); "sklearn": the joblib model as-is
+ML_SCORER = os.getenv("AI_VERIFIER_ML_SCORER", "compiled")
+
+# Background retraining: rolling window, warm-started trees (see training/retrain.py)
+RETRAIN_INTERVAL_S = float(os.getenv("AI_VERIFIER_RETRAIN_INTERVAL_S", "0"))  # 0 = API only
+RETRAIN_WINDOW_S = float(os.getenv("AI_VERIFIER_RETRAIN_WINDOW_S", str(30 * 86400)))
+RETRAIN_NEW_TREES = int(os.getenv("AI_VERIFIER_RETRAIN_NEW_TREES", "20"))     # Trees added per run
+RETRAIN_MAX_TREES = int(os.getenv("AI_VERIFIER_RETRAIN_MAX_TREES", str(N_ESTIMATORS)))  # Oldest trimmed
+RETRAIN_MIN_NEW_ROWS = int(os.getenv("AI_VERIFIER_RETRAIN_MIN_NEW_ROWS", "256"))
+RETRAIN_FETCH = os.getenv("AI_VERIFIER_RETRAIN_FETCH", "true").lower() == "true"  # Delta fetch first
+# Train in the background on startup when no model artifact exists yet
+RETRAIN_BOOTSTRAP = os.getenv("AI_VERIFIER_RETRAIN_BOOTSTRAP", "true").lower() == "true"
+RETRAIN_STATE_PATH = os.path.join(MODEL_DIR, "retrain_state.json")
+
+# Tuning sweep (train.py --tune): the smallest model meeting every target is published
+TUNE_N_ESTIMATORS = [int(n) for n in os.getenv("AI_VERIFIER_TUNE_N_ESTIMATORS", "25,50,100,200").split(",")]
+TUNE_MAX_SAMPLES = [int(n) for n in os.getenv("AI_VERIFIER_TUNE_MAX_SAMPLES", "64,128,256,512").split(",")]
+TUNE_MAX_ROW_LATENCY_MS = float(os.getenv("AI_VERIFIER_TUNE_MAX_ROW_LATENCY_MS", "1.0"))
+TUNE_MAX_BATCH_LATENCY_MS = float(os.getenv("AI_VERIFIER_TUNE_MAX_BATCH_LATENCY_MS", "5.0"))  # Per batch
+TUNE_BATCH_ROWS = int(os.getenv("AI_VERIFIER_TUNE_BATCH_ROWS", str(MICROBATCH_MAX_SIZE)))
+TUNE_MIN_AGREEMENT = float(os.getenv("AI_VERIFIER_TUNE_MIN_AGREEMENT", "0.98"))  # vs. the full model
+TUNE_REPORT_PATH = os.path.join(MODEL_DIR, "tuning_report.json")
+
+# Sampled profiling windows opened through /admin/profile/start (defaults)
+PROFILE_SAMPLE_RATE = float(os.getenv("AI_VERIFIER_PROFILE_SAMPLE_RATE", "0.01"))
+PROFILE_WINDOW_S = float(os.getenv("AI_VERIFIER_PROFILE_WINDOW_S", "60"))
+
+# /verify/stream and /verify/ws: requests scored at once per stream, and the
+# largest single message accepted
+STREAM_MAX_IN_FLIGHT = int(os.getenv("AI_VERIFIER_STREAM_MAX_IN_FLIGHT", "256"))
+STREAM_MAX_MESSAGE_BYTES = int(os.getenv("AI_VERIFIER_STREAM_MAX_MESSAGE_BYTES", str(1 << 20)))
+
+# Reference recomputes for spot checks (Layer 4): worker processes (0 = a thread
+# of the server process) and task results cached by payload hash
+REFERENCE_WORKERS = int(os.getenv("AI_VERIFIER_REFERENCE_WORKERS", "1"))
+REFERENCE_CACHE_SIZE = int(os.getenv("AI_VERIFIER_REFERENCE_CACHE_SIZE", "1024"))
+
+# Idempotent /verify verdict cache (retries and resubmissions; 0 entries disables)
+VERIFY_CACHE_SIZE = int(os.getenv("AI_VERIFIER_VERIFY_CACHE_SIZE", "50000"))
+VERIFY_CACHE_TTL_S = float(os.getenv("AI_VERIFIER_VERIFY_CACHE_TTL_S", "600"))
+
+# Server-side peer result store (running stats per task id)
+PEER_STORE_MAX_TASKS = int(os.getenv("AI_VERIFIER_PEER_STORE_MAX_TASKS", "100000"))
+PEER_STORE_TTL_S = float(os.getenv("AI_VERIFIER_PEER_STORE_TTL_S", "86400"))
+
+# Per-device history (Layer 6): ring buffers of each device's recent results in
+# one pool grown on demand (0 devices = off), optionally bulk-loaded at startup
+# from exported task_assignments rows (a JSON array or NDJSON file)
+DEVICE_PROFILES_MAX_DEVICES = int(os.getenv("AI_VERIFIER_DEVICE_PROFILES_MAX_DEVICES", "200000"))
+DEVICE_PROFILES_WINDOW = int(os.getenv("AI_VERIFIER_DEVICE_PROFILES_WINDOW", "16"))
+DEVICE_PROFILES_EXPORT = os.getenv("AI_VERIFIER_DEVICE_PROFILES_EXPORT", "")
+# Fewer recent results than this (of the task type) are not judged
+DEVICE_HISTORY_MIN_SAMPLES = int(os.getenv("AI_VERIFIER_DEVICE_HISTORY_MIN_SAMPLES", "5"))
+
+# Trained bounds written by train.py, and snapshots from the online updater
+STAT_BOUNDS_PATH = os.path.join(MODEL_DIR, "stat_bounds.json")
+STAT_BOUNDS_ONLINE_PATH = os.path.join(MODEL_DIR, "stat_bounds.online.json")
+# Trained bounds override the defaults below only with at least this many samples
+STAT_BOUNDS_MIN_SAMPLES = int(os.getenv("AI_VERIFIER_STAT_BOUNDS_MIN_SAMPLES", "500"))
+# Online refinement of bounds from accepted results
+STAT_BOUNDS_ONLINE = os.getenv("AI_VERIFIER_STAT_BOUNDS_ONLINE", "false").lower() == "true"
+STAT_BOUNDS_PRIOR_WEIGHT = float(os.getenv("AI_VERIFIER_STAT_BOUNDS_PRIOR_WEIGHT", "1000"))
+STAT_BOUNDS_SNAPSHOT_EVERY = int(os.getenv("AI_VERIFIER_STAT_BOUNDS_SNAPSHOT_EVERY", "1000"))
 
 # Statistical bounds per task type (mean, std from training data)
 # Wider bounds for real live data (variable protein sizes, grid sizes, etc.)
@@ -10,21 +10,154 @@ Run:
     uvicorn main:app --host 0.0.0.0 --port 8000
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import asyncio
+import hmac
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, Response, WebSocket
+from fastapi.websockets import WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from starlette.requests import ClientDisconnect
 import uvicorn
 
-from config import HOST, PORT
+from config import (
+    HOST, PORT, BATCH_MAX_ITEMS,
+    EXECUTOR_MODE, EXECUTOR_WORKERS, EXECUTOR_MAX_CONCURRENCY,
+    MICROBATCH_ENABLED, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS,
+    MODEL_WATCH_INTERVAL_S, STAT_BOUNDS_ONLINE, RETRAIN_INTERVAL_S, RETRAIN_BOOTSTRAP,
+    ADMIN_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_WINDOW_S, VERIFY_CACHE_SIZE, VERIFY_DEADLINE_MS,
+    STREAM_MAX_IN_FLIGHT, ADMISSION_MAX_IN_FLIGHT, ADMISSION_QUEUE_TARGET_MS,
+    ADMISSION_MAX_QUEUED_PER_DEVICE, DEVICE_PROFILES_MAX_DEVICES, DEVICE_PROFILES_EXPORT,
+)
+from models import reference_compute
 from models.anomaly_detector import AnomalyDetector
-from models.result_validator import validate_result_structure
+from models.device_profiles import DeviceProfiles
+from models.peer_store import PeerStore
+from models.pipeline import SKIP_DEADLINE, SKIP_DECIDED
+from models.stat_bounds import OnlineStatBounds
+from models.task_specs import ScanResult
+from serving import encoding
+from serving.admission import AdmissionController
+from serving.batcher import MicroBatcher
+from serving.cache import VerificationCache
+from serving.executor import DetectorExecutor
+from serving.metrics import CONTENT_TYPE, MetricsMiddleware, VerifierMetrics
+from serving.profiling import Profiler, ProfilingMiddleware
+from serving.reference import SKIP_UNAVAILABLE, ReferenceEngine
+from serving.retrainer import Retrainer
+
+detector = AnomalyDetector()
+peer_store = PeerStore()
+device_profiles = DeviceProfiles() if DEVICE_PROFILES_MAX_DEVICES > 0 else None
+online_bounds = OnlineStatBounds(detector.stat_bounds) if STAT_BOUNDS_ONLINE else None
+metrics = VerifierMetrics()
+profiler = Profiler()
+executor = DetectorExecutor(
+    detector,
+    mode=EXECUTOR_MODE,
+    workers=EXECUTOR_WORKERS,
+    max_concurrency=EXECUTOR_MAX_CONCURRENCY,
+    on_timings=metrics.observe_layers,
+    profiler=profiler,
+)
+batcher = MicroBatcher(
+    executor.verify_many,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+)
+verdict_cache = VerificationCache() if VERIFY_CACHE_SIZE > 0 else None
+admission = AdmissionController(
+    ADMISSION_MAX_IN_FLIGHT,
+    ADMISSION_QUEUE_TARGET_MS,
+    ADMISSION_MAX_QUEUED_PER_DEVICE,
+) if ADMISSION_MAX_IN_FLIGHT > 0 else None
+reference_engine = ReferenceEngine()
+metrics.watch(detector, executor, batcher, verdict_cache, admission, reference_engine)
+
+# Admission queues for stream connections that send no device id
+_stream_ids = itertools.count()
+# Fire-and-forget tasks, referenced until they finish
+_background_tasks: set[asyncio.Task] = set()
+
+
+logger = logging.getLogger("ai-verifier")
+
+
+def spawn_background(coro: Awaitable[Any], failure: str) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference and logging its failure."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+
+    def done(task: asyncio.Task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(failure, exc_info=task.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+async def watch_models(interval_s: float):
+    """Hot-swap any model artifact that changes on disk."""
+    while True:
+        await asyncio.sleep(interval_s)
+        try:
+            versions = await executor.reload_changed_models()
+            if versions:
+                logger.info("Reloaded models: %s", versions)
+                if verdict_cache is not None:
+                    verdict_cache.invalidate()
+                if online_bounds is not None:
+                    online_bounds.reset(detector.stat_bounds)
+        except Exception:
+            logger.exception("Model watcher failed")
+
+
+async def publish_retrained(task_types: list[str]):
+    """Hot-swap models a background retraining run published."""
+    for task_type in task_types:
+        await reload_models(task_type)
+
+
+retrainer = Retrainer(on_published=publish_retrained)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Seed device profiles, start the optional model watcher and retraining; shut down pools on exit."""
+    if device_profiles is not None and DEVICE_PROFILES_EXPORT:
+        loaded = await asyncio.to_thread(device_profiles.load_file, DEVICE_PROFILES_EXPORT)
+        logger.info("Loaded %d submissions of %d devices into device profiles", loaded, len(device_profiles))
+    background = []
+    if MODEL_WATCH_INTERVAL_S > 0:
+        background.append(asyncio.create_task(watch_models(MODEL_WATCH_INTERVAL_S)))
+    if RETRAIN_INTERVAL_S > 0:
+        background.append(asyncio.create_task(retrainer.schedule(RETRAIN_INTERVAL_S)))
+    if RETRAIN_BOOTSTRAP and not detector.model_loaded:
+        retrainer.start()  # Serve without the ML layer until the first model lands
+    yield
+    for task in background:
+        task.cancel()
+    retrainer.shutdown()
+    reference_engine.shutdown()
+    await batcher.close()
+    executor.shutdown()
+
 
 app = FastAPI(
     title="POH AI Verifier",
     description="Anomaly detection service for Proof of Planet mining results",
     version="1.0.0",
+    lifespan=lifespan,
 )
-
-detector = AnomalyDetector()
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
 
 
 class VerifyRequest(BaseModel):
@@ -33,6 +166,27 @@ class VerifyRequest(BaseModel):
     result: dict
     compute_time_ms: int
     peer_results: list[dict] | None = None
+    # With a task id the service keeps peer statistics itself, so callers
+    # can omit peer_results
+    task_id: str | None = None
+    # Time budget from arrival (default AI_VERIFIER_VERIFY_DEADLINE_MS);
+    # detector layers that would overrun it are skipped
+    deadline_ms: float | None = None
+    # Raw workout of a fitness_verify result (streams, sessions, history),
+    # checked server-side by the fitness layer; see FitnessEngine.check
+    workout: dict | None = None
+    # Submitting device; admission control queues fairly per device
+    # (per client address or stream connection when omitted), and the
+    # result is also scored against the device's recent history
+    device_id: str | None = None
+    # Payload of the task (signal, climate): the result is spot-checked
+    # against a server-side recomputation (Layer 4)
+    task_payload: dict | None = None
+
+
+class VerifyStreamMessage(VerifyRequest):
+    """A /verify/stream or /verify/ws message: a VerifyRequest and its correlation id."""
+    id: str | int | None = None
 
 
 class VerifyResponse(BaseModel):
@@ -41,6 +195,54 @@ class VerifyResponse(BaseModel):
     flags: list[str]
     recommendation: str  # "accept" | "review" | "reject"
     layer_scores: dict[str, float]
+    layers_run: list[str] = []
+    layers_skipped: dict[str, str] = {}  # layer -> "decided" | "deadline" | "unavailable"
+
+
+class VerifyBatchRequest(BaseModel):
+    """Request body for /verify/batch endpoint."""
+    items: list[VerifyRequest]
+
+
+class VerifyBatchResponse(BaseModel):
+    """Response body for /verify/batch endpoint."""
+    results: list[VerifyResponse]
+
+
+class FitnessCheckRequest(BaseModel):
+    """Request body for /fitness/check endpoint."""
+    workouts: list[dict]
+
+
+class FitnessCheckResult(BaseModel):
+    """One workout's checks in a /fitness/check response."""
+    score: float
+    recommendation: str  # "accept" | "review" | "reject"
+    checks: dict[str, bool]
+    flags: list[str]
+    stats: dict[str, float | None]
+
+
+class FitnessCheckResponse(BaseModel):
+    """Response body for /fitness/check endpoint."""
+    results: list[FitnessCheckResult]
+
+
+class SpotCheckRequest(BaseModel):
+    """Request body for /reference/spot-check endpoint."""
+    task_type: str
+    payload: dict
+    result: dict
+    task_id: str | None = None  # Seeds the recompute when the payload has no seed
+
+
+class SpotCheckResponse(BaseModel):
+    """Response body for /reference/spot-check endpoint."""
+    passed: bool
+    deviation: float
+    failed_fields: list[str]
+    reference_values: dict[str, float]
+    submitted_values: dict[str, float]
 
 
 class HealthResponse(BaseModel):
@@ -50,49 +252,687 @@ class HealthResponse(BaseModel):
     version: str
 
 
+def scan_request(req: VerifyRequest) -> tuple[dict, list[str]]:
+    """
+    Validate a request's result with its task plan.
+
+    Returns the detector input (carrying the scan, so the detector does not
+    walk the result again) and the structural validation errors.
+    """
+    scan = detector.plans.get(req.task_type).scan(req.result, req.compute_time_ms)
+    return detector_item(req, scan), scan.errors
+
+
+def detector_item(req: VerifyRequest, scan: ScanResult | None = None) -> dict:
+    """Detector input for a request, with its deadline and stored peer statistics if needed."""
+    item = req.model_dump()
+    budget_ms = req.deadline_ms if req.deadline_ms is not None else VERIFY_DEADLINE_MS
+    if budget_ms > 0:
+        item["deadline"] = time.monotonic() + budget_ms / 1000.0
+    if scan is not None:
+        item["scan"] = scan
+    if req.device_id and device_profiles is not None:
+        item["device_history"] = device_profiles.history(req.device_id, req.task_type)
+    if req.task_id and not req.peer_results:
+        item["peer_stats"] = peer_store.stats(req.task_id)
+        if scan is not None:
+            item["peer_consensus"] = peer_store.consensus(req.task_id, scan.fingerprint)
+    return item
+
+
+def record_verdict(req: VerifyRequest, verdict: dict, scan: ScanResult | None = None):
+    """Feed a verdict back into peer statistics, device profiles and online stat bounds."""
+    if req.task_id and verdict["recommendation"] != "reject":
+        peer_store.add(req.task_id, req.result, scan.fingerprint if scan is not None else None)
+    if req.device_id and device_profiles is not None:
+        device_profiles.record(
+            req.device_id, req.task_type, scan.features if scan is not None else None, verdict["recommendation"],
+        )
+    if online_bounds is not None and verdict["recommendation"] == "accept":
+        if online_bounds.observe(req.task_type, req.result, req.compute_time_ms):
+            spawn_background(snapshot_bounds(), "Online bounds snapshot failed")
+
+
+async def snapshot_bounds():
+    """Persist the online bounds and swap them into every detector."""
+    bounds = online_bounds.snapshot()
+    await asyncio.to_thread(online_bounds.save, bounds)
+    await executor.reload_bounds()
+    if verdict_cache is not None:
+        verdict_cache.invalidate()
+
+
+async def reload_models(task_type: str | None = None) -> dict[str, str | None]:
+    """Reload models (and stat bounds), then re-seed the online bounds."""
+    versions = await executor.reload_model(task_type)
+    if verdict_cache is not None:
+        verdict_cache.invalidate()
+    if online_bounds is not None:
+        online_bounds.reset(detector.stat_bounds)
+    return versions
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health():
     """Health check endpoint."""
     return HealthResponse(
         status="ok",
-        model_loaded=detector.model is not None,
+        model_loaded=detector.model_loaded,
         version="1.0.0",
     )
 
 
-@app.post("/verify", response_model=VerifyResponse)
-async def verify(req: VerifyRequest):
+def parse_body(model: type[BaseModel], body: bytes, content_type: str | None) -> BaseModel:
+    """
+    Validate a JSON or msgpack body into `model`, failing like FastAPI's own
+    body parsing (422, 415 for an encoding this server cannot read).
+    """
+    try:
+        if encoding.is_msgpack(content_type):
+            return model.model_validate(encoding.decode_msgpack(body))
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ])
+    except encoding.UnsupportedEncoding as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:  # Malformed msgpack
+        raise RequestValidationError([
+            {"type": "value_error", "loc": ("body",), "msg": f"Invalid msgpack body: {e}", "input": None}
+        ])
+
+
+def encoded_response(body: dict, request: Request) -> Response:
+    """Response in the encoding the caller asked for (orjson JSON by default)."""
+    media_type = encoding.response_type(request.headers.get("accept"), request.headers.get("content-type"))
+    return Response(encoding.encode(body, media_type), media_type=media_type)
+
+
+def shed_verdicts(items: list[dict]) -> list[dict]:
+    """
+    Verdicts for requests shed under load: their deadline is expired, so the
+    detector runs only the statistical layer and caps it at review. Cheap
+    enough to score right here on the event loop.
+    """
+    timings = []
+    verdicts = detector.verify_many([{**item, "deadline": -math.inf, "shed": True} for item in items], timings)
+    metrics.observe_layers(timings)
+    return verdicts
+
+
+def cache_key(req: VerifyRequest) -> bytes:
+    """Verdict cache key of a request under the current detector state."""
+    return verdict_cache.key(
+        req.task_type, req.result, req.compute_time_ms,
+        req.peer_results, req.task_id, executor.generation(req.task_type), req.workout,
+        req.task_payload, req.device_id,
+    )
+
+
+def start_spot_check(req: VerifyRequest) -> asyncio.Task | None:
+    """Start recomputing a request's task for Layer 4 (None without a supported payload)."""
+    if not req.task_payload or not reference_compute.supports(req.task_type):
+        return None
+    return asyncio.create_task(
+        reference_engine.spot_check(req.task_type, req.task_payload, req.result, req.task_id)
+    )
+
+
+async def apply_spot_check(verdict: dict, check: asyncio.Task, deadline: float | None) -> dict:
+    """
+    Merge a spot check into a detector verdict: a result that does not match
+    the reference is rejected. The check is awaited only until the request's
+    deadline; a recompute still running goes on and fills the reference
+    cache for the task's other submissions.
+    """
+    verdict = {
+        **verdict,
+        "flags": list(verdict["flags"]),
+        "layer_scores": dict(verdict["layer_scores"]),
+        "layers_run": list(verdict["layers_run"]),
+        "layers_skipped": dict(verdict["layers_skipped"]),
+    }
+    if verdict["recommendation"] != "reject":
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        await asyncio.wait((check,), timeout=timeout)
+    if not check.done():
+        check.add_done_callback(lambda t: t.cancelled() or t.exception())  # Retrieve late failures
+        reason = SKIP_DEADLINE if verdict["recommendation"] != "reject" else SKIP_DECIDED
+        verdict["layers_skipped"]["reference"] = reason
+        return verdict
+
+    try:
+        outcome = check.result()
+    except (KeyError, TypeError, ValueError) as e:  # Malformed or oversized payload
+        verdict["flags"].append(f"Reference check unavailable: {e!r}")
+        verdict["layers_skipped"]["reference"] = SKIP_UNAVAILABLE
+        return verdict
+    except Exception as e:
+        logger.exception("Reference recompute failed")
+        verdict["flags"].append(f"Reference check unavailable: {type(e).__name__}")
+        verdict["layers_skipped"]["reference"] = SKIP_UNAVAILABLE
+        return verdict
+
+    verdict["layers_run"].append("reference")
+    verdict["layer_scores"]["reference"] = 1.0 if outcome["passed"] else 0.0
+    if not outcome["passed"]:
+        verdict["flags"].append(
+            f"Reference mismatch: {', '.join(outcome['failed_fields'])} "
+            f"(max deviation {outcome['deviation']:.2%} from the server recomputation)"
+        )
+        verdict["confidence"] = 0.0
+        verdict["recommendation"] = "reject"
+    return verdict
+
+
+async def verify_one(req: VerifyRequest, client: Any = None) -> dict:
+    """
+    Validate and score one request (HTTPException 400 on a malformed result).
+
+    `client` keys the admission queue of requests without a device id.
+    """
+    # Structural validation first (the same pass extracts the features)
+    item, errors = scan_request(req)
+    if errors:
+        metrics.observe_validation_failure(req.task_type)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid result structure: {'; '.join(errors)}",
+        )
+
+    # Concurrent calls are coalesced into one verify_many call
+    detect_item = (lambda: batcher.submit(item)) if MICROBATCH_ENABLED else (lambda: executor.verify(item))
+    shed = False
+
+    async def detect() -> dict:
+        # The reference recompute (Layer 4) runs alongside Layers 1-3
+        check = start_spot_check(req)
+        verdict = await detect_item()
+        if check is None:
+            return verdict
+        return await apply_spot_check(verdict, check, item.get("deadline"))
+
+    async def score() -> dict:
+        nonlocal shed
+        if admission is None:
+            return await detect()
+        async with admission.slot(req.device_id or client) as admitted:
+            if admitted:
+                return await detect()
+        shed = True
+        return shed_verdicts([item])[0]
+
+    if verdict_cache is None:
+        result, cached = await score(), False
+    else:
+        result, cached = await verdict_cache.get_or_compute(cache_key(req), score)
+    metrics.observe_verdicts([req.task_type], [result], shed)
+    # A cached verdict answers the same device's retry, already recorded
+    if not cached:
+        record_verdict(req, result, item["scan"])
+    return result
+
+
+def _body_schema(model: type[BaseModel]) -> dict:
+    """OpenAPI request body for endpoints that parse the body themselves."""
+    schema = {"schema": model.model_json_schema()}
+    return {"requestBody": {"required": True, "content": {encoding.JSON: schema, encoding.MSGPACK: schema}}}
+
+
+@app.post("/verify", response_model=VerifyResponse, openapi_extra=_body_schema(VerifyRequest))
+async def verify(request: Request):
     """
     Verify a mining task result.
 
-    Three-layer verification:
+    Six-layer verification:
     1. Statistical bounds — flag results outside 3σ
     2. Isolation Forest — trained ML anomaly detection
     3. Cross-device consistency — compare against peer results
+    4. Reference computation — with a task_payload, signal and climate
+       results are spot-checked against a server-side recomputation of the
+       task and rejected if they do not match it
+    5. Fitness anomalies — fitness_verify results with a raw workout are
+       checked for impossible patterns in its time series
+    6. Device history — with a device_id, the result is scored against the
+       device's recent results and verdicts (consistently fast, repeated
+       values, mostly rejected); that score caps the confidence
+
+    Layers run cheapest first and stop once the recommendation is decided
+    or the request's deadline is near; the response lists which ran.
+
+    Under overload, requests queue fairly per device_id, and a request
+    that would wait too long gets a statistical-only verdict (at best
+    review) at once instead; /stats/admission reports the shedding.
+
+    The body is JSON or msgpack (Content-Type); the response is JSON, or
+    msgpack if Accept (or the request's own encoding) asks for it.
+    """
+    req = parse_body(VerifyRequest, await request.body(), request.headers.get("content-type"))
+    client = request.client.host if request.client else None
+    return encoded_response(await verify_one(req, client), request)
+
+
+def _message_id(message: Any) -> Any:
+    """Best-effort correlation id of a message that failed validation."""
+    try:
+        if isinstance(message, bytes):
+            message = encoding.loads_json(message)
+        return message.get("id") if isinstance(message, dict) else None
+    except ValueError:
+        return None
+
+
+async def verify_stream_message(
+    seq: int, message: Any, send: Callable[[dict], Awaitable[None]], client: Any = None,
+):
+    """Verify one stream message (a JSON line or a decoded object) and send its reply."""
+    try:
+        if isinstance(message, bytes):
+            req = VerifyStreamMessage.model_validate_json(message)
+        else:
+            req = VerifyStreamMessage.model_validate(message)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        await send({"id": _message_id(message), "seq": seq, "status": 422, "error": errors})
+        return
+
+    try:
+        reply = {"id": req.id, "seq": seq, **await verify_one(req, client)}
+    except HTTPException as e:
+        reply = {"id": req.id, "seq": seq, "status": e.status_code, "error": e.detail}
+    except Exception:
+        logger.exception("Verifying stream message %s failed", seq)
+        reply = {"id": req.id, "seq": seq, "status": 500, "error": "Internal Server Error"}
+    await send(reply)
+
+
+async def run_stream(messages: AsyncIterator[Any], send: Callable[[dict], Awaitable[None]]):
+    """
+    Verify stream messages concurrently, sending each reply as soon as it is
+    ready (so replies can come back out of order; match them by id or seq).
+    At most STREAM_MAX_IN_FLIGHT messages are in flight; past that, reading
+    waits, which pushes back on the client. Messages without a device id
+    share one admission queue per stream.
+    """
+    client = ("stream", next(_stream_ids))
+    slots = asyncio.Semaphore(STREAM_MAX_IN_FLIGHT)
+    tasks: set[asyncio.Task] = set()
+
+    async def handle(seq: int, message: Any):
+        try:
+            await verify_stream_message(seq, message, send, client)
+        finally:
+            slots.release()
+
+    try:
+        seq = 0
+        async for message in messages:
+            await slots.acquire()
+            task = asyncio.create_task(handle(seq, message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            seq += 1
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/verify/stream", openapi_extra={
+    "requestBody": {"required": True, "content": {
+        encoding.NDJSON: {"schema": VerifyStreamMessage.model_json_schema()},
+        encoding.MSGPACK: {"schema": VerifyStreamMessage.model_json_schema()},
+    }},
+})
+async def verify_stream(request: Request):
+    """
+    Verify a long-lived stream of results over one HTTP request.
+
+    The body is NDJSON (one /verify request per line, plus an optional "id")
+    or back-to-back msgpack objects. Verdicts stream back in the same
+    encoding as they are ready, each with its "id" and "seq" (0-based
+    position in the request stream). A request that fails gets
+    {"id", "seq", "status", "error"} instead and the stream goes on.
+    """
+    try:
+        decoder = encoding.StreamDecoder(request.headers.get("content-type"))
+    except encoding.UnsupportedEncoding as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    replies: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=STREAM_MAX_IN_FLIGHT)
+
+    async def messages() -> AsyncIterator[Any]:
+        async for chunk in request.stream():
+            for message in decoder.feed(chunk):
+                yield message
+        for message in decoder.close():
+            yield message
+
+    async def send(reply: dict):
+        await replies.put(decoder.encode(reply))
+
+    async def pump():
+        try:
+            await run_stream(messages(), send)
+        except ClientDisconnect:
+            pass
+        except ValueError as e:  # Broken framing: nothing after it can be read
+            await send({"id": None, "seq": None, "status": 400, "error": str(e)})
+        except Exception:
+            logger.exception("Verify stream failed")
+        finally:
+            await replies.put(None)
+
+    async def body() -> AsyncIterator[bytes]:
+        task = asyncio.create_task(pump())
+        try:
+            while (chunk := await replies.get()) is not None:
+                yield chunk
+        finally:
+            task.cancel()
+
+    return encoding.DuplexStreamingResponse(body(), media_type=decoder.media_type)
+
+
+@app.websocket("/verify/ws")
+async def verify_ws(websocket: WebSocket, encoding_name: str = Query("json", alias="encoding")):
+    """
+    Verify a stream of results over a WebSocket, same messages as /verify/stream.
+
+    With ?encoding=json (default) each text frame holds one JSON request, or
+    several as NDJSON, and replies are text frames. With ?encoding=msgpack
+    each binary frame holds one msgpack request and replies are binary.
+    """
+    binary = encoding_name == "msgpack"
+    if binary and encoding.msgpack is None:
+        await websocket.close(code=1003, reason="msgpack is not installed on this server")
+        return
+    await websocket.accept()
+    sending = asyncio.Lock()
+
+    async def send(reply: dict):
+        async with sending:
+            if binary:
+                await websocket.send_bytes(encoding.encode(reply, encoding.MSGPACK))
+            else:
+                await websocket.send_text(encoding.dumps_json(reply).decode())
+
+    async def messages() -> AsyncIterator[Any]:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                return
+            if binary and frame.get("bytes") is not None:
+                try:
+                    yield encoding.decode_msgpack(frame["bytes"])
+                except ValueError as e:
+                    await send({"id": None, "seq": None, "status": 400, "error": f"Invalid msgpack frame: {e}"})
+            else:
+                data = frame.get("text")
+                if data is None:
+                    data = frame["bytes"].decode("utf-8", errors="replace")
+                for line in data.splitlines():
+                    if line.strip():
+                        yield line.encode()
+
+    try:
+        await run_stream(messages(), send)
+    except WebSocketDisconnect:
+        pass
+
+
+@app.post("/verify/batch", response_model=VerifyBatchResponse)
+async def verify_batch(req: VerifyBatchRequest, request: Request):
+    """
+    Verify many mining task results in one call.
+
+    Items are scored per task type over a single feature matrix. Results
+    come back in input order and match what /verify returns for each item.
+    Items already in the verdict cache are answered from it. The rest are
+    admitted together as one request weighing one admission slot per item
+    (capped at the in-flight limit), queued per client; if the batch is
+    shed, they all get statistical-only verdicts.
     """
-    # Structural validation first
-    errors = validate_result_structure(req.task_type, req.result)
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(req.items)} items (max {BATCH_MAX_ITEMS})",
+        )
+
+    # Structural validation first — reject the whole batch on any error
+    items, errors = [], []
+    for i, item in enumerate(req.items):
+        detector_input, item_errors = scan_request(item)
+        items.append(detector_input)
+        if item_errors:
+            metrics.observe_validation_failure(item.task_type)
+            errors.append(f"items[{i}]: {'; '.join(item_errors)}")
     if errors:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid result structure: {'; '.join(errors)}",
+            detail=f"Invalid result structure: {' | '.join(errors)}",
         )
 
-    result = detector.verify(
-        task_type=req.task_type,
-        result=req.result,
-        compute_time_ms=req.compute_time_ms,
-        peer_results=req.peer_results,
-    )
+    client = request.client.host if request.client else None
+    shed = False
+
+    async def detect(indices: list[int]) -> list[dict]:
+        checks = [start_spot_check(req.items[i]) for i in indices]
+        verdicts = await executor.verify_many([items[i] for i in indices])
+        return [
+            verdict if check is None else await apply_spot_check(verdict, check, items[i].get("deadline"))
+            for i, verdict, check in zip(indices, verdicts, checks)
+        ]
+
+    async def score(indices: list[int]) -> list[dict]:
+        nonlocal shed
+        if admission is None:
+            return await detect(indices)
+        async with admission.slot(client, weight=len(indices)) as admitted:
+            if admitted:
+                return await detect(indices)
+        shed = True
+        return shed_verdicts([items[i] for i in indices])
+
+    if verdict_cache is None:
+        outcomes = [(result, False) for result in await score(list(range(len(items))))]
+    else:
+        outcomes = await verdict_cache.get_or_compute_many([cache_key(item) for item in req.items], score)
+    results = [result for result, _ in outcomes]
+    fresh = [i for i, (_, cached) in enumerate(outcomes) if not cached]
+    reused = [i for i, (_, cached) in enumerate(outcomes) if cached]
+    # Only the verdicts scored for this batch can have been shed
+    metrics.observe_verdicts([req.items[i].task_type for i in fresh], [results[i] for i in fresh], shed)
+    metrics.observe_verdicts([req.items[i].task_type for i in reused], [results[i] for i in reused])
+    # Cached verdicts answer a device's retry, already recorded
+    for i in fresh:
+        record_verdict(req.items[i], results[i], items[i]["scan"])
+
+    return VerifyBatchResponse(results=[VerifyResponse(**r) for r in results])
+
+
+@app.post("/fitness/check", response_model=FitnessCheckResponse)
+async def fitness_check(req: FitnessCheckRequest):
+    """
+    Check a backlog of raw workouts (e.g. from the fitness sync callback).
+
+    Each workout is checked like the fitness layer of /verify, and workouts
+    of the same "user_id" in the batch are also checked for overlaps with
+    one another. Results come back in input order.
+    """
+    if len(req.workouts) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(req.workouts)} workouts (max {BATCH_MAX_ITEMS})",
+        )
+    try:
+        reports = await asyncio.to_thread(detector.fitness.check_many, req.workouts)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid workout: {e!r}")
+    return FitnessCheckResponse(results=[
+        FitnessCheckResult(**report._asdict(), recommendation=detector.pipeline.recommendation(report.score))
+        for report in reports
+    ])
+
+
+@app.post("/reference/spot-check", response_model=SpotCheckResponse)
+async def spot_check(req: SpotCheckRequest):
+    """
+    Check a result against a server-side recomputation of its task (Layer 4).
+
+    Recomputes run in a process pool and are cached per task payload, so a
+    task is recomputed once however many devices submit it. Each compared
+    field must match within its own tolerance.
+    """
+    if not reference_compute.supports(req.task_type):
+        raise HTTPException(
+            status_code=400,
+            detail=f"No reference computation for task type: {req.task_type}",
+        )
+    try:
+        check = await reference_engine.spot_check(req.task_type, req.payload, req.result, req.task_id)
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid task payload: {e!r}")
+    return SpotCheckResponse(**check)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus metrics: latency histograms, verdict counts, model and queue state.
+
+    Model versions and load times cover the models loaded in this process;
+    a scrape never loads one.
+    """
+    return Response(metrics.registry.render(), media_type=CONTENT_TYPE)
+
+
+def require_admin(authorization: str | None = Header(default=None)):
+    """Allow only callers presenting `Authorization: Bearer <AI_VERIFIER_ADMIN_TOKEN>`."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not authorization or not hmac.compare_digest(authorization, f"Bearer {ADMIN_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def profile_start(
+    sample_rate: float = PROFILE_SAMPLE_RATE,
+    window_s: float = PROFILE_WINDOW_S,
+    memory: bool = True,
+):
+    """
+    Open a profiling window: sample a fraction of /verify calls with cProfile
+    (and tracemalloc if memory=true) for window_s seconds. Replaces the
+    previous window's results.
+    """
+    if not 0 < sample_rate <= 1 or window_s <= 0:
+        raise HTTPException(status_code=400, detail="Need 0 < sample_rate <= 1 and window_s > 0")
+    profiler.start(sample_rate, window_s, memory)
+    return {"status": "started", "sample_rate": sample_rate, "window_s": window_s, "memory": memory}
 
-    return VerifyResponse(**result)
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def profile_stop():
+    """Close the profiling window early; results stay available."""
+    profiler.stop()
+    return {"status": "stopped"}
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_report(top: int = 25):
+    """Top functions (own and cumulative time) and allocation sites of the window."""
+    return await asyncio.to_thread(profiler.report, top)
+
+
+@app.get("/stats/batcher")
+async def batcher_stats():
+    """Micro-batcher batch-size and queue-wait statistics."""
+    return {
+        "enabled": MICROBATCH_ENABLED,
+        "max_batch_size": batcher.max_batch_size,
+        "max_wait_ms": batcher.max_wait_s * 1000.0,
+        "queue_depth": batcher.queue_depth,
+        **batcher.stats.snapshot(),
+    }
+
+
+@app.get("/stats/cache")
+async def cache_stats():
+    """Verdict cache size and hit/miss statistics."""
+    if verdict_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **verdict_cache.stats()}
+
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """Admission limits, queues, queue-time percentiles and shed counts."""
+    if admission is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.stats()}
+
+
+@app.get("/stats/reference")
+async def reference_stats():
+    """Reference recompute cache and spot-check statistics."""
+    return reference_engine.stats()
+
+
+@app.get("/stats/devices")
+async def device_stats():
+    """Device profile occupancy, memory and record counts."""
+    if device_profiles is None:
+        return {"enabled": False}
+    return {"enabled": True, **device_profiles.stats()}
+
+
+@app.post("/reload-model", dependencies=[Depends(require_admin)])
+async def reload_model(task_type: str | None = None, wait: bool = True):
+    """
+    Reload ML models from disk (call after retraining).
+
+    Loading happens off the event loop into a new snapshot that is swapped
+    in atomically; requests in flight finish on the model they started with.
+    Pass ?task_type=protein to swap only that task type's model, and
+    ?wait=false to return immediately while the reload runs in the background.
+    """
+    if not wait:
+        spawn_background(reload_models(task_type), "Background model reload failed")
+        return {"status": "reloading", "task_type": task_type}
+
+    versions = await reload_models(task_type)
+    return {
+        "status": "ok",
+        "model_loaded": detector.model_loaded,
+        "task_type": task_type,
+        "versions": versions,
+        "errors": detector.models.errors,
+        "stat_bounds_version": detector.bounds.version,
+    }
+
+
+@app.post("/retrain", dependencies=[Depends(require_admin)])
+async def retrain(task_type: str | None = None, wait: bool = False):
+    """
+    Retrain models in a background process (rolling window, warm start).
+
+    New rows are delta-fetched, trees fitted on them are added to each
+    model and the oldest trees dropped. Published models are hot-swapped
+    when the run finishes. Returns immediately unless ?wait=true; only one
+    run is active at a time.
+    """
+    if wait:
+        return await retrainer.run(task_type)
+    if not retrainer.start(task_type):
+        raise HTTPException(status_code=409, detail="Retraining already running")
+    return {"status": "started", "task_type": task_type}
 
 
-@app.post("/reload-model")
-async def reload_model():
-    """Reload the ML model from disk (call after retraining)."""
-    detector.reload_model()
-    return {"status": "ok", "model_loaded": detector.model is not None}
+@app.get("/retrain")
+async def retrain_status():
+    """State and report of the last background retraining run."""
+    return retrainer.status()
 
 
 if __name__ == "__main__":
@@ -1,37 +1,93 @@
 """
-Three-layer anomaly detection for mining result verification.
+Six-layer anomaly detection for mining result verification.
 
 Layer 1: Statistical bounds — flag results outside 3 standard deviations
 Layer 2: Isolation Forest — trained ML model detects novel outlier patterns
 Layer 3: Cross-device consistency — compare against other results for the same task
-Layer 4: Reference computation — server-side spot-check against deterministic output
-Layer 5: Fitness anomaly detection — impossible workout patterns
+Layer 4: Reference computation — server-side spot-check against deterministic output,
+         when the caller sends the task payload (models/reference_compute.py,
+         run by the service in a process pool: serving/reference.py)
+Layer 5: Fitness anomaly detection — impossible workout patterns in the raw
+         time series, when the caller sends them (models/fitness_engine.py)
+Layer 6: Device history — patterns across the submitting device's recent
+         results and verdicts, when the caller attaches them
+         (models/device_profiles.py); the lower of it and layers 1-3 wins
+
+Layers 1-3 run through a LayerPipeline (models/pipeline.py): cheapest
+first, stopping early for a result once its recommendation is decided or
+its deadline is near.
 """
 
+import math
+import time
 import numpy as np
-import joblib
-import os
 from typing import Any
 
-from config import STAT_BOUNDS, MODEL_PATH, CONFIDENCE_ACCEPT, CONFIDENCE_REVIEW
+from config import CONFIDENCE_ACCEPT, CONFIDENCE_REVIEW, PIPELINE_EARLY_EXIT
+from models.compiled_forest import CompiledIsolationForest
+from models.device_profiles import FEATURE_WIDTH, score_history
+from models.fitness_engine import FitnessEngine
+from models.features import FeatureMatrix, feature_matrix
+from models.fingerprint import Consensus, consensus, peer_fingerprints
+from models.model_registry import ModelRegistry
+from models.peer_store import numeric_fields
+from models.pipeline import SKIP_DEADLINE, SKIP_DECIDED, Layer, LayerGroup, LayerPipeline
+from models.stat_bounds import StatBounds
+from models.task_specs import ScanResult, TaskPlan, TaskPlans
 
 
 class AnomalyDetector:
     """Multi-layer anomaly detection for mining results."""
 
-    def __init__(self):
-        self.model = None
-        self.stat_bounds = STAT_BOUNDS
-        self._load_model()
+    def __init__(
+        self,
+        models: ModelRegistry | None = None,
+        bounds: StatBounds | None = None,
+        early_exit: bool = PIPELINE_EARLY_EXIT,
+    ):
+        # Per-task-type Isolation Forests, loaded lazily on first use
+        self.models = models or ModelRegistry()
+        # Config defaults overlaid with trained/online bounds, as vectors
+        self.bounds = bounds or StatBounds()
+        # Task specs compiled against the bounds: one dict walk per result
+        self.plans = TaskPlans(self.bounds)
+        # Layers 1-3 with their weights and per-row cost estimates (ms)
+        self.pipeline = LayerPipeline(
+            [
+                Layer("statistical", 0.30, 0.02, self._layer_statistical, self._range_statistical),
+                Layer("ml", 0.40, 0.25, self._layer_ml, self._range_ml),
+                Layer("consistency", 0.30, 0.05, self._layer_consistency, self._range_consistency),
+            ],
+            CONFIDENCE_ACCEPT,
+            CONFIDENCE_REVIEW,
+            early_exit=early_exit,
+        )
+        # Layer 5: raw workout checks for fitness_verify results
+        self.fitness = FitnessEngine()
+
+    @property
+    def stat_bounds(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Statistical bounds currently in use, per task type and field."""
+        return self.bounds.bounds
+
+    @property
+    def model_loaded(self) -> bool:
+        """True if any trained model artifact is available."""
+        return self.models.has_any_model()
+
+    def reload_model(self, task_type: str | None = None) -> dict[str, str | None]:
+        """
+        Reload one task type's model, or all of them (after retraining).
 
-    def _load_model(self):
-        """Load trained Isolation Forest model if available."""
-        if os.path.exists(MODEL_PATH):
-            self.model = joblib.load(MODEL_PATH)
+        Stat bounds are re-read as well. Returns task_type -> model version
+        now serving.
+        """
+        self.bounds.reload()
+        return self.models.reload(task_type)
 
-    def reload_model(self):
-        """Reload model from disk (after retraining)."""
-        self._load_model()
+    def reload_bounds(self):
+        """Re-read statistical bounds from disk."""
+        self.bounds.reload()
 
     def verify(
         self,
@@ -39,71 +95,251 @@ class AnomalyDetector:
         result: dict[str, Any],
         compute_time_ms: int,
         peer_results: list[dict[str, Any]] | None = None,
+        deadline: float | None = None,
     ) -> dict[str, Any]:
         """
         Verify a mining result using multiple layers of detection.
 
+        `deadline` is a time.monotonic() value; layers that would not finish
+        before it are skipped.
+
         Returns:
             {
                 "confidence": 0.0-1.0,
                 "flags": list of warning strings,
                 "recommendation": "accept" | "review" | "reject",
-                "layer_scores": { "statistical": float, "ml": float, "consistency": float }
+                "layer_scores": { "statistical": float, "ml": float, "consistency": float },
+                "layers_run": layers scored, in run order,
+                "layers_skipped": { layer: "decided" | "deadline" }
             }
         """
-        flags: list[str] = []
+        return self.verify_many([{
+            "task_type": task_type,
+            "result": result,
+            "compute_time_ms": compute_time_ms,
+            "peer_results": peer_results,
+            "deadline": deadline,
+        }])[0]
+
+    def verify_many(
+        self,
+        items: list[dict[str, Any]],
+        timings: list[tuple[str, str, float]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Verify a batch of mining results.
+
+        Each item has the same keys as the arguments of verify(), plus an
+        optional "scan" from TaskPlan.scan() if the caller already validated
+        the result, a raw "workout" for fitness_verify results (see
+        FitnessEngine.check), the submitting device's "device_history"
+        (DeviceProfiles.history), and "shed": true if the caller expired
+        its deadline to shed load (only its flag differs). Items are grouped
+        by task type and every layer is scored once per group over a feature
+        matrix (for the rows still undecided). Results are returned in input
+        order and are identical to calling verify() on each item.
+
+        If `timings` is given, (layer, task_type, seconds) is appended for
+        every layer run on each task-type group.
+        """
+        verdicts: list[dict[str, Any] | None] = [None] * len(items)
+
+        groups: dict[str, list[int]] = {}
+        for i, item in enumerate(items):
+            groups.setdefault(item["task_type"], []).append(i)
+
+        for task_type, indices in groups.items():
+            group = [items[i] for i in indices]
+
+            # Fitness verify tasks use separate verification
+            if task_type == "fitness_verify":
+                start = time.perf_counter()
+                for i, item in zip(indices, group):
+                    verdicts[i] = self._verify_fitness_result(item["result"], [], item.get("workout"))
+                if timings is not None:
+                    timings.append(("fitness", task_type, time.perf_counter() - start))
+                continue
 
-        # Fitness verify tasks use separate verification
-        if task_type == "fitness_verify":
-            return self._verify_fitness_result(result, flags)
+            for i, verdict in zip(indices, self._verify_group(task_type, group, timings)):
+                verdicts[i] = verdict
 
-        layer_scores = {
-            "statistical": 1.0,
-            "ml": 1.0,
-            "consistency": 1.0,
-        }
+        return verdicts
 
-        # ── Layer 1: Statistical bounds ──────────────────────────────
-        stat_score = self._check_statistical_bounds(task_type, result, compute_time_ms, flags)
-        layer_scores["statistical"] = stat_score
+    def _verify_group(
+        self,
+        task_type: str,
+        items: list[dict[str, Any]],
+        timings: list[tuple[str, str, float]] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Score a group of results that share one task type."""
+        clock = time.perf_counter
+        start = clock()
+        plan = self.plans.get(task_type)
+        scans = [self._scan(plan, item) for item in items]
+        flags: list[list[str]] = [[] for _ in items]
+        if timings is not None:
+            timings.append(("scan", task_type, clock() - start))
+
+        # Layers 1-3, cheapest first, until each row is decided or out of time
+        deadlines = None
+        if any(item.get("deadline") is not None for item in items):
+            deadlines = [math.inf if item.get("deadline") is None else item["deadline"] for item in items]
+        run = self.pipeline.run(LayerGroup(task_type, plan, items, scans, flags), deadlines, timings)
+        confidences = list(run.confidences)
+        history = self._layer_history(plan, items, scans, confidences, run.undecided, flags, timings)
+
+        verdicts = []
+        for row, (confidence, undecided) in enumerate(zip(confidences, run.undecided)):
+            layer_scores: dict[str, float] = {}
+            layers_skipped: dict[str, str] = {}
+            for name, scores in run.scores.items():
+                reason = run.skipped[name][row]
+                if reason is None:
+                    layer_scores[name] = round(scores[row], 4)
+                else:
+                    layers_skipped[name] = reason
+            if row in history:
+                if history[row] is None:
+                    layers_skipped["history"] = SKIP_DECIDED
+                else:
+                    layer_scores["history"] = round(history[row], 4)
+            late = [name for name, reason in layers_skipped.items() if reason == SKIP_DEADLINE]
+            if late:
+                cause = "Shed under load" if items[row].get("shed") else "Deadline reached"
+                flags[row].append(f"{cause}, skipped: {', '.join(late)}")
+
+            verdicts.append({
+                "confidence": round(confidence, 4),
+                "flags": flags[row],
+                "recommendation": self.pipeline.recommendation(confidence, undecided),
+                "layer_scores": layer_scores,
+                "layers_run": list(layer_scores),
+                "layers_skipped": layers_skipped,
+            })
+
+        return verdicts
+
+    # ── Layer 1: Statistical bounds ──────────────────────────────────
+
+    def _layer_statistical(self, group: LayerGroup, rows: list[int]) -> np.ndarray:
+        return self._score_bounds(
+            group.plan, [group.scans[row] for row in rows], [group.flags[row] for row in rows],
+        )
 
-        # ── Layer 2: Isolation Forest ────────────────────────────────
-        ml_score = self._check_isolation_forest(task_type, result, compute_time_ms, flags)
-        layer_scores["ml"] = ml_score
+    @staticmethod
+    def _range_statistical(group: LayerGroup) -> tuple[float, float]:
+        return (1.0, 1.0) if group.plan.bounds is None else (0.0, 1.0)
 
-        # ── Layer 3: Cross-device consistency ────────────────────────
-        consistency_score = self._check_consistency(result, peer_results, flags)
-        layer_scores["consistency"] = consistency_score
+    # ── Layer 2: Isolation Forest ────────────────────────────────────
 
-        # ── Combine scores (weighted average) ────────────────────────
-        # Statistical: 30%, ML: 40%, Consistency: 30%
-        confidence = (
-            0.30 * stat_score
-            + 0.40 * ml_score
-            + 0.30 * consistency_score
+    def _layer_ml(self, group: LayerGroup, rows: list[int]) -> np.ndarray:
+        return self._score_features(
+            group.task_type,
+            FeatureMatrix.from_vectors([group.scans[row].features for row in rows]),
+            [group.flags[row] for row in rows],
         )
 
-        # Determine recommendation
-        if confidence >= CONFIDENCE_ACCEPT:
-            recommendation = "accept"
-        elif confidence >= CONFIDENCE_REVIEW:
-            recommendation = "review"
-        else:
-            recommendation = "reject"
+    def _range_ml(self, group: LayerGroup) -> tuple[Any, float]:
+        if self.models.get(group.task_type) is None:
+            return 1.0, 1.0  # No model, every row passes
+        return [0.0 if scan.features is not None else 1.0 for scan in group.scans], 1.0
 
-        return {
-            "confidence": round(confidence, 4),
-            "flags": flags,
-            "recommendation": recommendation,
-            "layer_scores": {k: round(v, 4) for k, v in layer_scores.items()},
-        }
+    # ── Layer 3: Cross-device consistency ────────────────────────────
+
+    def _layer_consistency(self, group: LayerGroup, rows: list[int]) -> np.ndarray:
+        scores = []
+        for row in rows:
+            item, scan = group.items[row], group.scans[row]
+            scores.append(self._check_consistency(
+                item["result"], item.get("peer_results"), group.flags[row], item.get("peer_stats"),
+                our_values=scan.numeric, consensus=self._peer_consensus(group.plan, item, scan),
+            ))
+        return np.array(scores, dtype=np.float64)
+
+    @staticmethod
+    def _range_consistency(group: LayerGroup) -> tuple[list[float], float]:
+        # Without peers there is nothing to compare: the layer scores 1.0
+        has_peers = [bool(item.get("peer_results") or item.get("peer_stats")) for item in group.items]
+        return [0.0 if peers else 1.0 for peers in has_peers], 1.0
+
+    # ── Layer 6: Device history ──────────────────────────────────────
+
+    def _layer_history(
+        self,
+        plan: TaskPlan,
+        items: list[dict[str, Any]],
+        scans: list[ScanResult],
+        confidences: list[float],
+        undecided: list[bool],
+        flags: list[list[str]],
+        timings: list[tuple[str, str, float]] | None = None,
+    ) -> dict[int, float | None]:
+        """
+        Score rows with a device history and lower their confidence to it.
+        Returns row -> score (None: skipped, the row is already rejected).
+        """
+        rows = [row for row, item in enumerate(items) if item.get("device_history") is not None]
+        if not rows:
+            return {}
+        start = time.perf_counter()
+        history: dict[int, float | None] = {}
+        open_rows = []
+        for row in rows:
+            if self.pipeline.recommendation(confidences[row], undecided[row]) == "reject":
+                history[row] = None
+            else:
+                open_rows.append(row)
+        if open_rows:
+            current = np.full((len(open_rows), FEATURE_WIDTH), np.nan)
+            for i, row in enumerate(open_rows):
+                if scans[row].features is not None:
+                    current[i, :len(scans[row].features)] = scans[row].features
+            bounds = plan.bounds
+            time_bounds = None
+            if bounds is not None and bounds.fields and bounds.fields[0] == "compute_time_ms":
+                time_bounds = (float(bounds.mean[0]), float(bounds.std[0]))
+            scores, history_flags = score_history(
+                plan.task_type, [items[row]["device_history"] for row in open_rows], current, time_bounds,
+            )
+            for row, score, row_flags in zip(open_rows, scores, history_flags):
+                history[row] = float(score)
+                flags[row].extend(row_flags)
+                confidences[row] = min(confidences[row], float(score))
+        if timings is not None:
+            timings.append(("history", plan.task_type, time.perf_counter() - start))
+        return history
+
+    @staticmethod
+    def _scan(plan: TaskPlan, item: dict[str, Any]) -> ScanResult:
+        """The item's scan, reusing the caller's if it matches the current plan."""
+        scan = item.get("scan")
+        if scan is None or scan.bounds_version != plan.bounds_version:
+            scan = plan.scan(item["result"], item["compute_time_ms"])
+        return scan
+
+    @staticmethod
+    def _peer_consensus(plan: TaskPlan, item: dict[str, Any], scan: ScanResult) -> Consensus | None:
+        """Fingerprint agreement with the item's peers (given, or from the peer store)."""
+        peer_results = item.get("peer_results")
+        if not peer_results:
+            return item.get("peer_consensus")
+        if plan.fingerprint_digits is None:
+            return None
+        return consensus(
+            scan.fingerprint, peer_fingerprints(peer_results, plan.fingerprint_digits), len(peer_results),
+        )
 
     def _verify_fitness_result(
         self,
         result: dict[str, Any],
         flags: list[str],
+        workout: dict[str, Any] | None = None,
     ) -> dict[str, Any]:
-        """Verify a fitness verification task result."""
+        """
+        Verify a fitness verification task result: the node's own checks,
+        and with the raw workout, the server-side workout checks (the lower
+        score wins).
+        """
         checks = result.get("checks", {})
         confidence_from_node = result.get("confidence", 0)
 
@@ -129,7 +365,19 @@ class AnomalyDetector:
                 flags.append("Perfect confidence despite failed checks")
                 score -= 0.4
 
+        layer_scores = {"fitness_verify": round(score, 4)}
         confidence = max(0.0, min(1.0, score))
+        if workout:
+            try:
+                report = self.fitness.check(workout)
+            except (KeyError, TypeError, ValueError) as e:
+                # Unreadable workout data: leave the call to a reviewer
+                flags.append(f"Invalid workout data: {e!r}")
+                confidence = min(confidence, CONFIDENCE_REVIEW)
+            else:
+                flags.extend(report.flags)
+                layer_scores["fitness_workout"] = report.score
+                confidence = min(confidence, report.score)
 
         if confidence >= CONFIDENCE_ACCEPT:
             recommendation = "accept"
@@ -142,7 +390,9 @@ class AnomalyDetector:
             "confidence": round(confidence, 4),
             "flags": flags,
             "recommendation": recommendation,
-            "layer_scores": {"fitness_verify": round(score, 4)},
+            "layer_scores": layer_scores,
+            "layers_run": list(layer_scores),
+            "layers_skipped": {},
         }
 
     def _check_statistical_bounds(
@@ -153,44 +403,54 @@ class AnomalyDetector:
         flags: list[str],
     ) -> float:
         """Check if result values fall within expected statistical ranges."""
-        bounds = self.stat_bounds.get(task_type, {})
-        if not bounds:
-            return 1.0  # No bounds defined, pass
-
-        score = 1.0
-        checks = 0
-
-        # Check compute time (wider bounds for real data — variable sizes)
-        if "compute_time_ms" in bounds:
-            b = bounds["compute_time_ms"]
-            z = abs(compute_time_ms - b["mean"]) / max(b["std"], 1)
-            # Wider threshold for real data (4σ instead of 3σ)
-            if z > 4:
-                flags.append(f"compute_time_ms z-score={z:.1f} (>4σ)")
-                score -= 0.3
-            elif z > 3:
-                score -= 0.1
-            checks += 1
+        scores = self._score_statistical_bounds(
+            task_type, [result], np.array([compute_time_ms], dtype=np.float64), [flags],
+        )
+        return float(scores[0])
 
-        # Check task-type-specific fields
-        for field, b in bounds.items():
-            if field == "compute_time_ms":
-                continue
-            value = result.get(field)
-            if value is not None:
-                try:
-                    z = abs(float(value) - b["mean"]) / max(b["std"], 0.001)
-                    # Wider threshold for real data (4σ instead of 3σ)
-                    if z > 4:
-                        flags.append(f"{field} z-score={z:.1f} (>4σ)")
-                        score -= 0.3
-                    elif z > 3:
-                        score -= 0.1
-                    checks += 1
-                except (TypeError, ValueError):
-                    pass
-
-        return max(0.0, min(1.0, score))
+    def _score_statistical_bounds(
+        self,
+        task_type: str,
+        results: list[dict[str, Any]],
+        compute_times: np.ndarray,
+        flags: list[list[str]],
+    ) -> np.ndarray:
+        """Vectorized statistical bounds check over a group of results."""
+        plan = self.plans.get(task_type)
+        scans = [plan.scan(r, t) for r, t in zip(results, compute_times.tolist())]
+        return self._score_bounds(plan, scans, flags)
+
+    def _score_bounds(
+        self,
+        plan: TaskPlan,
+        scans: list[ScanResult],
+        flags: list[list[str]],
+    ) -> np.ndarray:
+        """Statistical bounds check over scanned results."""
+        scores = np.ones(len(scans), dtype=np.float64)
+        bounds = plan.bounds
+        if bounds is None:
+            return scores  # No bounds defined, pass
+
+        # One column per bounded field; missing or non-numeric values are
+        # NaN, which never exceeds a threshold
+        values = np.array([scan.bound_values for scan in scans], dtype=np.float64)
+        values = values.reshape(len(scans), len(bounds.fields))
+
+        z = np.abs(values - bounds.mean) / bounds.std
+
+        # Wider threshold for real data (4σ instead of 3σ)
+        with np.errstate(invalid="ignore"):
+            outliers = z > 4
+            penalties = np.where(outliers, 0.3, np.where(z > 3, 0.1, 0.0))
+
+        for col, field in enumerate(bounds.fields):
+            for row in np.flatnonzero(outliers[:, col]):
+                flags[row].append(f"{field} z-score={float(z[row, col]):.1f} (>4σ)")
+
+        # Deduct penalties field by field: ((1 - p0) - p1) - ...
+        scores = np.subtract.reduce(np.column_stack([scores, penalties]), axis=1)
+        return np.clip(scores, 0.0, 1.0)
 
     def _check_isolation_forest(
         self,
@@ -200,42 +460,113 @@ class AnomalyDetector:
         flags: list[str],
     ) -> float:
         """Use trained Isolation Forest to detect anomalies."""
-        if self.model is None:
-            return 1.0  # No model trained yet, pass
+        scores = self._score_isolation_forest(
+            task_type, [result], np.array([compute_time_ms], dtype=np.float64), [flags],
+        )
+        return float(scores[0])
+
+    def _score_isolation_forest(
+        self,
+        task_type: str,
+        results: list[dict[str, Any]],
+        compute_times: np.ndarray,
+        flags: list[list[str]],
+    ) -> np.ndarray:
+        """Score a group of results with one Isolation Forest call."""
+        matrix = feature_matrix(task_type, results, compute_times)
+        if matrix is None:
+            return np.ones(len(results), dtype=np.float64)  # No features for this type, pass
+        return self._score_features(task_type, matrix, flags)
+
+    def _score_features(
+        self,
+        task_type: str,
+        matrix: FeatureMatrix,
+        flags: list[list[str]],
+    ) -> np.ndarray:
+        """Isolation Forest scores for a feature matrix; rows not in it pass."""
+        scores = np.ones(len(flags), dtype=np.float64)
+        # Read the model once so a concurrent reload cannot swap it mid-batch
+        model = self.models.get(task_type)
+        if model is None:
+            return scores  # No model trained yet, pass
+
+        rows, X = matrix.rows, matrix.X
+        if not len(rows):
+            return scores
 
         try:
-            features = self._extract_features(task_type, result, compute_time_ms)
-            if features is None:
-                return 1.0
+            # decision_function returns anomaly score (lower = more anomalous);
+            # predict is its sign (-1 outlier, 1 inlier), so walk the trees once
+            anomaly_scores = model.decision_function(X)
+            predictions = CompiledIsolationForest.decide(anomaly_scores)
+        except Exception:
+            # Model error: score rows one at a time so one bad row passes alone
+            for row, features in zip(rows.tolist(), X.tolist()):
+                scores[row] = self._score_isolation_forest_row(model, features, flags[row])
+            return scores
 
-            # Isolation Forest: predict returns -1 for outliers, 1 for inliers
-            prediction = self.model.predict([features])[0]
-            # decision_function returns anomaly score (lower = more anomalous)
-            anomaly_score = self.model.decision_function([features])[0]
+        for row, prediction, anomaly_score in zip(rows, predictions, anomaly_scores):
+            scores[row] = self._map_anomaly_score(int(prediction), float(anomaly_score), flags[row])
 
-            if prediction == -1:
-                flags.append(f"ML anomaly detected (score={anomaly_score:.3f})")
-                # Map anomaly score to 0-0.5 range
-                return max(0.0, min(0.5, 0.5 + anomaly_score))
-            else:
-                # Map inlier score to 0.7-1.0 range
-                return min(1.0, 0.7 + anomaly_score * 0.3)
+        return scores
 
+    def _score_isolation_forest_row(
+        self,
+        model: Any,
+        features: list[float],
+        flags: list[str],
+    ) -> float:
+        """Score a single feature vector, passing on model error."""
+        try:
+            anomaly_score = model.decision_function([features])[0]
+            prediction = CompiledIsolationForest.decide(anomaly_score)
         except Exception:
             return 1.0  # Model error, pass
+        return self._map_anomaly_score(int(prediction), float(anomaly_score), flags)
+
+    @staticmethod
+    def _map_anomaly_score(prediction: int, anomaly_score: float, flags: list[str]) -> float:
+        """Map an Isolation Forest decision to a 0-1 layer score."""
+        if prediction == -1:
+            flags.append(f"ML anomaly detected (score={anomaly_score:.3f})")
+            # Map anomaly score to 0-0.5 range
+            return max(0.0, min(0.5, 0.5 + anomaly_score))
+        # Map inlier score to 0.7-1.0 range
+        return min(1.0, 0.7 + anomaly_score * 0.3)
 
     def _check_consistency(
         self,
         result: dict[str, Any],
         peer_results: list[dict[str, Any]] | None,
         flags: list[str],
+        peer_stats: dict[str, tuple[int, float, float]] | None = None,
+        our_values: list[float] | None = None,
+        consensus: Consensus | None = None,
     ) -> float:
-        """Compare result against peer submissions for the same task."""
+        """
+        Compare result against peer submissions for the same task.
+
+        A result whose fingerprint a majority of peers share is consistent
+        without further work; otherwise peer values are compared by z-score.
+        """
+        if consensus is not None:
+            if consensus.agrees:
+                return 1.0
+            if consensus.disagrees:
+                flags.append(
+                    f"Peer consensus mismatch: {consensus.top}/{consensus.total} peers agree on a different result"
+                )
+
         if not peer_results or len(peer_results) < 1:
+            if peer_stats:
+                return self._check_peer_stats(result, peer_stats, flags)
             return 1.0  # No peers to compare against
 
-        # Extract numeric values from results for comparison
-        our_values = self._flatten_numeric(result)
+        # Extract numeric values from results for comparison (already
+        # collected by the scan when called from verify_many)
+        if our_values is None:
+            our_values = self._flatten_numeric(result)
         if not our_values:
             return 1.0
 
@@ -264,49 +595,27 @@ class AnomalyDetector:
 
         return 1.0
 
-    def _extract_features(
+    def _check_peer_stats(
         self,
-        task_type: str,
         result: dict[str, Any],
-        compute_time_ms: int,
-    ) -> list[float] | None:
-        """Extract numeric feature vector from a task result."""
-        features = [float(compute_time_ms)]
-
-        if task_type == "protein":
-            features.extend([
-                float(result.get("finalEnergy", 0)),
-                float(result.get("residueCount", 0)),
-                float(result.get("iterations", 0)),
-            ])
-        elif task_type == "climate":
-            features.extend([
-                float(result.get("maxTemperature", 0)),
-                float(result.get("avgTemperature", 0)),
-                float(result.get("centerTemp", 0)),
-            ])
-        elif task_type == "signal":
-            features.extend([
-                float(result.get("maxMagnitude", 0)),
-                float(result.get("fftSize", 0)),
-                float(result.get("numSamples", 0)),
-            ])
-        elif task_type == "drugscreen":
-            features.extend([
-                float(result.get("bindingAffinity", 0)),
-                float(result.get("interactionCount", 0)),
-                float(result.get("orientationsScanned", 0)),
-            ])
-        elif task_type == "fitness_verify":
-            features.extend([
-                float(result.get("confidence", 0)),
-                1.0 if result.get("verified") else 0.0,
-                float(len(result.get("checks", {}))),
-            ])
-        else:
-            return None
+        peer_stats: dict[str, tuple[int, float, float]],
+        flags: list[str],
+    ) -> float:
+        """Compare result against running peer statistics (n, mean, std) per field."""
+        z_scores = [
+            abs(value - peer_stats[field][1]) / max(peer_stats[field][2], 0.001)
+            for field, value in numeric_fields(result).items()
+            if field in peer_stats
+        ]
+        if not z_scores:
+            return 1.0
 
-        return features
+        max_z = max(z_scores)
+        if max_z > 2:
+            flags.append(f"Peer consistency: max z-score={max_z:.1f} (>2σ)")
+            return max(0.0, 1.0 - (max_z - 2) * 0.25)
+
+        return 1.0
 
     def _flatten_numeric(self, d: dict[str, Any]) -> list[float]:
         """Extract all numeric values from a dict (non-recursive)."""
@@ -315,3 +624,4 @@ class AnomalyDetector:
             if isinstance(v, (int, float)) and not isinstance(v, bool):
                 values.append(float(v))
         return values
+
@@ -0,0 +1,233 @@
+"""
+Compiled, array-backed Isolation Forest scorer.
+
+Flattens a trained sklearn IsolationForest into contiguous NumPy arrays
+(split feature, threshold, children, missing-value direction and a per-leaf
+path length that already includes the c(n) correction). All trees are then
+walked together, level by level, for every row at once:
+
+    depth(x) = Σ_trees [ leaf_depth + c(leaf_samples) - 1 ]
+    score_samples(x) = -2 ** (-depth(x) / (n_trees * c(max_samples)))
+    decision_function(x) = score_samples(x) - offset_
+
+The anomaly score is computed once and the inlier/outlier decision is
+derived from its sign, exactly as IsolationForest.predict does — so a
+request walks the forest once instead of twice, without sklearn's
+per-call input validation.
+"""
+
+from typing import Any
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+# Rows scored per traversal chunk, bounds the (rows × trees) working set
+CHUNK_ROWS = 512
+
+
+def _average_path_length(n_samples: np.ndarray) -> np.ndarray:
+    """c(n): average path length of an unsuccessful BST search over n samples."""
+    n = np.asarray(n_samples, dtype=np.float64)
+    result = np.zeros_like(n)
+    result[n == 2] = 1.0
+    mask = n > 2
+    result[mask] = (
+        2.0 * (np.log(n[mask] - 1.0) + np.euler_gamma)
+        - 2.0 * (n[mask] - 1.0) / n[mask]
+    )
+    return result
+
+
+class CompiledIsolationForest:
+    """Isolation Forest scorer over flat node arrays."""
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        children: np.ndarray,
+        missing_go_to_left: np.ndarray,
+        leaf_value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        denominator: float,
+        offset: float,
+        n_features: int,
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        # Right children then left children: next = children[node + go_left * n_nodes]
+        self.children = children
+        self.missing_go_to_left = missing_go_to_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.denominator = denominator
+        self.offset_ = offset
+        self.n_features_in_ = n_features
+
+    @property
+    def n_estimators(self) -> int:
+        """Number of trees in the compiled forest."""
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the node arrays."""
+        return sum(a.nbytes for a in self._arrays().values())
+
+    @classmethod
+    def from_sklearn(
+        cls,
+        model: IsolationForest,
+        threshold_dtype: Any = np.float64,
+    ) -> "CompiledIsolationForest":
+        """Compile a fitted IsolationForest into flat arrays."""
+        subsample_features = model._max_features != model.n_features_in_
+
+        features, thresholds, lefts, rights, missing_left, leaf_values, roots = (
+            [], [], [], [], [], [], [],
+        )
+        offset = 0
+        max_depth = 0
+        for estimator, tree_features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int64)
+            is_leaf = tree.children_left == -1
+
+            # Split features are local to the tree's feature subset
+            feature = np.where(is_leaf, 0, tree.feature).astype(np.int64)
+            if subsample_features:
+                feature = np.asarray(tree_features, dtype=np.int64)[feature]
+
+            # Leaves point at themselves so every row can take max_depth steps
+            left = np.where(is_leaf, node_ids, tree.children_left) + offset
+            right = np.where(is_leaf, node_ids, tree.children_right) + offset
+
+            depths = tree.compute_node_depths().astype(np.float64)
+            leaf_value = np.where(
+                is_leaf,
+                depths + _average_path_length(tree.n_node_samples) - 1.0,
+                0.0,
+            )
+
+            features.append(feature)
+            thresholds.append(tree.threshold)
+            lefts.append(left)
+            rights.append(right)
+            missing_left.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+            leaf_values.append(leaf_value)
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        denominator = len(model.estimators_) * float(_average_path_length([model._max_samples])[0])
+
+        return cls(
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(threshold_dtype),
+            children=np.concatenate(rights + lefts).astype(np.int32),
+            missing_go_to_left=np.concatenate(missing_left),
+            leaf_value=np.concatenate(leaf_values),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            denominator=denominator,
+            offset=float(model.offset_),
+            n_features=int(model.n_features_in_),
+        )
+
+    def score_samples(self, X: Any) -> np.ndarray:
+        """Opposite of the anomaly score (lower = more anomalous), as sklearn."""
+        # sklearn trees compare float32 inputs against the stored thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[1]} features, but the forest expects {self.n_features_in_}"
+            )
+
+        depths = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            depths[start:start + len(chunk)] = self._path_lengths(chunk)
+
+        if self.denominator == 0:
+            # A single training sample: sklearn defines the score as 1
+            return -np.ones_like(depths)
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X: Any) -> np.ndarray:
+        """Anomaly score shifted by offset_ (negative = outlier)."""
+        return self.score_samples(X) - self.offset_
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Return -1 for outliers and 1 for inliers."""
+        return self.decide(self.decision_function(X))
+
+    def score(self, X: Any) -> tuple[np.ndarray, np.ndarray]:
+        """Single pass: (predictions, decision_function) for every row."""
+        decision = self.decision_function(X)
+        return self.decide(decision), decision
+
+    @staticmethod
+    def decide(decision: np.ndarray) -> np.ndarray:
+        """Derive IsolationForest.predict labels from decision_function."""
+        return np.where(decision < 0, -1, 1)
+
+    def _path_lengths(self, X: np.ndarray) -> np.ndarray:
+        """Sum of corrected path lengths over all trees for each row."""
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        nodes = np.repeat(self.roots[None, :], n_rows, axis=0)
+        has_missing = bool(np.isnan(flat_X).any())
+        n_nodes = len(self.feature)
+
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_base + self.feature.take(nodes))
+            go_left = values <= self.threshold.take(nodes)
+            if has_missing:
+                missing = np.isnan(values)
+                go_left[missing] = self.missing_go_to_left.take(nodes[missing])
+            nodes = self.children.take(nodes + go_left * np.int32(n_nodes))
+
+        return self.leaf_value.take(nodes).sum(axis=1)
+
+    def save(self, path: str):
+        """Dump the node arrays uncompressed so they can be memory-mapped."""
+        joblib.dump(self._state(), path)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str | None = None) -> "CompiledIsolationForest":
+        """
+        Load saved node arrays.
+
+        With mmap_mode="r" the arrays are mapped read-only from the file, so
+        every worker process scoring with the same artifact shares one copy
+        through the page cache.
+        """
+        return cls(**joblib.load(path, mmap_mode=mmap_mode))
+
+    def _state(self) -> dict[str, Any]:
+        """Constructor arguments, for save()/load()."""
+        return {
+            **self._arrays(),
+            "max_depth": self.max_depth,
+            "denominator": self.denominator,
+            "offset": self.offset_,
+            "n_features": self.n_features_in_,
+        }
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        """Node arrays keyed by attribute name."""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "children": self.children,
+            "missing_go_to_left": self.missing_go_to_left,
+            "leaf_value": self.leaf_value,
+            "roots": self.roots,
+        }
@@ -0,0 +1,332 @@
+"""
+In-memory per-device behaviour profiles (Layer 6: device history).
+
+Every verdict is recorded against the submitting device: the result's
+feature vector (compute_time_ms first, as the ML layer sees it) and the
+recommendation, in a fixed-size ring buffer of the device's most recent
+submissions. All devices share one pool of NumPy arrays, one slot per
+device:
+
+    features   (slots, window, FEATURE_WIDTH) float32, NaN = missing
+    task       (slots, window) int8 task type code, -1 = empty
+    verdict    (slots, window) int8 0 accept / 1 review / 2 reject, -1 = empty
+
+so recording is O(1) (one row written at the slot's ring position). The
+pool starts empty and doubles as devices arrive, up to max_devices slots,
+so memory is bounded by max_devices × window whatever the traffic, and a
+worker that has seen few devices holds little. Feature rows are only
+meaningful where task is set (they are allocated uninitialized). Once
+every slot is taken, the least recently active device gives up its slot.
+
+A request's history is the device's rows for the same task type plus all
+its recent verdicts. score_history() scores many rows at once over their
+stacked histories, looking for behaviour no single result shows:
+
+    fast       the device's median compute_time_ms sits at least
+               FAST_Z standard deviations below the task type's mean
+    repeated   a continuous (non-integer) field matches the same field of
+               at least REPEAT_FRACTION of the device's earlier results
+    rejected   at least REJECT_RATE of its recent results were rejected
+
+Histories shorter than min_samples are not judged. At cold start the
+index can be bulk-loaded from exported task_assignments rows (load()).
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from config import DEVICE_PROFILES_MAX_DEVICES, DEVICE_PROFILES_WINDOW, DEVICE_HISTORY_MIN_SAMPLES
+from models.features import feature_columns, feature_matrix
+from models.task_specs import TASK_SPECS
+
+TASK_TYPES = tuple(TASK_SPECS)
+_TASK_CODES = {task_type: code for code, task_type in enumerate(TASK_TYPES)}
+FEATURE_WIDTH = max(len(feature_columns(t) or ()) for t in TASK_TYPES)
+
+VERDICTS = ("accept", "review", "reject")
+_VERDICT_CODES = {verdict: code for code, verdict in enumerate(VERDICTS)}
+_REJECT = _VERDICT_CODES["reject"]
+
+# Pattern thresholds and the penalty each pattern costs
+FAST_Z = 1.5
+REPEAT_FRACTION = 0.5
+REPEAT_RTOL = 1e-4
+REJECT_RATE = 0.5
+PENALTIES = {"fast": 0.3, "repeated": 0.4, "rejected": 0.3}
+
+# Slots allocated when the first device arrives; the pool doubles from there
+_INITIAL_SLOTS = 1024
+
+
+class DeviceHistory(NamedTuple):
+    """A device's recent submissions, as attached to a detector item."""
+    features: np.ndarray  # (window, FEATURE_WIDTH) float32; NaN rows = other task types or empty
+    verdicts: np.ndarray  # (window,) int8 verdict codes of every task type; -1 = empty
+
+
+class DeviceProfiles:
+    """Ring buffers of recent features and verdicts per device, in one bounded pool."""
+
+    def __init__(self, max_devices: int = DEVICE_PROFILES_MAX_DEVICES, window: int = DEVICE_PROFILES_WINDOW):
+        self.max_devices = max_devices
+        self.window = window
+        self._allocate(0)
+        # Device -> slot, least recently active first; slots are handed out in order
+        self._slots: OrderedDict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.records = 0
+        self.evictions = 0
+        self.loaded = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def capacity(self) -> int:
+        """Slots allocated so far."""
+        return len(self._count)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the allocated pool."""
+        return self._features.nbytes + self._task.nbytes + self._verdict.nbytes + self._count.nbytes
+
+    def record(self, device_id: str, task_type: str, features: list[float] | None, recommendation: str):
+        """Append one verdict (and the result's features, if extractable) to a device's ring."""
+        code = _TASK_CODES.get(task_type)
+        if code is None:
+            return
+        with self._lock:
+            slot = self._slots.get(device_id)
+            if slot is None:
+                slot = self._claim(device_id)
+            else:
+                self._slots.move_to_end(device_id)
+            pos = self._count[slot] % self.window
+            row = self._features[slot, pos]
+            row[:] = np.nan
+            if features is not None:
+                row[:len(features)] = features
+            self._task[slot, pos] = code
+            self._verdict[slot, pos] = _VERDICT_CODES[recommendation]
+            self._count[slot] += 1
+            self.records += 1
+
+    def history(self, device_id: str, task_type: str) -> DeviceHistory | None:
+        """A device's recent submissions of one task type, and all its recent verdicts."""
+        code = _TASK_CODES.get(task_type)
+        with self._lock:
+            slot = self._slots.get(device_id)
+            if slot is None or code is None:
+                return None
+            same = self._task[slot] == code
+            return DeviceHistory(
+                np.where(same[:, None], self._features[slot], np.float32(np.nan)),
+                self._verdict[slot].copy(),
+            )
+
+    def _claim(self, device_id: str) -> int:
+        """An empty slot for a new device, evicting the least recently active one if full."""
+        if len(self._slots) < self.max_devices:
+            slot = len(self._slots)
+            if slot >= self.capacity:
+                self._grow(min(self.max_devices, max(_INITIAL_SLOTS, 2 * self.capacity)))
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+            self._task[slot] = -1
+            self._verdict[slot] = -1
+            self._count[slot] = 0
+        self._slots[device_id] = slot
+        return slot
+
+    def _allocate(self, slots: int):
+        """Empty arrays for `slots` devices."""
+        self._features = np.empty((slots, self.window, FEATURE_WIDTH), dtype=np.float32)
+        self._task = np.full((slots, self.window), -1, dtype=np.int8)
+        self._verdict = np.full((slots, self.window), -1, dtype=np.int8)
+        self._count = np.zeros(slots, dtype=np.int64)  # Submissions recorded per slot
+
+    def _grow(self, slots: int):
+        """Reallocate the pool with room for `slots` devices, keeping every ring."""
+        old = self._features, self._task, self._verdict, self._count
+        self._allocate(slots)
+        for new, current in zip((self._features, self._task, self._verdict, self._count), old):
+            new[:len(current)] = current
+
+    def load(self, rows: Iterable[dict[str, Any]]) -> int:
+        """
+        Replace the index with exported task_assignments rows (cold start).
+
+        Rows carry device_id, submitted_at, result, compute_time_ms,
+        is_match (true = accept, false = reject, null = review) and the task
+        type, as "task_type" or nested as {"compute_tasks": {"task_type"}}.
+        Each device keeps its last `window` submissions; past max_devices,
+        the most recently active devices are kept. Returns the rows loaded.
+        """
+        devices: list[str] = []
+        times: list[str] = []
+        codes: list[int] = []
+        verdicts: list[int] = []
+        results: list[dict[str, Any]] = []
+        compute_times: list[float] = []
+        for row in rows:
+            task = row.get("compute_tasks") or {}
+            code = _TASK_CODES.get(row.get("task_type") or task.get("task_type"))
+            if not row.get("device_id") or code is None or not row.get("submitted_at"):
+                continue
+            result = row.get("result") or {}
+            if isinstance(result, str):  # Some exports keep the JSON column as text
+                result = json.loads(result)
+            match = row.get("is_match")
+            devices.append(str(row["device_id"]))
+            times.append(str(row["submitted_at"]))
+            codes.append(code)
+            verdicts.append(_VERDICT_CODES["accept" if match is True else "reject" if match is False else "review"])
+            results.append(result if isinstance(result, dict) else {})
+            compute_times.append(row.get("compute_time_ms") or 0)
+
+        n = len(devices)
+        if not n:
+            with self._lock:
+                self._reset()
+            return 0
+        features = np.full((n, FEATURE_WIDTH), np.nan, dtype=np.float32)
+        codes_array = np.array(codes, dtype=np.int8)
+        compute_array = np.array(compute_times, dtype=np.float64)
+        for code in np.unique(codes_array):
+            rows_of_type = np.flatnonzero(codes_array == code)
+            matrix = feature_matrix(
+                TASK_TYPES[code], [results[i] for i in rows_of_type], compute_array[rows_of_type],
+            )
+            if matrix is not None:
+                features[rows_of_type[matrix.rows], :matrix.X.shape[1]] = matrix.X
+
+        # Oldest first within each device; keep each device's last `window` rows
+        device_codes, device_ids = pd.factorize(pd.Series(devices, dtype=object))
+        order = np.lexsort((np.array(times), device_codes))
+        sorted_devices = device_codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_devices[1:] != sorted_devices[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        rank = np.arange(n) - np.repeat(starts, sizes)
+        from_end = np.repeat(sizes, sizes) - rank
+        keep = from_end <= self.window
+        # Devices by last activity; the most recent max_devices get slots, in LRU order
+        last_times = np.array(times)[order[starts + sizes - 1]]
+        by_activity = sorted_devices[starts][np.argsort(last_times, kind="stable")][-self.max_devices:]
+        slot_of = np.full(len(device_ids), -1, dtype=np.int64)
+        slot_of[by_activity] = np.arange(len(by_activity))
+
+        rows_kept = order[keep]
+        slots = slot_of[sorted_devices[keep]]
+        positions = np.maximum(sizes - self.window, 0)
+        positions = (rank - np.repeat(positions, sizes))[keep]
+        placed = slots >= 0
+        rows_kept, slots, positions = rows_kept[placed], slots[placed], positions[placed]
+
+        with self._lock:
+            self._reset(len(by_activity))
+            self._features[slots, positions] = features[rows_kept]
+            self._task[slots, positions] = codes_array[rows_kept]
+            self._verdict[slots, positions] = np.array(verdicts, dtype=np.int8)[rows_kept]
+            np.add.at(self._count, slots, 1)
+            self._slots = OrderedDict((str(device_ids[d]), slot) for slot, d in enumerate(by_activity))
+            self.loaded = len(rows_kept)
+        return self.loaded
+
+    def _reset(self, slots: int = 0):
+        """Forget every device, with room for `slots` of them."""
+        self._allocate(slots)
+        self._slots = OrderedDict()
+
+    def load_file(self, path: str) -> int:
+        """load() from an export file: a JSON array, or one JSON object per line."""
+        with open(path) as f:
+            if f.read(1) == "[":
+                f.seek(0)
+                return self.load(json.load(f))
+            f.seek(0)
+            return self.load(json.loads(line) for line in f if line.strip())
+
+    def stats(self) -> dict[str, Any]:
+        """JSON-serializable occupancy and counters."""
+        return {
+            "devices": len(self._slots),
+            "max_devices": self.max_devices,
+            "window": self.window,
+            "capacity": self.capacity,
+            "memory_bytes": self.memory_bytes,
+            "records": self.records,
+            "evictions": self.evictions,
+            "loaded": self.loaded,
+        }
+
+
+def score_history(
+    task_type: str,
+    histories: list[DeviceHistory],
+    current: np.ndarray,
+    time_bounds: tuple[float, float] | None = None,
+    min_samples: int = DEVICE_HISTORY_MIN_SAMPLES,
+) -> tuple[np.ndarray, list[list[str]]]:
+    """
+    Score rows of one task type against their devices' histories.
+
+    `current` is the (rows, FEATURE_WIDTH) feature matrix of the results
+    being verified (NaN where missing), `time_bounds` the task type's
+    compute_time_ms (mean, std). Returns a score in [0, 1] and the flags
+    per row.
+    """
+    H = np.stack([h.features for h in histories]).astype(np.float64)  # (rows, window, width)
+    V = np.stack([h.verdicts for h in histories])
+    n_same = np.count_nonzero(~np.isnan(H[:, :, 0]), axis=1)
+    judged = n_same >= max(1, min_samples)
+    flags: list[list[str]] = [[] for _ in histories]
+    penalties = np.zeros(len(histories))
+
+    if time_bounds is not None:
+        mean, std = time_bounds
+        median_z = np.full(len(histories), np.nan)
+        rows = np.flatnonzero(judged)
+        if rows.size:
+            median_z[rows] = (np.nanmedian(H[rows, :, 0], axis=1) - mean) / std
+        with np.errstate(invalid="ignore"):
+            fast = judged & (median_z <= -FAST_Z)
+        penalties += np.where(fast, PENALTIES["fast"], 0.0)
+        for row in np.flatnonzero(fast):
+            flags[row].append(
+                f"Device history: consistently fast, median compute_time_ms "
+                f"z={median_z[row]:.1f} over {n_same[row]} results"
+            )
+
+    # Only continuous fields: counts and sizes legitimately repeat
+    values = current[:, None, 1:]
+    continuous = ~np.isnan(current[:, 1:]) & (current[:, 1:] != np.round(current[:, 1:]))
+    matches = np.count_nonzero(
+        np.isclose(H[:, :, 1:], values, rtol=REPEAT_RTOL, atol=0.0), axis=1,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        repeated = continuous & judged[:, None] & (matches / n_same[:, None] >= REPEAT_FRACTION)
+    penalties += np.where(repeated.any(axis=1), PENALTIES["repeated"], 0.0)
+    names = feature_columns(task_type) or []
+    for row in np.flatnonzero(repeated.any(axis=1)):
+        fields = [names[col + 1] for col in np.flatnonzero(repeated[row]) if col + 1 < len(names)]
+        flags[row].append(
+            f"Device history: {', '.join(fields)} repeated in "
+            f"{int(matches[row][repeated[row]].max())}/{n_same[row]} earlier results"
+        )
+
+    n_verdicts = np.count_nonzero(V >= 0, axis=1)
+    rejects = np.count_nonzero(V == _REJECT, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rejected = (n_verdicts >= min_samples) & (rejects / n_verdicts >= REJECT_RATE)
+    penalties += np.where(rejected, PENALTIES["rejected"], 0.0)
+    for row in np.flatnonzero(rejected):
+        flags[row].append(f"Device history: {rejects[row]}/{n_verdicts[row]} recent results rejected")
+
+    return np.clip(1.0 - penalties, 0.0, 1.0), flags
@@ -0,0 +1,117 @@
+"""
+Isolation Forest feature matrices, shared by training and serving.
+
+The feature columns of each task type come from its spec in
+models/task_specs.py: compute_time_ms first, then the spec's "features" in
+order. feature_matrix() builds the whole matrix one column at a time, so the
+per-value conversion runs in NumPy rather than in a Python loop per row.
+
+Results whose features cannot be converted (None, non-numeric strings, ...)
+are left out of the matrix; FeatureMatrix.rows maps each matrix row back to
+its input row. The rules are the same as TaskPlan.scan() uses for a single
+result, so a model sees the same features in training and in serving.
+"""
+
+from typing import Any, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from models.task_specs import FEATURE_DEFAULTS, TASK_SPECS, feature_value, parse_features
+
+_CONVERSION_ERRORS = (TypeError, ValueError, OverflowError)
+
+
+class FeatureMatrix(NamedTuple):
+    """Feature rows for the results that could be converted."""
+    X: np.ndarray       # (len(rows), n_features) float64
+    rows: np.ndarray    # Input row index of each X row
+
+    @classmethod
+    def from_vectors(cls, vectors: list[list[float] | None]) -> "FeatureMatrix":
+        """Matrix from per-result feature vectors (None = not convertible)."""
+        rows = [row for row, v in enumerate(vectors) if v is not None]
+        X = np.array([vectors[row] for row in rows], dtype=np.float64)
+        return cls(X, np.array(rows, dtype=np.intp))
+
+
+def feature_columns(task_type: str) -> list[str] | None:
+    """Model input column names for a task type, or None if it has no features."""
+    features = parse_features(TASK_SPECS.get(task_type))
+    if not features:
+        return None
+    return ["compute_time_ms", *(name for name, _ in features)]
+
+
+def feature_matrix(
+    task_type: str,
+    results: list[dict[str, Any]] | pd.DataFrame,
+    compute_times: Any = None,
+) -> FeatureMatrix | None:
+    """
+    Feature matrix for many results of one task type.
+
+    `results` is a list of result dicts, or a DataFrame with one column per
+    result field (null cells count as missing). `compute_times` defaults to
+    the DataFrame's compute_time_ms column. Returns None if the task type
+    has no features.
+    """
+    features = parse_features(TASK_SPECS.get(task_type))
+    if not features:
+        return None
+
+    if compute_times is None:
+        compute_times = results["compute_time_ms"]
+    n = len(results)
+    X = np.empty((n, len(features) + 1), dtype=np.float64)
+    X[:, 0] = np.asarray(compute_times, dtype=np.float64)
+    valid = np.ones(n, dtype=bool)
+
+    for col, (field, kind) in enumerate(features, start=1):
+        if isinstance(results, pd.DataFrame):
+            values = _frame_values(results, field, kind)
+        else:
+            default = FEATURE_DEFAULTS[kind]
+            values = [r.get(field, default) for r in results]
+        X[:, col], ok = _convert(values, kind)
+        valid &= ok
+
+    rows = np.flatnonzero(valid)
+    return FeatureMatrix(X if len(rows) == n else X[rows], rows)
+
+
+def _frame_values(frame: pd.DataFrame, field: str, kind: str) -> list[Any] | np.ndarray:
+    """One DataFrame column as feature inputs, nulls replaced by the default."""
+    default = FEATURE_DEFAULTS[kind]
+    if field not in frame.columns:
+        return [default] * len(frame)
+
+    column = frame[field]
+    if kind == "value" and pd.api.types.is_numeric_dtype(column):
+        return column.fillna(0).to_numpy(dtype=np.float64)
+
+    missing = column.isna().to_numpy()
+    return [default if m else v for v, m in zip(column.tolist(), missing)]
+
+
+def _convert(values: list[Any] | np.ndarray, kind: str) -> tuple[np.ndarray, np.ndarray]:
+    """Convert one column; returns (values, convertible mask)."""
+    n = len(values)
+    if isinstance(values, np.ndarray):
+        return values, np.ones(n, dtype=bool)
+
+    if kind == "value" and None not in values:
+        # np.fromiter applies float() in C; fall back per value on any error
+        try:
+            return np.fromiter(values, dtype=np.float64, count=n), np.ones(n, dtype=bool)
+        except _CONVERSION_ERRORS:
+            pass
+
+    column = np.zeros(n, dtype=np.float64)
+    ok = np.ones(n, dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            column[i] = feature_value(value, kind)
+        except _CONVERSION_ERRORS:
+            ok[i] = False
+    return column, ok
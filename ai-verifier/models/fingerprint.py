@@ -0,0 +1,112 @@
+"""
+Quantized result fingerprints for peer consensus.
+
+Signal and drugscreen tasks run short, seeded, deterministic computations,
+so honest devices computing the same task produce the same numbers up to
+floating-point noise in the last digits. A fingerprint rounds each top-level numeric field to the task
+type's significant digits, orders the fields by name and hashes them.
+Results that agree to that precision share a fingerprint, whatever their
+key order.
+
+Peer agreement then becomes counting: consensus() reduces a set of peer
+fingerprints to (matches, total, top), where matches is the number of peers
+sharing ours, total the number of fingerprinted peers and top the size of
+the largest agreeing group. Counting stops early once no fingerprint can
+reach a majority any more, so peers that all differ cost about half. The peer store keeps those counts per task id,
+so the server-side lookup is O(1).
+
+Fingerprints use blake2b rather than hash(), so they are stable across
+processes (PYTHONHASHSEED) and can be compared between the event loop and
+process-pool workers.
+"""
+
+import hashlib
+from typing import Any, Iterable, Iterator, NamedTuple
+
+_MISSING = object()
+
+
+class Consensus(NamedTuple):
+    """How many peers agree with a result, by fingerprint."""
+    matches: int  # Peers sharing the result's fingerprint
+    total: int    # Fingerprinted peers counted
+    top: int      # Size of the largest group of identical peers
+
+    @property
+    def agrees(self) -> bool:
+        """A strict majority of peers share the result's fingerprint."""
+        return self.matches * 2 > self.total
+
+    @property
+    def disagrees(self) -> bool:
+        """A strict majority of peers (at least two) share a different fingerprint."""
+        return self.top >= 2 and self.top * 2 > self.total and self.matches < self.top
+
+
+def quantize(value: float, digits: int) -> str:
+    """Canonical text of a number rounded to `digits` significant digits."""
+    try:
+        value = float(value) + 0.0  # + 0.0 folds -0.0 into 0.0
+    except OverflowError:  # Ints too large for a double
+        value = float("inf") if value > 0 else float("-inf")
+    return format(value, f".{digits - 1}e")
+
+
+def fingerprint_fields(fields: Iterable[tuple[str, float]], digits: int) -> int | None:
+    """Fingerprint of (field, value) pairs, or None if there are none."""
+    canonical = ";".join(f"{name}={quantize(value, digits)}" for name, value in sorted(fields))
+    if not canonical:
+        return None
+    return int.from_bytes(hashlib.blake2b(canonical.encode(), digest_size=8).digest(), "little")
+
+
+def fingerprint(result: dict[str, Any], digits: int) -> int | None:
+    """Fingerprint of a result's top-level numeric (non-bool) fields."""
+    return fingerprint_fields(
+        (
+            (name, value) for name, value in result.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ),
+        digits,
+    )
+
+
+def peer_fingerprints(peer_results: list[dict[str, Any]], digits: int) -> Iterator[int | None]:
+    """
+    Fingerprints of peer results, lazily. Honest peers of a deterministic task
+    usually send identical results, so each distinct result is hashed once.
+    """
+    seen: dict[tuple, int | None] = {}
+    for result in peer_results:
+        try:
+            key = tuple(result.items())
+            fp = seen.get(key, _MISSING)
+        except TypeError:  # Unhashable values (lists, dicts), e.g. signal peakFrequencies
+            yield fingerprint(result, digits)
+            continue
+        if fp is _MISSING:
+            fp = seen[key] = fingerprint(result, digits)
+        yield fp
+
+
+def consensus(ours: int | None, peers: Iterable[int | None], n_peers: int | None = None) -> Consensus | None:
+    """
+    Agreement of a fingerprint with peer fingerprints (None if either is
+    missing). With n_peers, counting stops once no majority is possible.
+    """
+    if ours is None:
+        return None
+    counts: dict[int, int] = {}
+    seen = counted = top = 0
+    for fp in peers:
+        seen += 1
+        if fp is None:
+            continue
+        count = counts[fp] = counts.get(fp, 0) + 1
+        counted += 1
+        top = max(top, count)
+        if n_peers is not None and 2 * top + (n_peers - seen) <= counted:
+            break
+    if not counted:
+        return None
+    return Consensus(counts.get(ours, 0), counted, top)
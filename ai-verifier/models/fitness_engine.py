@@ -0,0 +1,476 @@
+"""
+Layer 5: fitness workout anomaly engine.
+
+The fitness_verify node only reports booleans about a workout summary. This
+engine checks the workout's raw time series on the server. The streams use
+Strava's names: "time" in seconds from the start, "heartrate" in bpm, and
+cumulative "distance" in metres. It looks for patterns a real body cannot
+produce:
+
+    timeSeriesValid    timestamps that go backwards, distance that shrinks
+    hrPlausible        heart rate outside HR_RANGE, or jumping faster than
+                       MAX_HR_SLOPE between samples
+    paceReasonable     average speed outside the activity's range (the
+                       worker's pace table), time spent above its speed
+                       ceiling, or accelerations beyond MAX_ACCEL
+    hrPaceConsistent   moving fast at a resting heart rate (a phone in a
+                       car), or a heart rate that stays flat while the pace
+                       changes (a synthetic stream)
+    noTimeOverlap      sessions of the same user that overlap in time
+    withinBaseline     pace, average heart rate or duration far from the
+                       user's own history for the activity (median and MAD,
+                       so past outliers do not widen the baseline)
+
+Streams are processed CHUNK_SAMPLES samples at a time. Running sums carry
+between chunks, so a multi-hour workout only holds a few chunk-sized arrays
+at once; "streams" can also be an iterable of chunk dicts. check_many()
+scores a backlog and also finds overlaps between the batch's own workouts.
+Checks whose data is missing pass: a workout without streams is checked on
+its summary (avg_heart_rate, distance_m, duration_min) alone.
+"""
+
+import math
+from datetime import datetime
+from typing import Any, Iterator, NamedTuple
+
+import numpy as np
+
+CHUNK_SAMPLES = 4096
+
+HR_RANGE = (25.0, 230.0)   # bpm
+MAX_HR_SLOPE = 15.0        # bpm per second between samples
+MAX_ACCEL = 6.0            # m/s² between speed samples
+MOVING_SPEED = 0.5         # m/s; slower intervals count as stopped
+MISMATCH_HR = 90.0         # bpm; below this at the activity's mismatch speed is implausible
+FLAT_HR_STD = 1.0          # bpm; a flatter heart rate over varying pace looks synthetic
+FLAT_MIN_MOVING_S = 600.0
+FLAT_MIN_SPEED_STD = 0.3   # m/s
+
+# Share of samples (or moving time) tolerated over a limit: sensors and GPS glitch
+IMPOSSIBLE_FRACTION = 0.02
+MISMATCH_FRACTION = 0.2
+MAX_UNORDERED_FRACTION = 0.01
+
+OVERLAP_TOLERANCE_S = 60.0
+BASELINE_MIN_HISTORY = 3
+BASELINE_MAX_Z = 3.5
+BASELINE_MIN_SCALE = 0.05  # Relative to the median, for users with very regular history
+
+# Average speed range (km/h, as the worker's pace check), instantaneous
+# speed ceiling (m/s), and the speed (m/s) above which a heart rate under
+# MISMATCH_HR is a mismatch (None = not checked)
+ACTIVITY_LIMITS: dict[str, dict[str, Any]] = {
+    "walk": {"speed_kmh": (1.0, 10.0), "max_speed": 4.5, "mismatch_speed": 2.5},
+    "hike": {"speed_kmh": (1.0, 10.0), "max_speed": 4.5, "mismatch_speed": 2.5},
+    "run": {"speed_kmh": (3.0, 30.0), "max_speed": 12.5, "mismatch_speed": 3.5},
+    "cycle": {"speed_kmh": (5.0, 80.0), "max_speed": 30.0, "mismatch_speed": 12.0},
+    "swim": {"speed_kmh": (0.5, 10.0), "max_speed": 2.5, "mismatch_speed": None},
+}
+_DEFAULT_LIMITS = {"speed_kmh": None, "max_speed": 30.0, "mismatch_speed": None}
+
+# Score lost per failed check (score = 1 - sum, floored at 0)
+CHECK_PENALTIES = {
+    "timeSeriesValid": 0.3,
+    "hrPlausible": 0.4,
+    "paceReasonable": 0.4,
+    "hrPaceConsistent": 0.4,
+    "noTimeOverlap": 0.5,
+    "withinBaseline": 0.25,
+}
+
+
+class FitnessReport(NamedTuple):
+    """Outcome of the workout checks."""
+    score: float
+    checks: dict[str, bool]
+    flags: list[str]
+    stats: dict[str, float | None]
+
+
+def _timestamp(value: Any) -> float | None:
+    """Unix seconds from a number or an ISO 8601 string (None if absent)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _array(values: Any) -> np.ndarray | None:
+    if values is None:
+        return None
+    return np.asarray([np.nan if v is None else v for v in values] if isinstance(values, list) else values, float)
+
+
+class _StreamStats:
+    """Running sums over a workout's samples, fed one chunk at a time."""
+
+    def __init__(self, limits: dict[str, Any]):
+        self.limits = limits
+        self.samples = 0
+        self.first_t: float | None = None
+        self.last_t = math.nan
+        self.last_hr = math.nan
+        self.last_d = math.nan
+        self.last_speed = math.nan
+        self.first_d = math.nan
+        self.intervals = 0
+        self.unordered = 0
+        self.distance_backwards = 0
+        self.length_mismatch = False
+        self.hr_count = 0
+        self.hr_sum = 0.0
+        self.hr_out_of_range = 0
+        self.hr_intervals = 0
+        self.hr_jumps = 0
+        self.speed_intervals = 0
+        self.accel_spikes = 0
+        self.moving_s = 0.0
+        self.over_max_s = 0.0
+        self.mismatch_s = 0.0
+        # Moving intervals with a heart rate: sums of speed (x) and HR (y),
+        # shifted by the first values seen to keep the variances accurate
+        self.shift: tuple[float, float] | None = None
+        self.n_xy = 0
+        self.sx = self.sy = self.sxx = self.syy = 0.0
+
+    def update(self, t: np.ndarray, hr: np.ndarray | None, d: np.ndarray | None):
+        """Add one chunk of aligned samples (hr and d may be None)."""
+        n = len(t)
+        if n == 0:
+            return
+        if self.first_t is None:
+            self.first_t = float(t[0])
+        self.samples += n
+
+        # Intervals from the previous chunk's last sample through this chunk
+        dt = np.diff(t, prepend=self.last_t)
+        ordered = dt > 0
+        self.intervals += int(np.count_nonzero(~np.isnan(dt)))
+        self.unordered += int(np.count_nonzero(dt <= 0))
+        dt_ok = np.where(ordered, dt, np.nan)
+        self.last_t = float(t[-1])
+
+        hr_end = None
+        if hr is not None:
+            known = ~np.isnan(hr)
+            self.hr_count += int(np.count_nonzero(known))
+            self.hr_sum += float(hr[known].sum())
+            low, high = HR_RANGE
+            self.hr_out_of_range += int(np.count_nonzero((hr[known] < low) | (hr[known] > high)))
+            slope = np.abs(np.diff(hr, prepend=self.last_hr)) / dt_ok
+            measured = ~np.isnan(slope)
+            self.hr_intervals += int(np.count_nonzero(measured))
+            self.hr_jumps += int(np.count_nonzero(slope[measured] > MAX_HR_SLOPE))
+            self.last_hr = float(hr[-1])
+            hr_end = hr
+
+        if d is None:
+            return
+        if math.isnan(self.first_d):
+            known_d = d[~np.isnan(d)]
+            if len(known_d):
+                self.first_d = float(known_d[0])
+        dd = np.diff(d, prepend=self.last_d)
+        self.distance_backwards += int(np.count_nonzero(dd < 0))
+        speed = np.where(dd >= 0, dd, np.nan) / dt_ok
+        measured = ~np.isnan(speed)
+        self.speed_intervals += int(np.count_nonzero(measured))
+        accel = np.abs(np.diff(speed, prepend=self.last_speed)) / dt_ok
+        self.accel_spikes += int(np.count_nonzero(accel[~np.isnan(accel)] > MAX_ACCEL))
+        self.last_d = float(d[-1])
+        self.last_speed = float(speed[-1])
+
+        moving = measured & (speed > MOVING_SPEED)
+        self.moving_s += float(dt_ok[moving].sum())
+        self.over_max_s += float(dt_ok[moving & (speed > self.limits["max_speed"])].sum())
+        if hr_end is None:
+            return
+        paired = moving & ~np.isnan(hr_end)
+        mismatch_speed = self.limits["mismatch_speed"]
+        if mismatch_speed is not None:
+            slow_heart = paired & (speed > mismatch_speed) & (hr_end < MISMATCH_HR)
+            self.mismatch_s += float(dt_ok[slow_heart].sum())
+        if paired.any():
+            x, y = speed[paired], hr_end[paired]
+            if self.shift is None:
+                self.shift = (float(x[0]), float(y[0]))
+            x, y = x - self.shift[0], y - self.shift[1]
+            self.n_xy += len(x)
+            self.sx += float(x.sum())
+            self.sy += float(y.sum())
+            self.sxx += float(x @ x)
+            self.syy += float(y @ y)
+
+    @property
+    def duration_s(self) -> float | None:
+        return None if self.first_t is None else self.last_t - self.first_t
+
+    @property
+    def distance_m(self) -> float | None:
+        if math.isnan(self.first_d) or math.isnan(self.last_d):
+            return None
+        return self.last_d - self.first_d
+
+    @property
+    def avg_hr(self) -> float | None:
+        return self.hr_sum / self.hr_count if self.hr_count else None
+
+    def moving_stds(self) -> tuple[float, float]:
+        """Standard deviations of speed and heart rate over moving intervals."""
+        if not self.n_xy:
+            return 0.0, 0.0
+        n = self.n_xy
+        var_x = max(0.0, self.sxx / n - (self.sx / n) ** 2)
+        var_y = max(0.0, self.syy / n - (self.sy / n) ** 2)
+        return math.sqrt(var_x), math.sqrt(var_y)
+
+
+class FitnessEngine:
+    """Checks raw workout streams for physiologically impossible patterns."""
+
+    def __init__(self, chunk_samples: int = CHUNK_SAMPLES):
+        self.chunk_samples = max(2, chunk_samples)
+
+    def check(self, workout: dict[str, Any], overlaps_batch: bool = False) -> FitnessReport:
+        """
+        Score one workout:
+
+            {
+                "activity_type": "run",
+                "start_time": unix seconds or ISO 8601,
+                "streams": {"time": [...], "heartrate": [...], "distance": [...]}
+                           or an iterable of such chunks,
+                "avg_heart_rate", "distance_m", "duration_min": summary fallbacks,
+                "sessions": [{"start", "end"}, ...] other sessions of the user,
+                "history": [{"activity_type", "duration_min", "avg_heart_rate",
+                             "distance_m"}, ...] the user's past workouts,
+            }
+
+        `overlaps_batch` marks a workout check_many() found overlapping
+        another workout of the same batch.
+        """
+        activity = str(workout.get("activity_type") or "").lower()
+        limits = ACTIVITY_LIMITS.get(activity, _DEFAULT_LIMITS)
+        checks = dict.fromkeys(CHECK_PENALTIES, True)
+        flags: list[str] = []
+
+        stream = self._scan_streams(workout.get("streams"), limits)
+        duration_s = stream.duration_s
+        if duration_s is None and workout.get("duration_min") is not None:
+            duration_s = float(workout["duration_min"]) * 60.0
+        distance_m = stream.distance_m if stream.distance_m is not None else workout.get("distance_m")
+        avg_hr = stream.avg_hr if stream.avg_hr is not None else workout.get("avg_heart_rate")
+
+        # Time series structure
+        if stream.length_mismatch:
+            checks["timeSeriesValid"] = False
+            flags.append("Workout streams have different lengths")
+        if stream.intervals and stream.unordered > MAX_UNORDERED_FRACTION * stream.intervals:
+            checks["timeSeriesValid"] = False
+            flags.append(f"Timestamps not increasing at {stream.unordered}/{stream.intervals} samples")
+        if stream.distance_backwards:
+            checks["timeSeriesValid"] = False
+            flags.append(f"Distance decreases at {stream.distance_backwards} samples")
+
+        # Heart rate
+        if stream.hr_count:
+            if stream.hr_out_of_range > IMPOSSIBLE_FRACTION * stream.hr_count:
+                checks["hrPlausible"] = False
+                flags.append(
+                    f"Heart rate outside {HR_RANGE[0]:.0f}-{HR_RANGE[1]:.0f} bpm "
+                    f"at {stream.hr_out_of_range}/{stream.hr_count} samples"
+                )
+            if stream.hr_intervals and stream.hr_jumps > IMPOSSIBLE_FRACTION * stream.hr_intervals:
+                checks["hrPlausible"] = False
+                flags.append(f"Heart rate jumps over {MAX_HR_SLOPE:.0f} bpm/s at {stream.hr_jumps} samples")
+        elif avg_hr is not None and not HR_RANGE[0] <= avg_hr <= HR_RANGE[1]:
+            checks["hrPlausible"] = False
+            flags.append(f"Average heart rate implausible: {avg_hr:.0f} bpm")
+
+        # Pace
+        speed_range = limits["speed_kmh"]
+        if speed_range is not None and distance_m and duration_s and distance_m > 0 and duration_s > 0:
+            speed_kmh = distance_m / 1000.0 / (duration_s / 3600.0)
+            if not speed_range[0] <= speed_kmh <= speed_range[1]:
+                checks["paceReasonable"] = False
+                flags.append(f"Average speed {speed_kmh:.1f} km/h outside {speed_range[0]:g}-{speed_range[1]:g} for {activity}")
+        if stream.moving_s and stream.over_max_s > IMPOSSIBLE_FRACTION * stream.moving_s:
+            checks["paceReasonable"] = False
+            flags.append(f"Speed over {limits['max_speed']:g} m/s for {stream.over_max_s:.0f} s")
+        if stream.speed_intervals and stream.accel_spikes > IMPOSSIBLE_FRACTION * stream.speed_intervals:
+            checks["paceReasonable"] = False
+            flags.append(f"Acceleration over {MAX_ACCEL:g} m/s² at {stream.accel_spikes} samples")
+
+        # Pace against heart rate
+        if stream.moving_s and stream.mismatch_s > MISMATCH_FRACTION * stream.moving_s:
+            checks["hrPaceConsistent"] = False
+            flags.append(
+                f"Heart rate under {MISMATCH_HR:.0f} bpm while moving over "
+                f"{limits['mismatch_speed']:g} m/s for {stream.mismatch_s:.0f} s"
+            )
+        speed_std, hr_std = stream.moving_stds()
+        if stream.moving_s >= FLAT_MIN_MOVING_S and speed_std > FLAT_MIN_SPEED_STD and hr_std < FLAT_HR_STD:
+            checks["hrPaceConsistent"] = False
+            flags.append(f"Heart rate flat (σ {hr_std:.2f} bpm) while pace varies (σ {speed_std:.2f} m/s)")
+
+        # Other sessions of the user
+        start = _timestamp(workout.get("start_time"))
+        overlapping = overlaps_batch
+        sessions = workout.get("sessions")
+        if start is not None and duration_s and sessions:
+            starts = np.array([_timestamp(s["start"]) for s in sessions], float)
+            ends = np.array([_timestamp(s["end"]) for s in sessions], float)
+            end = start + duration_s
+            overlapping |= bool(np.any(
+                (starts < end - OVERLAP_TOLERANCE_S) & (ends > start + OVERLAP_TOLERANCE_S)
+            ))
+        if overlapping:
+            checks["noTimeOverlap"] = False
+            flags.append("Workout overlaps another session of the same user")
+
+        # The user's own baseline
+        deviations = _baseline_deviations(workout.get("history"), activity, duration_s, distance_m, avg_hr)
+        if deviations:
+            checks["withinBaseline"] = False
+            flags.append(f"Outside the user's {activity} baseline: {', '.join(deviations)}")
+
+        score = max(0.0, 1.0 - sum(CHECK_PENALTIES[name] for name, ok in checks.items() if not ok))
+        return FitnessReport(
+            score=round(score, 4),
+            checks=checks,
+            flags=flags,
+            stats={
+                "samples": stream.samples,
+                "duration_s": duration_s,
+                "distance_m": distance_m,
+                "moving_s": round(stream.moving_s, 1),
+                "avg_heart_rate": round(avg_hr, 1) if avg_hr is not None else None,
+            },
+        )
+
+    def check_many(self, workouts: list[dict[str, Any]]) -> list[FitnessReport]:
+        """Score a backlog of workouts, including overlaps between them (per "user_id")."""
+        overlapping = _batch_overlaps(workouts)
+        return [self.check(workout, bool(flag)) for workout, flag in zip(workouts, overlapping)]
+
+    def _scan_streams(self, streams: Any, limits: dict[str, Any]) -> _StreamStats:
+        stats = _StreamStats(limits)
+        if not streams:
+            return stats
+        chunks = [streams] if isinstance(streams, dict) else streams
+        if isinstance(chunks, (str, bytes)) or not hasattr(chunks, "__iter__"):
+            raise ValueError(f"streams must be an object or a list of objects, got {type(streams).__name__}")
+        for chunk in chunks:
+            if not isinstance(chunk, dict):
+                raise ValueError(f"streams chunks must be objects, got {type(chunk).__name__}")
+            for t, hr, d, mismatched in self._split(chunk):
+                stats.length_mismatch |= mismatched
+                stats.update(t, hr, d)
+        return stats
+
+    def _split(self, chunk: dict[str, Any]) -> Iterator[tuple]:
+        """Aligned CHUNK_SAMPLES-sized slices of one chunk's streams."""
+        t = _array(chunk.get("time"))
+        if t is None or len(t) == 0:
+            return
+        hr, d = _array(chunk.get("heartrate")), _array(chunk.get("distance"))
+        lengths = [len(a) for a in (t, hr, d) if a is not None]
+        n = min(lengths)
+        mismatched = len(set(lengths)) > 1
+        for start in range(0, n, self.chunk_samples):
+            stop = min(n, start + self.chunk_samples)
+            yield (
+                t[start:stop],
+                hr[start:stop] if hr is not None else None,
+                d[start:stop] if d is not None else None,
+                mismatched,
+            )
+
+
+def _batch_overlaps(workouts: list[dict[str, Any]]) -> np.ndarray:
+    """Per workout, whether it overlaps another workout of the same user in the batch."""
+    n = len(workouts)
+    overlapping = np.zeros(n, bool)
+    rows, users, starts, ends = [], [], [], []
+    for i, workout in enumerate(workouts):
+        start = _timestamp(workout.get("start_time"))
+        duration_s = _workout_duration_s(workout)
+        if workout.get("user_id") is None or start is None or not duration_s:
+            continue
+        rows.append(i)
+        users.append(str(workout["user_id"]))
+        starts.append(start)
+        ends.append(start + duration_s)
+    if len(rows) < 2:
+        return overlapping
+
+    _, user_codes = np.unique(users, return_inverse=True)
+    starts_a, ends_a = np.array(starts), np.array(ends)
+    # Offset each user's times into a disjoint range, so a single running
+    # max over the sorted sessions never crosses from one user to the next
+    origin = starts_a.min()
+    span = ends_a.max() - origin + 1.0
+    start_key = starts_a - origin + user_codes * span
+    end_key = ends_a - origin + user_codes * span
+    order = np.lexsort((start_key, user_codes))
+    start_key, end_key = start_key[order], end_key[order]
+
+    latest_end = np.maximum.accumulate(end_key)
+    later = np.zeros(len(order), bool)
+    later[1:] = start_key[1:] < latest_end[:-1] - OVERLAP_TOLERANCE_S
+    earlier = np.zeros(len(order), bool)
+    earlier[:-1] = start_key[1:] < end_key[:-1] - OVERLAP_TOLERANCE_S
+    overlapping[np.asarray(rows)[order]] = later | earlier
+    return overlapping
+
+
+def _workout_duration_s(workout: dict[str, Any]) -> float | None:
+    """Duration from the time stream's span, else the summary."""
+    streams = workout.get("streams")
+    if isinstance(streams, dict) and streams.get("time"):
+        times = streams["time"]
+        return float(times[-1]) - float(times[0])
+    if workout.get("duration_min") is not None:
+        return float(workout["duration_min"]) * 60.0
+    return None
+
+
+def _baseline_deviations(
+    history: list[dict[str, Any]] | None,
+    activity: str,
+    duration_s: float | None,
+    distance_m: float | None,
+    avg_hr: float | None,
+) -> list[str]:
+    """Metrics of this workout more than BASELINE_MAX_Z robust deviations from the user's history."""
+    if not history:
+        return []
+    same = [h for h in history if str(h.get("activity_type") or "").lower() == activity]
+    if len(same) < BASELINE_MIN_HISTORY:
+        return []
+
+    def column(key: str) -> np.ndarray:
+        return np.array([np.nan if h.get(key) is None else float(h[key]) for h in same])
+
+    durations = column("duration_min")
+    distances = column("distance_m")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paces = np.where(distances > 0, durations / (distances / 1000.0), np.nan)  # min/km
+    current = {
+        "duration": duration_s / 60.0 if duration_s else None,
+        "pace": duration_s / 60.0 / (distance_m / 1000.0) if duration_s and distance_m and distance_m > 0 else None,
+        "heart rate": avg_hr,
+    }
+    past = {"duration": durations, "pace": paces, "heart rate": column("avg_heart_rate")}
+
+    deviations = []
+    for name, value in current.items():
+        values = past[name][~np.isnan(past[name])]
+        if value is None or len(values) < BASELINE_MIN_HISTORY:
+            continue
+        median = float(np.median(values))
+        scale = max(1.4826 * float(np.median(np.abs(values - median))), BASELINE_MIN_SCALE * abs(median))
+        if scale > 0 and abs(value - median) / scale > BASELINE_MAX_Z:
+            deviations.append(f"{name} {value:.1f} vs median {median:.1f}")
+    return deviations
@@ -0,0 +1,340 @@
+"""
+Per-task-type Isolation Forest registry.
+
+Each task type has its own artifact at models/trained/<task_type>.joblib,
+because protein, climate, signal and drugscreen feature columns mean
+completely different things. Models load lazily on first use and can be
+replaced one task type at a time, so retraining protein never touches the
+climate model that requests are scoring with.
+
+If a task type has no artifact yet, the legacy shared MODEL_PATH model is
+used as a fallback.
+
+Reloads never mutate what requests are using. A new model is loaded into a
+LoadedModel snapshot off to the side, and only then is the registry's
+task_type -> snapshot map replaced in one assignment. Each snapshot carries
+a version (content hash of the artifact), so a half-written file is detected
+and the previous model keeps serving. Artifacts are published with
+publish_model(), which writes to a temporary file and renames it into place.
+
+With MODEL_MMAP enabled, compiled forests are cached next to the artifacts
+as compiled/<version>.joblib and memory-mapped, so every worker
+process shares one copy of the node arrays.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, NamedTuple
+
+import joblib
+
+from config import MODEL_DIR, MODEL_PATH, ML_SCORER, MODEL_MMAP
+from models.compiled_forest import CompiledIsolationForest
+
+logger = logging.getLogger(__name__)
+
+_SHARED = "__shared__"
+
+
+class LoadedModel(NamedTuple):
+    """An immutable, versioned model snapshot."""
+    model: Any
+    version: str        # Content hash of the artifact
+    path: str
+    signature: tuple    # (mtime_ns, size) of the artifact when loaded
+    loaded_at: float    # Unix time
+    load_seconds: float
+
+
+def model_path_for(task_type: str, model_dir: str = MODEL_DIR) -> str:
+    """Artifact path for one task type's model."""
+    return os.path.join(model_dir, f"{task_type}.joblib")
+
+
+def artifact_version(path: str) -> str:
+    """Content hash of an artifact file (first 12 hex chars of SHA-256)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def publish_model(model: Any, path: str) -> str:
+    """
+    Atomically write a model artifact and return its version.
+
+    The model is dumped to a temporary file in the same directory and renamed
+    over the target, so readers see either the old or the new artifact.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        joblib.dump(model, tmp_path)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return artifact_version(path)
+
+
+def _file_signature(path: str) -> tuple:
+    """Cheap change detector for an artifact file."""
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ModelRegistry:
+    """Lazily loaded, independently replaceable models keyed by task type."""
+
+    def __init__(
+        self,
+        model_dir: str = MODEL_DIR,
+        fallback_path: str | None = MODEL_PATH,
+        mmap: bool = MODEL_MMAP,
+    ):
+        self.model_dir = model_dir
+        self.fallback_path = fallback_path
+        self.mmap = mmap
+        # task_type -> snapshot, or None when no artifact exists. Replaced
+        # wholesale (copy-on-write), never mutated in place.
+        self._models: dict[str, LoadedModel | None] = {}
+        # task_type -> last load error, kept until a load succeeds
+        self.errors: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, task_type: str) -> Any:
+        """Return the model for a task type, loading it on first use."""
+        entry = self.entry(task_type)
+        return entry.model if entry is not None else None
+
+    def entry(self, task_type: str) -> LoadedModel | None:
+        """Return the snapshot for a task type, loading it on first use."""
+        models = self._models
+        if task_type in models:
+            return models[task_type]
+
+        with self._lock:
+            if task_type not in self._models:
+                updates: dict[str, LoadedModel | None] = {}
+                updates[task_type] = self._resolve(task_type, updates)
+                self._swap(updates)
+            return self._models[task_type]
+
+    def reload(self, task_type: str | None = None) -> dict[str, str | None]:
+        """
+        Reload one task type's model, or every loaded model.
+
+        New snapshots are built before anything is swapped; a failed load
+        keeps the previous snapshot serving. Returns task_type -> version
+        (None when no artifact exists) for every type reloaded.
+        """
+        with self._lock:
+            task_types = [task_type] if task_type is not None else list(self._models)
+
+            updates: dict[str, LoadedModel | None] = {}
+            for name in task_types:
+                if name != _SHARED:
+                    updates[name] = self._resolve(name, updates, reload=True)
+
+            self._swap(updates)
+            if self.mmap:
+                self._prune_compiled_cache()
+            return {
+                name: entry.version if entry is not None else None
+                for name, entry in updates.items()
+                if name != _SHARED
+            }
+
+    def versions(self) -> dict[str, str | None]:
+        """Model version currently serving each looked-up task type."""
+        return {
+            task_type: entry.version if entry is not None else None
+            for task_type, entry in self._models.items()
+            if task_type != _SHARED
+        }
+
+    def snapshots(self) -> dict[str, LoadedModel]:
+        """Snapshot serving each looked-up task type that has a model."""
+        return {
+            task_type: entry
+            for task_type, entry in self._models.items()
+            if task_type != _SHARED and entry is not None
+        }
+
+    def loaded(self) -> dict[str, bool]:
+        """Which task types have been looked up, and whether a model was found."""
+        return {task_type: version is not None for task_type, version in self.versions().items()}
+
+    def has_any_model(self) -> bool:
+        """True if at least one per-type or shared artifact exists on disk."""
+        if self.fallback_path and os.path.exists(self.fallback_path):
+            return True
+        if not os.path.isdir(self.model_dir):
+            return False
+        return any(name.endswith(".joblib") for name in os.listdir(self.model_dir))
+
+    def artifact_signatures(self) -> dict[str | None, tuple]:
+        """
+        (mtime_ns, size) of every artifact on disk, keyed by task type.
+
+        The shared fallback is keyed by None, since replacing it affects every
+        task type without its own artifact.
+        """
+        return {task_type: _file_signature(path) for task_type, path in self._artifact_paths().items()}
+
+    def _artifact_paths(self) -> dict[str | None, str]:
+        """Path of every artifact on disk, keyed like artifact_signatures()."""
+        paths: dict[str | None, str] = {}
+        if self.fallback_path and os.path.exists(self.fallback_path):
+            paths[None] = self.fallback_path
+        if os.path.isdir(self.model_dir):
+            for name in os.listdir(self.model_dir):
+                path = os.path.join(self.model_dir, name)
+                task_type, ext = os.path.splitext(name)
+                if ext == ".joblib" and path != self.fallback_path:
+                    paths[task_type] = path
+        return paths
+
+    def _swap(self, updates: dict[str, LoadedModel | None]):
+        """Publish a new task_type -> snapshot map in one assignment."""
+        self._models = {**self._models, **updates}
+
+    def _resolve(
+        self,
+        task_type: str,
+        updates: dict[str, LoadedModel | None],
+        reload: bool = False,
+    ) -> LoadedModel | None:
+        """
+        Snapshot for a task type: its own artifact, else the shared fallback.
+
+        A (re)loaded shared fallback is added to `updates` so it is swapped in
+        together with the task types that use it.
+        """
+        view = {**self._models, **updates}
+        path = model_path_for(task_type, self.model_dir)
+        if os.path.exists(path):
+            if reload:
+                return self._reload_entry(task_type, path, view.get(task_type))
+            return self._load_entry(task_type, path, None)
+
+        # Shared model is loaded once and reused by every type without its own
+        if _SHARED not in view or (reload and _SHARED not in updates):
+            updates[_SHARED] = self._reload_entry(_SHARED, self.fallback_path, view.get(_SHARED))
+        return updates[_SHARED] if _SHARED in updates else view[_SHARED]
+
+    def _reload_entry(
+        self,
+        task_type: str,
+        path: str | None,
+        previous: LoadedModel | None,
+    ) -> LoadedModel | None:
+        """Load a fresh snapshot, keeping the current one if unchanged or if loading fails."""
+        if previous is not None and path == previous.path and os.path.exists(path):
+            if _file_signature(path) == previous.signature:
+                return previous  # Unchanged on disk
+        return self._load_entry(task_type, path, previous)
+
+    def _load_entry(
+        self,
+        task_type: str,
+        path: str | None,
+        previous: LoadedModel | None,
+    ) -> LoadedModel | None:
+        """Load one artifact into a snapshot, or keep `previous` on failure."""
+        if not path or not os.path.exists(path):
+            return None
+
+        start = time.perf_counter()
+        try:
+            signature = _file_signature(path)
+            version = artifact_version(path)
+            model = self._prepare(joblib.load(path), version)
+            # The file was replaced while we were reading it: don't trust it
+            if _file_signature(path) != signature:
+                raise RuntimeError("artifact changed during load")
+        except Exception as e:
+            self.errors[task_type] = f"{type(e).__name__}: {e}"
+            logger.warning("Failed to load model %s from %s: %s", task_type, path, e)
+            return previous
+
+        self.errors.pop(task_type, None)
+        return LoadedModel(
+            model=model,
+            version=version,
+            path=path,
+            signature=signature,
+            loaded_at=time.time(),
+            load_seconds=time.perf_counter() - start,
+        )
+
+    def _prepare(self, model: Any, version: str) -> Any:
+        """Compile the forest into flat arrays unless the sklearn scorer is selected."""
+        if ML_SCORER != "compiled":
+            return model
+        try:
+            # train.py --tune may have picked float32 thresholds for this artifact
+            compiled = CompiledIsolationForest.from_sklearn(
+                model, threshold_dtype=getattr(model, "compiled_threshold_dtype_", "float64"),
+            )
+        except (AttributeError, TypeError, ValueError):
+            return model  # Not an IsolationForest we can compile, score with it directly
+
+        if not self.mmap:
+            return compiled
+
+        # Share node arrays across worker processes through the page cache
+        cache_path = os.path.join(self.model_dir, "compiled", f"{version}.joblib")
+        try:
+            if not os.path.exists(cache_path):
+                publish_model(compiled._state(), cache_path)
+            return CompiledIsolationForest.load(cache_path, mmap_mode="r")
+        except OSError:
+            return compiled  # Cache pruned or unwritable: score from memory
+
+    def _prune_compiled_cache(self):
+        """
+        Delete compiled caches of versions older than every published artifact.
+
+        Other worker processes share the cache directory and may still be
+        loading any version compiled since the oldest published one was, so
+        only caches written before that are removed. Published versions and
+        versions this process serves are always kept.
+        """
+        cache_dir = os.path.join(self.model_dir, "compiled")
+        if not os.path.isdir(cache_dir):
+            return
+        published = set()
+        for path in self._artifact_paths().values():
+            try:
+                published.add(artifact_version(path))
+            except OSError:
+                return  # Artifact replaced mid-scan: prune on the next reload
+        keep = published | {entry.version for entry in self._models.values() if entry is not None}
+
+        def mtime(version: str) -> float | None:
+            try:
+                return os.path.getmtime(os.path.join(cache_dir, f"{version}.joblib"))
+            except OSError:
+                return None
+
+        published_at = [t for t in map(mtime, published) if t is not None]
+        if not published_at:
+            return
+        cutoff = min(published_at)
+        for name in os.listdir(cache_dir):
+            version, ext = os.path.splitext(name)
+            if ext != ".joblib" or version in keep:
+                continue
+            written = mtime(version)
+            if written is not None and written < cutoff:
+                try:
+                    os.remove(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
@@ -0,0 +1,135 @@
+"""
+In-memory per-task peer result store.
+
+Instead of every /verify call resending (and re-flattening) the full list of
+peer results, the service keeps running statistics per task id. Each
+verified result updates a Welford mean/variance per numeric field, so a
+consistency check costs O(fields) no matter how many devices have submitted
+the same task. Alongside, each task counts the results per quantized
+fingerprint (models/fingerprint.py), so whether a result matches the peer
+consensus is a single dict lookup.
+
+Tasks expire after a TTL and the least recently used tasks are evicted once
+the store is full, so memory stays bounded.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from config import PEER_STORE_MAX_TASKS, PEER_STORE_TTL_S
+from models.fingerprint import Consensus
+from models.task_specs import _to_float
+
+
+class _TaskPeers:
+    """Running statistics for one task's submitted results."""
+
+    __slots__ = ("fields", "count", "fingerprints", "fingerprinted", "top", "updated_at")
+
+    def __init__(self):
+        # field -> [n, mean, M2]
+        self.fields: dict[str, list[float]] = {}
+        self.count = 0
+        # fingerprint -> results, their total and the largest such count
+        self.fingerprints: dict[int, int] = {}
+        self.fingerprinted = 0
+        self.top = 0
+        self.updated_at = 0.0
+
+    def add(self, values: dict[str, float]):
+        """Welford update with one result's numeric fields."""
+        for field, x in values.items():
+            stats = self.fields.get(field)
+            if stats is None:
+                stats = self.fields[field] = [0, 0.0, 0.0]
+            stats[0] += 1
+            delta = x - stats[1]
+            stats[1] += delta / stats[0]
+            stats[2] += delta * (x - stats[1])
+        self.count += 1
+
+    def add_fingerprint(self, fingerprint: int):
+        count = self.fingerprints.get(fingerprint, 0) + 1
+        self.fingerprints[fingerprint] = count
+        self.fingerprinted += 1
+        self.top = max(self.top, count)
+
+    def summary(self) -> dict[str, tuple[int, float, float]]:
+        """field -> (n, mean, population std)."""
+        return {
+            field: (int(n), mean, math.sqrt(m2 / n))
+            for field, (n, mean, m2) in self.fields.items()
+        }
+
+
+def numeric_fields(result: dict[str, Any]) -> dict[str, float]:
+    """Top-level finite numeric (non-bool) fields of a result (ints past a double are skipped)."""
+    values = (
+        (k, _to_float(v)) for k, v in result.items()
+        if isinstance(v, (int, float)) and not isinstance(v, bool)
+    )
+    return {k: v for k, v in values if math.isfinite(v)}
+
+
+class PeerStore:
+    """Per-task running statistics with TTL and LRU eviction."""
+
+    def __init__(self, max_tasks: int = PEER_STORE_MAX_TASKS, ttl_s: float = PEER_STORE_TTL_S):
+        self.max_tasks = max_tasks
+        self.ttl_s = ttl_s
+        self._tasks: OrderedDict[str, _TaskPeers] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def add(self, task_id: str, result: dict[str, Any], fingerprint: int | None = None):
+        """Fold one verified result (and its fingerprint) into its task's running statistics."""
+        values = numeric_fields(result)
+        now = time.monotonic()
+        with self._lock:
+            peers = self._tasks.get(task_id)
+            if peers is None or now - peers.updated_at > self.ttl_s:
+                peers = _TaskPeers()
+                self._tasks[task_id] = peers
+            peers.add(values)
+            if fingerprint is not None:
+                peers.add_fingerprint(fingerprint)
+            peers.updated_at = now
+            self._tasks.move_to_end(task_id)
+            self._evict(now)
+
+    def stats(self, task_id: str) -> dict[str, tuple[int, float, float]] | None:
+        """Running (n, mean, std) per field for a task, or None if unknown."""
+        now = time.monotonic()
+        with self._lock:
+            peers = self._tasks.get(task_id)
+            if peers is None:
+                return None
+            if now - peers.updated_at > self.ttl_s:
+                del self._tasks[task_id]
+                return None
+            self._tasks.move_to_end(task_id)
+            return peers.summary()
+
+    def consensus(self, task_id: str, fingerprint: int | None) -> Consensus | None:
+        """Agreement of a fingerprint with the task's stored results, or None if unknown."""
+        if fingerprint is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            peers = self._tasks.get(task_id)
+            if peers is None or not peers.fingerprinted or now - peers.updated_at > self.ttl_s:
+                return None
+            return Consensus(peers.fingerprints.get(fingerprint, 0), peers.fingerprinted, peers.top)
+
+    def _evict(self, now: float):
+        """Drop expired tasks from the LRU end, then trim to max_tasks."""
+        while self._tasks:
+            task_id, peers = next(iter(self._tasks.items()))
+            if now - peers.updated_at <= self.ttl_s and len(self._tasks) <= self.max_tasks:
+                break
+            del self._tasks[task_id]
@@ -0,0 +1,175 @@
+"""
+Cost-ordered verification layers with early exit and deadlines.
+
+The confidence of a result is a weighted average of layer scores, and the
+recommendation only depends on which side of the accept and review
+thresholds it lands. A Layer declares its weight (weights sum to 1), its
+cost, and the range its score can take for each row before it runs (a layer
+with nothing to check scores exactly 1.0). Layers run cheapest first over a
+task-type group. Before each layer, every row still open gets the bounds of
+its final confidence: the scores so far plus each remaining layer's
+weighted range. The row is closed early in two cases:
+
+    decided   both bounds give the same recommendation, so no remaining
+              layer can change it
+    deadline  the row's deadline (time.monotonic()) leaves less than the
+              layer's declared cost; the cheapest layer always runs
+
+The confidence of a row whose layers were skipped assumes the skipped
+layers would have agreed with the ones that ran. It is the average over
+the layers that ran, clamped to the row's bounds, so a decided row keeps
+its recommendation. A row cut short by its deadline is still undecided,
+so it is never accepted on a partial check: recommendation() caps it at
+review. Which layers ran and which were skipped (and why) is reported per
+row.
+"""
+
+import math
+import time
+from typing import Any, Callable, NamedTuple
+
+SKIP_DECIDED = "decided"
+SKIP_DEADLINE = "deadline"
+
+
+class LayerGroup(NamedTuple):
+    """A task-type group of results as the layers see it."""
+    task_type: str
+    plan: Any                 # TaskPlan
+    items: list[dict[str, Any]]
+    scans: list[Any]          # ScanResult per item
+    flags: list[list[str]]
+
+
+class Layer(NamedTuple):
+    """One verification layer."""
+    name: str
+    weight: float
+    # Expected ms to score a row; orders the layers and gates them on deadlines
+    cost_ms: float
+    # (group, rows) -> scores in [0, 1] for those rows
+    score: Callable[[LayerGroup, list[int]], Any]
+    # group -> (lowest, highest) score before running: floats, or lists per row (default: 0, 1)
+    score_range: Callable[[LayerGroup], tuple[Any, Any]] | None = None
+
+
+class PipelineResult(NamedTuple):
+    """Scores of a group after the pipeline ran."""
+    confidences: list[float]
+    scores: dict[str, list[float]]        # Layer -> score per row (NaN where skipped)
+    skipped: dict[str, list[str | None]]  # Layer -> skip reason per row (None = ran)
+    undecided: list[bool]                 # Rows cut short before their recommendation was decided
+
+
+class LayerPipeline:
+    """Runs layers cheapest first, closing rows once decided or out of time."""
+
+    def __init__(
+        self,
+        layers: list[Layer],
+        accept: float,
+        review: float,
+        early_exit: bool = True,
+    ):
+        self.layers = sorted(layers, key=lambda layer: layer.cost_ms)
+        self.accept = accept
+        self.review = review
+        self.early_exit = early_exit
+
+    def recommendation(self, confidence: float, undecided: bool = False) -> str:
+        if confidence >= self.accept:
+            return "review" if undecided else "accept"
+        if confidence >= self.review:
+            return "review"
+        return "reject"
+
+    def run(
+        self,
+        group: LayerGroup,
+        deadlines: list[float] | None = None,
+        timings: list[tuple[str, str, float]] | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> PipelineResult:
+        """
+        Score a group; `deadlines` holds time.monotonic() deadlines per row
+        (inf = none). Rows are tracked in plain lists: groups are small, and
+        per-row arithmetic beats NumPy's per-call overhead at these sizes.
+        """
+        n = len(group.items)
+        ranges = [self._range(layer, group, n) for layer in self.layers]
+        # Weighted score bounds of the layers not yet run
+        pending_lo = [0.0] * n
+        pending_hi = [0.0] * n
+        for layer, (lo, hi) in zip(self.layers, ranges):
+            for row in range(n):
+                pending_lo[row] += layer.weight * lo[row]
+                pending_hi[row] += layer.weight * hi[row]
+        partial = [0.0] * n      # Weighted scores of the layers run
+        ran_weight = [0.0] * n
+        skipped_lo = [0.0] * n   # Weighted score bounds of the layers skipped
+        skipped_hi = [0.0] * n
+        reasons: list[str | None] = [None] * n
+        scores: dict[str, list[float]] = {}
+        skipped: dict[str, list[str | None]] = {}
+
+        for layer, (lo, hi) in zip(self.layers, ranges):
+            weight = layer.weight
+            now = time.monotonic() if deadlines is not None else 0.0
+            rows = []
+            for row in range(n):
+                if reasons[row] is not None:
+                    continue
+                if self.early_exit and self._band(partial[row] + pending_lo[row]) == self._band(
+                    partial[row] + pending_hi[row]
+                ):
+                    reasons[row] = SKIP_DECIDED
+                elif deadlines is not None and ran_weight[row] and deadlines[row] - now < layer.cost_ms / 1000.0:
+                    reasons[row] = SKIP_DEADLINE
+                else:
+                    rows.append(row)
+
+            layer_scores = [math.nan] * n
+            if rows:
+                start = clock()
+                values = layer.score(group, rows)
+                if timings is not None:
+                    timings.append((layer.name, group.task_type, clock() - start))
+                for row, value in zip(rows, values.tolist() if hasattr(values, "tolist") else values):
+                    layer_scores[row] = value
+                    partial[row] += weight * value
+                    ran_weight[row] += weight
+
+            for row in range(n):
+                pending_lo[row] -= weight * lo[row]
+                pending_hi[row] -= weight * hi[row]
+                if reasons[row] is not None:
+                    skipped_lo[row] += weight * lo[row]
+                    skipped_hi[row] += weight * hi[row]
+            scores[layer.name] = layer_scores
+            skipped[layer.name] = list(reasons)
+
+        # Rows with skipped layers: average of the layers that ran, within bounds
+        confidences = list(partial)
+        undecided = [False] * n
+        for row in range(n):
+            if reasons[row] is None:
+                continue
+            low, high = partial[row] + skipped_lo[row], partial[row] + skipped_hi[row]
+            average = partial[row] / ran_weight[row] if ran_weight[row] else low
+            confidences[row] = min(max(average, low), high)
+            undecided[row] = self._band(low) != self._band(high)
+        return PipelineResult(confidences, scores, skipped, undecided)
+
+    @staticmethod
+    def _range(layer: Layer, group: LayerGroup, n: int) -> tuple[list[float], list[float]]:
+        if layer.score_range is None:
+            return [0.0] * n, [1.0] * n
+        lo, hi = layer.score_range(group)
+        return (
+            [float(lo)] * n if isinstance(lo, (int, float)) else lo,
+            [float(hi)] * n if isinstance(hi, (int, float)) else hi,
+        )
+
+    def _band(self, confidence: float) -> int:
+        """0 reject, 1 review, 2 accept."""
+        return (confidence >= self.review) + (confidence >= self.accept)
@@ -0,0 +1,250 @@
+"""
+Layer 4: reference computation for spot checks.
+
+Recomputes a task from its payload the way the browser worker does
+(website/src/app/mine/workers/compute.worker.ts) and compares the result a
+node submitted against it, field by field, within TOLERANCES (the table of
+website/src/lib/reference-compute.ts).
+
+    signal    waveform from the payload's frequencies plus seeded noise,
+              one FFT over the zero-padded samples, local-maximum peaks
+    climate   2D heat diffusion over the grid, each time step one
+              vectorized stencil update of the interior
+
+The seeded noise uses the worker's Xorshift128Plus, ported bit for bit
+(32-bit JavaScript integer semantics, including the seed hash). Signal and
+climate arithmetic follows the worker's evaluation order, so results agree
+to floating-point noise (the FFT differs from the worker's Cooley-Tukey in
+the last digits). Protein and drug screening updates are sequential in
+the worker and are not recomputed here.
+
+Recomputes are plain functions over JSON-like payloads, so they can run in
+a process pool; payload_key() is the canonical hash results are cached by.
+"""
+
+import hashlib
+import json
+import math
+from typing import Any, Callable
+
+import numpy as np
+
+# Refuse payloads past these sizes rather than tie up a worker
+MAX_SIGNAL_SAMPLES = 1 << 22
+MAX_CLIMATE_CELL_STEPS = 256 * 256 * 5000
+
+# Relative tolerance per compared field (0 = exact match)
+TOLERANCES: dict[str, dict[str, float]] = {
+    "climate": {"maxTemperature": 0.05, "avgTemperature": 0.05},
+    "signal": {"numSamples": 0, "fftSize": 0, "maxMagnitude": 1e-6},
+}
+
+_MASK32 = 0xFFFFFFFF
+
+
+def _int32(value: int) -> int:
+    """JavaScript ToInt32 of an integer."""
+    value &= _MASK32
+    return value - (1 << 32) if value & 0x80000000 else value
+
+
+class Xorshift128Plus:
+    """The worker's deterministic PRNG; state kept as unsigned 32-bit words."""
+
+    def __init__(self, seed: str):
+        h = 0
+        units = seed.encode("utf-16-le")  # charCodeAt() walks UTF-16 code units
+        for i in range(0, len(units), 2):
+            h = _int32(h * 31 + int.from_bytes(units[i:i + 2], "little"))
+        self.s0 = (h ^ 0xDEADBEEF) & _MASK32
+        # A double product in JavaScript: rounded before ToInt32
+        self.s1 = int(float(h) * 1103515245.0 + 12345.0) & _MASK32
+        for _ in range(20):
+            self.next()
+
+    def next(self) -> float:
+        """Next value in [0, 1)."""
+        s1, s0 = self.s0, self.s1
+        self.s0 = s0
+        s1 ^= (s1 << 23) & _MASK32
+        s1 ^= s1 >> 17
+        s1 ^= s0
+        s1 ^= s0 >> 26
+        self.s1 = s1
+        return ((s0 + s1) & _MASK32) / 4294967296.0
+
+    def values(self, n: int) -> np.ndarray:
+        """The next n values as an array (the recurrence is inherently sequential)."""
+        out = np.empty(n)
+        s0, s1 = self.s0, self.s1
+        for i in range(n):
+            x, y = s0, s1
+            s0 = y
+            x ^= (x << 23) & _MASK32
+            x ^= x >> 17
+            x ^= y
+            x ^= y >> 26
+            s1 = x
+            out[i] = (s0 + s1) & _MASK32
+        self.s0, self.s1 = s0, s1
+        return out / 4294967296.0
+
+
+def _number(payload: dict[str, Any], key: str, default: float) -> Any:
+    """payload[key] || default, as the worker reads its parameters."""
+    value = payload.get(key)
+    if not value or (isinstance(value, float) and math.isnan(value)):
+        return default
+    return value
+
+
+def reference_signal(payload: dict[str, Any], seed: str = "") -> dict[str, Any]:
+    """The worker's computeSignal over NumPy arrays."""
+    sample_rate = _number(payload, "sampleRate", 1000)
+    duration = _number(payload, "duration", 5)
+    noise_level = _number(payload, "noiseLevel", 0.05)
+    num_samples = math.floor(sample_rate * duration)
+    if num_samples > MAX_SIGNAL_SAMPLES:
+        raise ValueError(f"Signal too large to recompute: {num_samples} samples")
+    fft_size = 1 << (num_samples - 1).bit_length() if num_samples > 0 else 0
+
+    t = np.arange(num_samples) / sample_rate
+    values = np.zeros(num_samples)
+    for freq in payload.get("frequencies") or []:
+        values += freq["amplitude"] * np.sin(2 * math.pi * freq["hz"] * t + freq["phase"])
+    rng = Xorshift128Plus(seed)
+    values += (rng.values(num_samples) - 0.5) * 2 * noise_level
+
+    padded = np.zeros(fft_size)
+    padded[:num_samples] = values
+    magnitude = np.abs(np.fft.fft(padded)[:fft_size // 2])
+
+    # Local maxima above 10% of the sample count, strongest first
+    inner = magnitude[1:-1]
+    peak = (inner > magnitude[:-2]) & (inner > magnitude[2:]) & (inner > num_samples * 0.1)
+    bins = np.nonzero(peak)[0] + 1
+    bins = bins[np.argsort(-magnitude[bins], kind="stable")][:10]
+    resolution = sample_rate / fft_size if fft_size else 0.0
+
+    return {
+        "sampleRate": sample_rate,
+        "duration": duration,
+        "numSamples": num_samples,
+        "fftSize": fft_size,
+        "peakFrequencies": [
+            {"hz": float(k * resolution), "magnitude": float(magnitude[k] / num_samples)} for k in bins
+        ],
+        "maxMagnitude": float(magnitude.max()) if len(magnitude) else -math.inf,
+    }
+
+
+def reference_climate(payload: dict[str, Any], seed: str = "") -> dict[str, Any]:
+    """The worker's computeClimate, one array update per time step."""
+    size = int(_number(payload, "gridSize", 128))
+    steps = int(_number(payload, "timeSteps", 1000))
+    diffusion = _number(payload, "diffusionCoeff", 0.02)
+    if size * size * steps > MAX_CLIMATE_CELL_STEPS:
+        raise ValueError(f"Climate grid too large to recompute: {size}x{size} over {steps} steps")
+
+    grid = np.zeros((size, size))
+    for cond in payload.get("initialConditions") or []:
+        x = min(max(0, cond["x"]), size - 1)
+        y = min(max(0, cond["y"]), size - 1)
+        # The worker writes grid[x * gridSize + y]; typed arrays ignore
+        # non-integer indices
+        index = x * size + y
+        if float(index).is_integer():
+            grid.flat[int(index)] = cond["temp"]
+    alpha = diffusion * 0.5 / (1.0 * 1.0)
+
+    if size > 2:
+        # Boundaries never change; the interior is rebuilt from the previous
+        # step in the worker's order: c + alpha * (s + n + e + w - 4c)
+        center = grid[1:-1, 1:-1]
+        total = np.empty_like(center)
+        scaled = np.empty_like(center)
+        for _ in range(steps):
+            np.add(grid[2:, 1:-1], grid[:-2, 1:-1], out=total)
+            total += grid[1:-1, 2:]
+            total += grid[1:-1, :-2]
+            np.multiply(center, 4, out=scaled)
+            total -= scaled
+            total *= alpha
+            center += total
+
+    flat = grid.ravel()
+    half = size // 2
+    return {
+        "gridSize": size,
+        "timeSteps": steps,
+        "maxTemperature": float(flat.max()),
+        "avgTemperature": float(np.cumsum(flat)[-1]) / (size * size),  # Sequential sum, as the worker
+        "centerTemp": float(grid[half, half]),
+    }
+
+
+# Task type -> (recompute(payload, seed), whether it draws from the seeded PRNG)
+REFERENCE_COMPUTES: dict[str, tuple[Callable[[dict[str, Any], str], dict[str, Any]], bool]] = {
+    "signal": (reference_signal, True),
+    "climate": (reference_climate, False),
+}
+
+
+def supports(task_type: str) -> bool:
+    return task_type in REFERENCE_COMPUTES
+
+
+def _seed(task_type: str, payload: dict[str, Any], task_id: str | None) -> str | None:
+    """The worker's PRNG seed (payload.seed || taskId), None if the task type draws none."""
+    if not REFERENCE_COMPUTES[task_type][1]:
+        return None
+    return str(payload.get("seed") or task_id or "")
+
+
+def payload_key(task_type: str, payload: dict[str, Any], task_id: str | None = None) -> str:
+    """
+    Canonical hash of a task's parameters (and seed): every device computing
+    the same task shares one reference result.
+    """
+    canonical = json.dumps(
+        [task_type, payload, _seed(task_type, payload, task_id)],
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def recompute(task_type: str, payload: dict[str, Any], task_id: str | None = None) -> dict[str, Any]:
+    """Reference result of a task (KeyError for unsupported task types)."""
+    compute, _ = REFERENCE_COMPUTES[task_type]
+    return compute(payload, _seed(task_type, payload, task_id) or "")
+
+
+def compare(task_type: str, reference: dict[str, Any], submitted: dict[str, Any]) -> dict[str, Any]:
+    """
+    Compare a submitted result against the reference, each field within
+    its own tolerance (relative; absolute when the reference is 0).
+    """
+    deviation = 0.0
+    failed: list[str] = []
+    reference_values: dict[str, float] = {}
+    submitted_values: dict[str, float] = {}
+    for field, tolerance in TOLERANCES.get(task_type, {}).items():
+        ref, sub = reference.get(field), submitted.get(field)
+        if not isinstance(ref, (int, float)) or not isinstance(sub, (int, float)):
+            continue
+        reference_values[field] = ref
+        submitted_values[field] = sub
+        if tolerance == 0:
+            field_deviation = 0.0 if ref == sub else 1.0
+        else:
+            field_deviation = abs(ref - sub) / abs(ref) if ref else abs(ref - sub)
+        deviation = max(deviation, field_deviation)
+        if field_deviation > tolerance:
+            failed.append(field)
+    return {
+        "passed": not failed,
+        "deviation": deviation,
+        "failed_fields": failed,
+        "reference_values": reference_values,
+        "submitted_values": submitted_values,
+    }
@@ -2,38 +2,24 @@
 Per-task-type structural validation.
 
 Checks that results have the expected fields and value types
-before passing them to the anomaly detector.
+before passing them to the anomaly detector. Schemas come from the
+task specs in models/task_specs.py.
 """
 
 from typing import Any
 
+from models.task_specs import TASK_SPECS, TaskPlan
+
 # Expected result schema per task type
-RESULT_SCHEMAS: dict[str, dict[str, type]] = {
-    "protein": {
-        "finalEnergy": (int, float),
-        "iterations": (int,),
-        "residueCount": (int,),
-    },
-    "climate": {
-        "gridSize": (int,),
-        "timeSteps": (int,),
-        "maxTemperature": (int, float),
-        "avgTemperature": (int, float),
-        "centerTemp": (int, float),
-    },
-    "signal": {
-        "sampleRate": (int,),
-        "duration": (int, float),
-        "numSamples": (int,),
-        "fftSize": (int,),
-        "maxMagnitude": (int, float),
-    },
-    "drugscreen": {
-        "compoundName": (str,),
-        "bindingAffinity": (int, float),
-        "interactionCount": (int,),
-        "orientationsScanned": (int,),
-    },
+RESULT_SCHEMAS: dict[str, dict[str, tuple[type, ...]]] = {
+    task_type: spec["schema"]
+    for task_type, spec in TASK_SPECS.items()
+    if spec.get("schema")
+}
+
+# Schema-only plans (no stat bounds), compiled once
+_PLANS: dict[str, TaskPlan] = {
+    task_type: TaskPlan(task_type, spec, None) for task_type, spec in TASK_SPECS.items()
 }
 
 
@@ -43,20 +29,7 @@ def validate_result_structure(task_type: str, result: dict[str, Any]) -> list[st
 
     Returns list of error strings. Empty list = valid.
     """
-    errors: list[str] = []
-
-    schema = RESULT_SCHEMAS.get(task_type)
-    if not schema:
-        errors.append(f"Unknown task type: {task_type}")
-        return errors
-
-    for field, expected_types in schema.items():
-        if field not in result:
-            errors.append(f"Missing field: {field}")
-            continue
-        if not isinstance(result[field], expected_types):
-            errors.append(
-                f"Invalid type for {field}: expected {expected_types}, got {type(result[field]).__name__}"
-            )
-
-    return errors
+    plan = _PLANS.get(task_type)
+    if plan is None:
+        return [f"Unknown task type: {task_type}"]
+    return plan.validate(result)
@@ -0,0 +1,222 @@
+"""
+Statistical bounds per task type.
+
+Bounds come from three layers, later ones overriding earlier ones per field:
+
+1. STAT_BOUNDS in config.py — hand-tuned defaults
+2. stat_bounds.json written by training/train.py — used for a field only when
+   it was computed from at least STAT_BOUNDS_MIN_SAMPLES samples, so the
+   synthetic bootstrap data cannot override the hand-tuned defaults
+3. stat_bounds.online.json — snapshots from the optional online updater,
+   ignored when older than the trained file
+
+For scoring, each task type's bounds are precomputed into a field tuple plus
+mean and (floored) std vectors, so the z-score layer is a single array
+operation over a whole batch.
+
+OnlineStatBounds optionally keeps refining the bounds from accepted results.
+It stores one Welford accumulator per known field (bounded memory), seeded
+with the current bounds at a pseudo-count of STAT_BOUNDS_PRIOR_WEIGHT, and
+writes a snapshot every STAT_BOUNDS_SNAPSHOT_EVERY updates.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from config import (
+    STAT_BOUNDS, STAT_BOUNDS_PATH, STAT_BOUNDS_ONLINE_PATH, STAT_BOUNDS_MIN_SAMPLES,
+    STAT_BOUNDS_PRIOR_WEIGHT, STAT_BOUNDS_SNAPSHOT_EVERY,
+)
+
+# Minimum std per field (compute time is in whole milliseconds)
+STD_FLOORS = {"compute_time_ms": 1.0}
+DEFAULT_STD_FLOOR = 0.001
+
+
+class BoundsVector(NamedTuple):
+    """Precomputed bounds for one task type."""
+    fields: tuple[str, ...]   # compute_time_ms first, when bounded
+    mean: np.ndarray
+    std: np.ndarray           # Already floored
+
+
+def write_json(path: str, data: Any):
+    """Write JSON to a temporary file, fsync it and rename it into place."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> dict[str, Any]:
+    """Read a bounds file, or {} if missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _merge(base: dict, overrides: dict, min_samples: int = 0) -> dict:
+    """Override base bounds per task type and field."""
+    merged = {task_type: dict(fields) for task_type, fields in base.items()}
+    for task_type, fields in overrides.items():
+        for field, b in fields.items():
+            if b.get("count", 0) >= min_samples:
+                merged.setdefault(task_type, {})[field] = b
+    return merged
+
+
+def load_stat_bounds(
+    trained_path: str = STAT_BOUNDS_PATH,
+    online_path: str = STAT_BOUNDS_ONLINE_PATH,
+) -> dict[str, dict[str, dict[str, float]]]:
+    """Config defaults overlaid with trained and online bounds."""
+    bounds = _merge(STAT_BOUNDS, _read_json(trained_path), STAT_BOUNDS_MIN_SAMPLES)
+
+    if os.path.exists(online_path):
+        trained_mtime = os.path.getmtime(trained_path) if os.path.exists(trained_path) else 0
+        # A retrain after the last online snapshot supersedes it
+        if os.path.getmtime(online_path) >= trained_mtime:
+            bounds = _merge(bounds, _read_json(online_path))
+
+    return bounds
+
+
+def _compile(bounds: dict[str, dict[str, dict[str, float]]]) -> dict[str, BoundsVector]:
+    """Precompute per-task-type field order and mean/std vectors."""
+    vectors = {}
+    for task_type, fields in bounds.items():
+        # compute_time_ms first, then the remaining fields in definition order
+        names = sorted(fields, key=lambda f: f != "compute_time_ms")
+        vectors[task_type] = BoundsVector(
+            fields=tuple(names),
+            mean=np.array([fields[f]["mean"] for f in names], dtype=np.float64),
+            std=np.array(
+                [max(fields[f]["std"], STD_FLOORS.get(f, DEFAULT_STD_FLOOR)) for f in names],
+                dtype=np.float64,
+            ),
+        )
+    return vectors
+
+
+class StatBounds:
+    """Current bounds plus their precomputed vectors, swapped as a unit."""
+
+    def __init__(self, bounds: dict | None = None):
+        self._state: tuple[dict, dict[str, BoundsVector], str] = ({}, {}, "")
+        self.update(bounds if bounds is not None else load_stat_bounds())
+
+    @property
+    def bounds(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Bounds as task_type -> field -> {"mean", "std", ...}."""
+        return self._state[0]
+
+    @property
+    def version(self) -> str:
+        """Content hash of the bounds currently in use."""
+        return self._state[2]
+
+    def vectors(self, task_type: str) -> BoundsVector | None:
+        """Precomputed bounds for a task type, or None if unbounded."""
+        return self._state[1].get(task_type)
+
+    def update(self, bounds: dict[str, dict[str, dict[str, float]]]):
+        """Replace the bounds (one assignment, safe while requests are scoring)."""
+        encoded = json.dumps(bounds, sort_keys=True).encode()
+        version = hashlib.sha256(encoded).hexdigest()[:12]
+        self._state = (bounds, _compile(bounds), version)
+
+    def reload(self):
+        """Re-read config, trained and online bounds from disk."""
+        self.update(load_stat_bounds())
+
+
+class OnlineStatBounds:
+    """Streaming bounds refinement from accepted results."""
+
+    def __init__(
+        self,
+        base: dict[str, dict[str, dict[str, float]]],
+        prior_weight: float = STAT_BOUNDS_PRIOR_WEIGHT,
+        snapshot_every: int = STAT_BOUNDS_SNAPSHOT_EVERY,
+        path: str = STAT_BOUNDS_ONLINE_PATH,
+    ):
+        self.prior_weight = prior_weight
+        self.snapshot_every = max(1, snapshot_every)
+        self.path = path
+        self.updates = 0
+        self._since_snapshot = 0
+        self._lock = threading.Lock()
+        # task_type -> field -> [n, mean, M2], seeded from the current bounds
+        self._acc: dict[str, dict[str, list[float]]] = {}
+        self.reset(base)
+
+    def reset(self, base: dict[str, dict[str, dict[str, float]]]):
+        """Re-seed the accumulators (e.g. after a retrain)."""
+        with self._lock:
+            self._acc = {
+                task_type: {
+                    field: [self.prior_weight, b["mean"], (b["std"] ** 2) * self.prior_weight]
+                    for field, b in fields.items()
+                }
+                for task_type, fields in base.items()
+            }
+            self._since_snapshot = 0
+
+    def observe(self, task_type: str, result: dict[str, Any], compute_time_ms: float) -> bool:
+        """
+        Fold one accepted result into the bounds.
+
+        Only fields that already have bounds are tracked. Returns True when a
+        snapshot is due.
+        """
+        acc = self._acc.get(task_type)
+        if acc is None:
+            return False
+
+        with self._lock:
+            for field, stats in acc.items():
+                value = compute_time_ms if field == "compute_time_ms" else result.get(field)
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                x = float(value)
+                if not math.isfinite(x):
+                    continue
+                stats[0] += 1
+                delta = x - stats[1]
+                stats[1] += delta / stats[0]
+                stats[2] += delta * (x - stats[1])
+
+            self.updates += 1
+            self._since_snapshot += 1
+            return self._since_snapshot >= self.snapshot_every
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Current bounds as task_type -> field -> {"mean", "std", "count"}."""
+        with self._lock:
+            self._since_snapshot = 0
+            return {
+                task_type: {
+                    field: {
+                        "mean": mean,
+                        "std": math.sqrt(m2 / n),
+                        "count": int(n - self.prior_weight),
+                    }
+                    for field, (n, mean, m2) in fields.items()
+                }
+                for task_type, fields in self._acc.items()
+            }
+
+    def save(self, bounds: dict[str, dict[str, dict[str, float]]]):
+        """Atomically write a snapshot next to the trained bounds."""
+        write_json(self.path, bounds)
@@ -0,0 +1,268 @@
+"""
+Declarative task-type specs, compiled into verification plans.
+
+A spec says, for one task type:
+
+    schema    — required result fields and their accepted types
+                (None: not structurally validated)
+    features  — Isolation Forest input columns after compute_time_ms, in
+                model order. A bare name is read as float(result.get(name, 0));
+                (name, "flag") is 1.0 if truthy; (name, "count") is len().
+    fingerprint — for deterministic tasks, the significant digits numeric
+                fields are rounded to for the peer consensus fingerprint
+                (models/fingerprint.py); absent: peers are compared by
+                z-scores only
+
+A TaskPlan compiles a spec together with the task type's current stat bounds
+into one list of columns. scan() then walks the result dict once,
+returning the validation errors, the values the bounds layer needs, the
+feature vector the ML layer needs and the numeric values and fingerprint
+the consistency layer compares. Adding a task type only takes a spec entry
+here (plus bounds in config.py if wanted).
+"""
+
+import math
+from typing import Any, NamedTuple
+
+from models.fingerprint import fingerprint_fields
+from models.stat_bounds import BoundsVector, StatBounds
+
+_MISSING = object()
+
+# Value used for a feature whose field is missing from the result
+FEATURE_DEFAULTS: dict[str, Any] = {"value": 0, "flag": None, "count": ()}
+
+TASK_SPECS: dict[str, dict[str, Any]] = {
+    "protein": {
+        "schema": {
+            "finalEnergy": (int, float),
+            "iterations": (int,),
+            "residueCount": (int,),
+        },
+        "features": ["finalEnergy", "residueCount", "iterations"],
+    },
+    "climate": {
+        "schema": {
+            "gridSize": (int,),
+            "timeSteps": (int,),
+            "maxTemperature": (int, float),
+            "avgTemperature": (int, float),
+            "centerTemp": (int, float),
+        },
+        "features": ["maxTemperature", "avgTemperature", "centerTemp"],
+    },
+    "signal": {
+        "schema": {
+            "sampleRate": (int,),
+            "duration": (int, float),
+            "numSamples": (int,),
+            "fftSize": (int,),
+            "maxMagnitude": (int, float),
+        },
+        "features": ["maxMagnitude", "fftSize", "numSamples"],
+        # Sizes are exact; one FFT over seeded samples agrees to ~1e-12
+        "fingerprint": 9,
+    },
+    "drugscreen": {
+        "schema": {
+            "compoundName": (str,),
+            "bindingAffinity": (int, float),
+            "interactionCount": (int,),
+            "orientationsScanned": (int,),
+        },
+        "features": ["bindingAffinity", "interactionCount", "orientationsScanned"],
+        "fingerprint": 9,
+    },
+    "fitness_verify": {
+        # Checked by the fitness layer rather than structurally
+        "schema": None,
+        "features": ["confidence", ("verified", "flag"), ("checks", "count")],
+    },
+}
+
+
+class ScanResult(NamedTuple):
+    """Everything the layers need from one result, from a single dict walk."""
+    errors: list[str]                 # Structural validation errors
+    bound_values: list[float]         # Aligned with the plan's bound_fields (NaN = skip)
+    features: list[float] | None      # ML feature vector, None if not extractable
+    numeric: list[float]              # Top-level numeric values, for peer comparison
+    bounds_version: str               # Stat bounds the plan was compiled against
+    fingerprint: int | None = None    # Quantized numeric fields, for peer consensus
+
+
+class TaskPlan:
+    """A task type's spec and stat bounds compiled into one column walk."""
+
+    def __init__(
+        self,
+        task_type: str,
+        spec: dict[str, Any] | None,
+        bounds: BoundsVector | None,
+        bounds_version: str = "",
+    ):
+        self.task_type = task_type
+        self.bounds = bounds
+        self.bounds_version = bounds_version
+
+        schema = (spec or {}).get("schema") or {}
+        features = parse_features(spec)
+        # Spec'd types without a schema (fitness_verify) are checked by their own layer
+        self.known = spec is not None
+        self.has_features = bool(features)
+        self.fingerprint_digits: int | None = (spec or {}).get("fingerprint")
+        self.feature_fields = tuple(name for name, _ in features)
+        self.bound_fields = bounds.fields if bounds is not None else ()
+
+        # Schema fields first so errors come out in schema order
+        columns: list[str] = []
+        for name in [*schema, *self.feature_fields, *self.bound_fields]:
+            if name != "compute_time_ms" and name not in columns:
+                columns.append(name)
+        self._index = {name: col for col, name in enumerate(columns)}
+
+        kinds = dict(features)
+        # Per column: (field, accepted types or None, bound slots, feature slot, kind)
+        self._columns = tuple(
+            (
+                name,
+                schema.get(name),
+                tuple(i for i, f in enumerate(self.bound_fields) if f == name),
+                self.feature_fields.index(name) + 1 if name in kinds else 0,
+                kinds.get(name, "value"),
+            )
+            for name in columns
+        )
+        self._compute_time_slots = tuple(
+            i for i, f in enumerate(self.bound_fields) if f == "compute_time_ms"
+        )
+
+    def validate(self, result: dict[str, Any]) -> list[str]:
+        """Structural validation only (no feature or bound extraction)."""
+        if not self.known:
+            return [f"Unknown task type: {self.task_type}"]
+        errors: list[str] = []
+        for name, types, _, _, _ in self._columns:
+            if types is not None:
+                _check_type(name, types, result.get(name, _MISSING), errors)
+        return errors
+
+    def scan(self, result: dict[str, Any], compute_time_ms: float) -> ScanResult:
+        """Validate a result and extract everything the layers need in one pass."""
+        values: list[Any] = [_MISSING] * len(self._columns)
+        numeric: list[float] = []
+        numeric_keys: list[str] = []
+        index = self._index
+        for key, value in result.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                numeric.append(_to_float(value))
+                numeric_keys.append(key)
+            col = index.get(key)
+            if col is not None:
+                values[col] = value
+
+        errors: list[str] = [] if self.known else [f"Unknown task type: {self.task_type}"]
+        bound_values = [float("nan")] * len(self.bound_fields)
+        for slot in self._compute_time_slots:
+            bound_values[slot] = float(compute_time_ms)
+
+        features: list[float] | None = None
+        if self.has_features:
+            features = [0.0] * (len(self.feature_fields) + 1)
+            features[0] = float(compute_time_ms)
+
+        for value, (name, types, bound_slots, feature_slot, kind) in zip(values, self._columns):
+            if types is not None:
+                _check_type(name, types, value, errors)
+
+            if bound_slots:
+                bound_value = _bound_value(value)
+                for slot in bound_slots:
+                    bound_values[slot] = bound_value
+
+            if feature_slot and features is not None:
+                if value is _MISSING:
+                    value = FEATURE_DEFAULTS[kind]
+                try:
+                    features[feature_slot] = feature_value(value, kind)
+                except (TypeError, ValueError, OverflowError):
+                    features = None  # Unparseable result, ML layer passes
+
+        fingerprint = None
+        if self.fingerprint_digits is not None:
+            fingerprint = fingerprint_fields(zip(numeric_keys, numeric), self.fingerprint_digits)
+
+        return ScanResult(errors, bound_values, features, numeric, self.bounds_version, fingerprint)
+
+
+def _check_type(name: str, types: tuple, value: Any, errors: list[str]):
+    """Append a validation error for a missing or mistyped field."""
+    if value is _MISSING:
+        errors.append(f"Missing field: {name}")
+    elif not isinstance(value, types):
+        errors.append(
+            f"Invalid type for {name}: expected {types}, got {type(value).__name__}"
+        )
+
+
+def _to_float(value: int | float) -> float:
+    """float() that saturates ints too large for a double to ±inf."""
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+
+def _bound_value(value: Any) -> float:
+    """A value for the bounds layer: float, or NaN if missing or non-numeric."""
+    if value is _MISSING or value is None:
+        return float("nan")
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return float("nan")
+
+
+def feature_value(value: Any, kind: str) -> float:
+    """
+    One ML feature from a result value (FEATURE_DEFAULTS if missing).
+
+    Raises TypeError/ValueError/OverflowError for values that cannot be
+    converted; the ML layer then skips the result.
+    """
+    if kind == "flag":
+        return 1.0 if value else 0.0
+    if kind == "count":
+        return float(len(value))
+    return float(value)
+
+
+def parse_features(spec: dict[str, Any] | None) -> list[tuple[str, str]]:
+    """A spec's feature columns as (field, kind) pairs."""
+    return [
+        (f, "value") if isinstance(f, str) else tuple(f)
+        for f in (spec or {}).get("features") or []
+    ]
+
+
+class TaskPlans:
+    """Compiled plans per task type, recompiled when the stat bounds change."""
+
+    def __init__(self, bounds: StatBounds, specs: dict[str, dict[str, Any]] = TASK_SPECS):
+        self.bounds = bounds
+        self.specs = specs
+        self._plans: dict[str, TaskPlan] = {}
+
+    def get(self, task_type: str) -> TaskPlan:
+        """The current plan for a task type."""
+        plan = self._plans.get(task_type)
+        version = self.bounds.version
+        if plan is None or plan.bounds_version != version:
+            plan = TaskPlan(
+                task_type,
+                self.specs.get(task_type),
+                self.bounds.vectors(task_type),
+                version,
+            )
+            self._plans = {**self._plans, task_type: plan}
+        return plan
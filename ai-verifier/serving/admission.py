@@ -0,0 +1,192 @@
+"""
+Admission control in front of the detector: bounded concurrency, fair
+queuing per device and load shedding.
+
+At most max_in_flight requests are scored at once. Past that, requests
+wait in one queue per device (or per client when no device id is given),
+and each slot that frees up goes to the next device in round-robin order,
+so a device flooding the service only lengthens its own queue. A request
+is shed instead of scored when
+
+    queue_full   its device already has max_queued_per_device waiting
+    overloaded   its expected wait exceeds the queue-time target; by
+                 Little's law, slots ahead × recent service time / max_in_flight
+    timeout      it waited the queue-time target and got no slot
+
+A request may take several slots at once (weight): /verify/batch is
+admitted as one request weighing as many slots as it has items, capped at
+max_in_flight, so a large batch waits for room instead of overrunning the
+limit. A waiter at the head of its device's queue is not overtaken by
+lighter requests of other devices queued behind it in the rotation.
+
+Shedding is fast and predictable: the caller answers a shed request with
+a cheap statistical-only verdict capped at review, the same verdict the
+detector gives when a request's deadline leaves no time for the other
+layers, well before the caller's own timeout.
+
+Everything runs on the event loop, so no locks are taken.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+SHED_REASONS = ("queue_full", "overloaded", "timeout")
+
+# Weight of the newest sample in the service-time moving average
+_SERVICE_EWMA_ALPHA = 0.1
+
+
+class AdmissionController:
+    """Bounded in-flight limit with round-robin queues per device and shedding."""
+
+    def __init__(
+        self,
+        max_in_flight: int = 128,
+        queue_target_ms: float = 500.0,
+        max_queued_per_device: int = 64,
+        window: int = 1024,
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.queue_target_s = max(0.0, queue_target_ms) / 1000.0
+        self.max_queued_per_device = max(1, max_queued_per_device)
+        self.in_flight = 0
+        self.queued = 0
+        self._queued_weight = 0  # Slots the queued requests will take
+        self.admitted = 0
+        self.shed: dict[str, int] = dict.fromkeys(SHED_REASONS, 0)
+        self.max_queue_wait_ms = 0.0
+        self._service_s = 0.0  # Moving average of the time a request holds a slot
+        # Device -> (waiter, weight) in arrival order; devices in round-robin order
+        self._queues: OrderedDict[Any, deque[tuple[asyncio.Future, int]]] = OrderedDict()
+        self._recent_waits_ms: deque[float] = deque(maxlen=window)
+
+    def expected_wait_s(self, ahead: int | None = None, weight: int = 1) -> float:
+        """Expected queue time of a request of `weight` slots arriving now behind `ahead` queued slots."""
+        ahead = self._queued_weight if ahead is None else ahead
+        return (ahead + weight) * self._service_s / self.max_in_flight
+
+    @asynccontextmanager
+    async def slot(self, key: Any, weight: int = 1) -> AsyncIterator[bool]:
+        """Hold `weight` slots for the block; yields False (and holds nothing) if shed."""
+        weight = min(max(1, weight), self.max_in_flight)
+        if not await self._acquire(key, weight):
+            yield False
+            return
+        start = time.perf_counter()
+        try:
+            yield True
+        finally:
+            self._release(weight, time.perf_counter() - start)
+
+    async def _acquire(self, key: Any, weight: int) -> bool:
+        """Take slots, queueing fairly for them; False if the request is shed."""
+        # Free slots go to waiters first, so arrivals never overtake a queue
+        if self.in_flight + weight <= self.max_in_flight and not self._queues:
+            self.in_flight += weight
+            self.admitted += 1
+            self._record_wait(0.0)
+            return True
+
+        waiters = self._queues.get(key)
+        if waiters is not None and len(waiters) >= self.max_queued_per_device:
+            return self._shed("queue_full")
+        if self.expected_wait_s(weight=weight) > self.queue_target_s:
+            return self._shed("overloaded")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (future, weight)
+        if waiters is None:
+            waiters = self._queues[key] = deque()
+        waiters.append(waiter)
+        self.queued += 1
+        self._queued_weight += weight
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait((future,), timeout=self.queue_target_s)
+        except asyncio.CancelledError:
+            # The caller went away: hand back slots granted meanwhile
+            if future.done():
+                self._release(weight)
+            else:
+                self._remove(key, waiter)
+            raise
+        self._record_wait(time.perf_counter() - queued_at)
+        if future.done():
+            return True
+        self._remove(key, waiter)
+        return self._shed("timeout")
+
+    def _release(self, weight: int = 1, service_s: float | None = None):
+        """Free slots and hand them to the next devices in line."""
+        self.in_flight -= weight
+        if service_s is not None:
+            self._service_s = (
+                service_s if not self._service_s
+                else self._service_s + _SERVICE_EWMA_ALPHA * (service_s - self._service_s)
+            )
+        self._grant()
+
+    def _grant(self):
+        """Hand free slots to the waiters at the front of the rotation."""
+        while self._queues:
+            key, waiters = next(iter(self._queues.items()))
+            future, needed = waiters[0]
+            if self.in_flight + needed > self.max_in_flight:
+                break  # The head waits for enough slots rather than being overtaken
+            waiters.popleft()
+            if waiters:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self.queued -= 1
+            self._queued_weight -= needed
+            self.in_flight += needed
+            self.admitted += 1
+            future.set_result(None)
+
+    def _remove(self, key: Any, waiter: tuple[asyncio.Future, int]):
+        waiters = self._queues[key]
+        waiters.remove(waiter)
+        if not waiters:
+            del self._queues[key]
+        self.queued -= 1
+        self._queued_weight -= waiter[1]
+        self._grant()  # A heavy waiter leaving may unblock the ones behind it
+
+    def _shed(self, reason: str) -> bool:
+        self.shed[reason] += 1
+        return False
+
+    def _record_wait(self, wait_s: float):
+        wait_ms = wait_s * 1000.0
+        self._recent_waits_ms.append(wait_ms)
+        self.max_queue_wait_ms = max(self.max_queue_wait_ms, wait_ms)
+
+    def stats(self) -> dict[str, Any]:
+        """Return a JSON-serializable view of the limits, queues and counts."""
+        waits = sorted(self._recent_waits_ms)
+
+        def percentile(q: float) -> float:
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))], 3) if waits else 0.0
+
+        return {
+            "max_in_flight": self.max_in_flight,
+            "queue_target_ms": self.queue_target_s * 1000.0,
+            "max_queued_per_device": self.max_queued_per_device,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "devices_queued": len(self._queues),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "service_ms": round(self._service_s * 1000.0, 3),
+            "expected_wait_ms": round(self.expected_wait_s() * 1000.0, 3),
+            "queue_wait_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self.max_queue_wait_ms, 3),
+            },
+        }
@@ -0,0 +1,188 @@
+"""
+Micro-batching scheduler for /verify.
+
+Concurrent /verify calls that arrive within a short window are coalesced
+into one AnomalyDetector.verify_many call, so the Isolation Forest input
+validation and tree traversal setup are paid once per batch instead of once
+per request. Each caller awaits its own future and receives its own result.
+"""
+
+import asyncio
+import inspect
+import time
+from collections import deque
+from typing import Any, Callable
+
+
+class BatcherStats:
+    """Batch-size and queue-wait statistics for tuning the batcher."""
+
+    def __init__(self, window: int = 1024):
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.max_observed_batch = 0
+        self.max_queue_wait_ms = 0.0
+        self._size_hist: dict[int, int] = {}
+        self._recent_sizes: deque[int] = deque(maxlen=window)
+        self._recent_waits_ms: deque[float] = deque(maxlen=window)
+
+    def record(self, batch_size: int, queue_waits_ms: list[float]):
+        """Record one dispatched batch."""
+        self.batches += 1
+        self.items += batch_size
+        self.max_observed_batch = max(self.max_observed_batch, batch_size)
+        # Power-of-two buckets: 1, 2, 4, 8, ...
+        bucket = 1 << (batch_size - 1).bit_length()
+        self._size_hist[bucket] = self._size_hist.get(bucket, 0) + 1
+        self._recent_sizes.append(batch_size)
+        self._recent_waits_ms.extend(queue_waits_ms)
+        if queue_waits_ms:
+            self.max_queue_wait_ms = max(self.max_queue_wait_ms, max(queue_waits_ms))
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return a JSON-serializable view of the stats."""
+        waits = sorted(self._recent_waits_ms)
+        sizes = list(self._recent_sizes)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "errors": self.errors,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "recent_mean_batch_size": round(sum(sizes) / len(sizes), 2) if sizes else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "batch_size_histogram": {f"<={k}": v for k, v in sorted(self._size_hist.items())},
+            "queue_wait_ms": {
+                "p50": round(_percentile(waits, 0.50), 3),
+                "p95": round(_percentile(waits, 0.95), 3),
+                "p99": round(_percentile(waits, 0.99), 3),
+                "max": round(self.max_queue_wait_ms, 3),
+            },
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item calls into batched calls.
+
+    run_batch receives a list of items and must return a list of results in
+    the same order. It may be a plain function or a coroutine function.
+    A batch is dispatched as soon as it holds max_batch_size items or the
+    oldest item has waited max_wait_ms, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list[Any]], Any],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.stats = BatcherStats()
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._collecting: list[tuple[Any, asyncio.Future, float]] = []
+        self._dispatches: set[asyncio.Task] = set()
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of items waiting to be batched."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def close(self):
+        """Stop the collector and fail every item still waiting for a result."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._dispatches):
+            task.cancel()
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+        pending = self._collecting
+        self._collecting = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        _fail(pending, RuntimeError("Micro-batcher closed"))
+
+    def _ensure_started(self):
+        """Start the collector lazily on the running event loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._collect())
+
+    async def _collect(self):
+        """Collect queued items into batches and dispatch them."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._collecting = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_s
+
+            while len(batch) < self.max_batch_size:
+                # Take everything already queued before waiting for more
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            # Dispatch without blocking collection of the next batch
+            self._collecting = []
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: list[tuple[Any, asyncio.Future, float]]):
+        """Run one batch and resolve each caller's future."""
+        now = time.perf_counter()
+        self.stats.record(len(batch), [(now - queued) * 1000.0 for _, _, queued in batch])
+
+        try:
+            results = self.run_batch([item for item, _, _ in batch])
+            if inspect.isawaitable(results):
+                results = await results
+        except asyncio.CancelledError:
+            _fail(batch, RuntimeError("Micro-batcher closed"))
+            raise
+        except Exception as e:
+            self.stats.errors += 1
+            _fail(batch, e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have gone away (client disconnect / timeout)
+            if not future.done():
+                future.set_result(result)
+
+
+def _fail(batch: list[tuple[Any, asyncio.Future, float]], error: BaseException):
+    """Fail the futures of queued items whose callers are still waiting."""
+    for _, future, _ in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already-sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
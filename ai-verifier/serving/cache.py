@@ -0,0 +1,207 @@
+"""
+Idempotent verdict cache for /verify.
+
+The website retries /verify on timeouts and miners resubmit identical
+payloads. Verdicts are deterministic for a given input and detector state,
+so they are cached under a canonical hash of:
+
+    task_type, result, compute_time_ms, and the raw workout of a fitness result
+    the task payload a spot-checked result is recomputed from
+    the submitting device (device_id)
+    the peer set: an order-independent fingerprint of peer_results, or the
+                  task id when the server-side peer store supplies the peers
+    detector state: reload generations of the task type's model and of the
+                    stat bounds (DetectorExecutor.generation)
+
+A request identical to one still being scored waits for that computation
+instead of starting another, so a retry that arrives while the original is
+in flight costs nothing; /verify/batch looks its items up together and
+scores only the misses (get_or_compute_many). Keying server-side peers by
+task id keeps a resubmission idempotent: it gets the verdict it got the
+first time, rather than being rescored against peer stats that now include
+itself. Keying by device keeps deduplication to a device's own retries:
+the same result submitted by another device is scored, and fed into the
+peer store and device profiles, as a submission of its own. Requests
+without a device_id cannot be told apart and share entries.
+
+Entries expire after a TTL and the least recently used are evicted beyond
+max_entries. invalidate() drops everything and is called whenever models or
+bounds are reloaded. Verdicts computed across an invalidation, and
+verdicts that skipped layers on a deadline, are not stored.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from config import VERIFY_CACHE_SIZE, VERIFY_CACHE_TTL_S
+from models.pipeline import SKIP_DEADLINE
+
+
+def _digest(value: Any) -> bytes:
+    """Hash of the canonical JSON encoding (sorted keys, no whitespace)."""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+def peer_fingerprint(peer_results: list[dict[str, Any]] | None) -> bytes:
+    """Order-independent fingerprint of a peer result list (b"" for none)."""
+    if not peer_results:
+        return b""
+    return hashlib.blake2b(b"".join(sorted(_digest(p) for p in peer_results)), digest_size=16).digest()
+
+
+class VerificationCache:
+    """Bounded LRU/TTL cache of verdicts with in-flight request coalescing."""
+
+    def __init__(self, max_entries: int = VERIFY_CACHE_SIZE, ttl_s: float = VERIFY_CACHE_TTL_S):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._pending: dict[bytes, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(
+        self,
+        task_type: str,
+        result: dict[str, Any],
+        compute_time_ms: int,
+        peer_results: list[dict[str, Any]] | None = None,
+        task_id: str | None = None,
+        state: tuple = (),
+        workout: dict[str, Any] | None = None,
+        task_payload: dict[str, Any] | None = None,
+        device_id: str | None = None,
+    ) -> bytes:
+        """Cache key for a request under the given detector state."""
+        peers = peer_fingerprint(peer_results) if peer_results else f"task:{task_id or ''}".encode()
+        head = _digest(
+            [task_type, result, compute_time_ms, list(state)]
+            + ([workout] if workout else [])
+            + ([{"task_payload": task_payload}] if task_payload else [])
+            + ([{"device_id": device_id}] if device_id else [])
+        )
+        return hashlib.blake2b(head + peers, digest_size=16).digest()
+
+    def get(self, key: bytes) -> dict[str, Any] | None:
+        """Cached verdict, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, verdict = entry
+        if time.monotonic() - stored_at > self.ttl_s:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return verdict
+
+    def put(self, key: bytes, verdict: dict[str, Any]):
+        self._entries[key] = (time.monotonic(), verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: bytes,
+        compute: Callable[[], Awaitable[dict[str, Any]]],
+    ) -> tuple[dict[str, Any], bool]:
+        """
+        Return (verdict, cached). cached is True when the verdict came from the
+        cache or from an identical request already in flight.
+        """
+        async def compute_one(_: list[int]) -> list[dict[str, Any]]:
+            return [await compute()]
+
+        return (await self.get_or_compute_many([key], compute_one))[0]
+
+    async def get_or_compute_many(
+        self,
+        keys: list[bytes],
+        compute: Callable[[list[int]], Awaitable[list[dict[str, Any]]]],
+    ) -> list[tuple[dict[str, Any], bool]]:
+        """
+        (verdict, cached) for each key, in order. The keys neither cached nor
+        in flight are computed together: compute(indices) gets their
+        positions in `keys` and returns their verdicts in that order.
+        Repeated keys are computed once.
+        """
+        outcomes: list[tuple[dict[str, Any], bool] | None] = [None] * len(keys)
+        missing: list[int] = []
+        owned: dict[bytes, asyncio.Future] = {}
+        waiting: list[tuple[int, asyncio.Future]] = []
+        for i, key in enumerate(keys):
+            verdict = self.get(key)
+            if verdict is not None:
+                self.hits += 1
+                outcomes[i] = (verdict, True)
+                continue
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                waiting.append((i, pending))
+                continue
+            self.misses += 1
+            owned[key] = self._pending[key] = asyncio.get_running_loop().create_future()
+            missing.append(i)
+
+        if missing:
+            generation = self._generation
+            try:
+                verdicts = await compute(missing)
+            except BaseException as e:
+                for future in owned.values():
+                    future.set_exception(e)
+                    future.exception()  # Retrieved: waiters re-raise it, no "never retrieved" warning
+                raise
+            finally:
+                for key, future in owned.items():
+                    if self._pending.get(key) is future:
+                        del self._pending[key]
+
+            for i, verdict in zip(missing, verdicts):
+                owned[keys[i]].set_result(verdict)
+                outcomes[i] = (verdict, False)
+                if generation == self._generation and SKIP_DEADLINE not in verdict.get("layers_skipped", {}).values():
+                    self.put(keys[i], verdict)
+
+        for i, pending in waiting:
+            outcomes[i] = (await asyncio.shield(pending), True)
+        return outcomes
+
+    def invalidate(self):
+        """Drop every cached verdict (models or bounds changed)."""
+        self._entries.clear()
+        self._pending.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        """JSON-serializable hit/miss statistics."""
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
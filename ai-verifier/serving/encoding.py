@@ -0,0 +1,152 @@
+"""
+Wire encodings for /verify and the verification stream.
+
+    application/json       request bodies are parsed straight into the
+                           pydantic model (pydantic-core's parser); responses
+                           are written with orjson when installed
+    application/msgpack    both ways, when the optional msgpack package is
+                           installed (application/x-msgpack is accepted too)
+    application/x-ndjson   /verify/stream: one JSON object per line
+
+A response uses msgpack if the Accept header asks for it, otherwise the
+request's own encoding, otherwise JSON. Streams are framed by the encoding
+itself: newline-delimited JSON, or back-to-back msgpack objects.
+"""
+
+import json
+from typing import Any
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:  # Optional: stdlib json is slower but equivalent
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: msgpack bodies are refused with 415
+    msgpack = None
+
+from config import STREAM_MAX_MESSAGE_BYTES
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+
+
+class UnsupportedEncoding(ValueError):
+    """The body's content type cannot be decoded here (HTTP 415)."""
+
+
+def media_type(header: str | None) -> str:
+    """Bare, lower-cased media type of a Content-Type header ("" if absent)."""
+    return (header or "").split(";", 1)[0].strip().lower()
+
+
+def is_msgpack(content_type: str | None) -> bool:
+    return media_type(content_type) in _MSGPACK_TYPES
+
+
+def response_type(accept: str | None, content_type: str | None = None) -> str:
+    """JSON or MSGPACK for a response, from Accept and the request's encoding."""
+    if msgpack is not None:
+        if accept and any(t in accept.lower() for t in _MSGPACK_TYPES):
+            return MSGPACK
+        if is_msgpack(content_type) and not (accept and JSON in accept.lower()):
+            return MSGPACK
+    return JSON
+
+
+def dumps_json(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads_json(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode(obj: Any, media: str) -> bytes:
+    """Encode one message as JSON or msgpack."""
+    if media == MSGPACK:
+        return msgpack.packb(obj)
+    return dumps_json(obj)
+
+
+def decode_msgpack(body: bytes) -> Any:
+    """Decode a msgpack body (UnsupportedEncoding if msgpack is not installed)."""
+    if msgpack is None:
+        raise UnsupportedEncoding("msgpack is not installed on this server")
+    try:
+        return msgpack.unpackb(body)
+    except ValueError as e:
+        raise ValueError(str(e) or "malformed data") from None
+
+
+class StreamDecoder:
+    """
+    Splits a byte stream into messages: raw JSON lines (NDJSON) or decoded
+    msgpack objects. A message over STREAM_MAX_MESSAGE_BYTES raises ValueError.
+    """
+
+    def __init__(self, content_type: str | None):
+        self.msgpack = is_msgpack(content_type)
+        if self.msgpack and msgpack is None:
+            raise UnsupportedEncoding("msgpack is not installed on this server")
+        if not self.msgpack and media_type(content_type) not in ("", NDJSON, JSON, "application/jsonl"):
+            raise UnsupportedEncoding(f"Unsupported stream encoding: {media_type(content_type)}")
+        self.media_type = MSGPACK if self.msgpack else NDJSON
+        # Fed at most STREAM_MAX_MESSAGE_BYTES at a time, so a full buffer
+        # means a pending message larger than that
+        self._unpacker = (
+            msgpack.Unpacker(max_buffer_size=2 * STREAM_MAX_MESSAGE_BYTES) if self.msgpack else None
+        )
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Messages completed by this chunk."""
+        if self._unpacker is not None:
+            messages = []
+            for start in range(0, len(chunk), STREAM_MAX_MESSAGE_BYTES):
+                try:
+                    self._unpacker.feed(chunk[start:start + STREAM_MAX_MESSAGE_BYTES])
+                except msgpack.BufferFull:
+                    raise ValueError(f"Message larger than {STREAM_MAX_MESSAGE_BYTES} bytes") from None
+                messages.extend(self._unpacker)
+            return messages
+
+        self._buffer += chunk
+        *lines, rest = self._buffer.split(b"\n")
+        if len(rest) > STREAM_MAX_MESSAGE_BYTES:
+            raise ValueError(f"Message larger than {STREAM_MAX_MESSAGE_BYTES} bytes")
+        self._buffer = bytearray(rest)
+        return [bytes(line) for line in lines if line.strip()]
+
+    def close(self) -> list[Any]:
+        """A final unterminated NDJSON line, if any."""
+        rest, self._buffer = bytes(self._buffer), bytearray()
+        return [rest] if rest.strip() else []
+
+    def encode(self, obj: Any) -> bytes:
+        """One framed response message in the stream's encoding."""
+        if self.msgpack:
+            return msgpack.packb(obj)
+        return dumps_json(obj) + b"\n"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that starts replying while the handler is still reading
+    the request body. Starlette's version reads `receive` itself to watch for
+    a disconnect, which would race the handler for body chunks; here a
+    disconnect surfaces as ClientDisconnect in the body reader instead.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await self.stream_response(send)
@@ -0,0 +1,232 @@
+"""
+Execution backends for CPU-bound detector work.
+
+The FastAPI handlers are async, so scoring or loading a model directly on
+the event loop stalls /health and every other request on the worker.
+DetectorExecutor runs detector calls in one of three modes:
+
+    inline   — on the event loop (no isolation, lowest overhead)
+    thread   — on a thread pool (NumPy/sklearn release the GIL in places)
+    process  — on a process pool, each worker holding its own detector
+
+In process mode each worker process keeps its own detector and loads each
+task type's model once. Reloads bump a per-task-type generation counter that
+travels with every call, so each worker reloads just the changed task type
+lazily on its next call instead of needing to be addressed individually.
+
+If an on_timings callback is given, the detector's per-layer timings are
+collected on every call (returned alongside the verdicts from worker
+processes) and passed to it on the event loop. With a Profiler, calls
+sampled during a profiling window run under cProfile wherever they execute.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from models.anomaly_detector import AnomalyDetector
+from serving.profiling import Profiler, profile_call
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Generation key for stat bounds reloads (task types key model reloads)
+_BOUNDS = "__bounds__"
+
+# Per-process state for process-pool workers
+_worker_detector: AnomalyDetector | None = None
+_worker_generations: dict[str | None, int] = {}
+
+
+def _init_worker():
+    """Process-pool initializer: one detector per worker process."""
+    global _worker_detector
+    _worker_detector = AnomalyDetector()
+
+
+def _worker_verify_many(
+    generations: dict[str | None, int],
+    items: list[dict[str, Any]],
+    collect_timings: bool = False,
+    profile: bool = False,
+) -> tuple[list[dict[str, Any]], list[tuple[str, str, float]] | None, dict | None]:
+    """Run verify_many in a worker process, reloading models that changed."""
+    # A full reload (key None) supersedes per-type reloads issued before it
+    if generations.get(None, 0) != _worker_generations.get(None, 0):
+        _worker_detector.reload_model()
+        _worker_generations.clear()
+        _worker_generations.update(generations)
+    for task_type, generation in generations.items():
+        if _worker_generations.get(task_type, 0) != generation:
+            if task_type == _BOUNDS:
+                _worker_detector.reload_bounds()
+            else:
+                _worker_detector.reload_model(task_type)
+            _worker_generations[task_type] = generation
+    timings = [] if collect_timings else None
+    if profile:
+        verdicts, stats = profile_call(_worker_detector.verify_many, items, timings)
+        return verdicts, timings, stats
+    return _worker_detector.verify_many(items, timings), timings, None
+
+
+class DetectorExecutor:
+    """Run AnomalyDetector calls off the event loop with bounded concurrency."""
+
+    def __init__(
+        self,
+        detector: AnomalyDetector,
+        mode: str = "thread",
+        workers: int = 4,
+        max_concurrency: int = 8,
+        on_timings: Callable[[list[tuple[str, str, float]]], Any] | None = None,
+        profiler: Profiler | None = None,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {mode} (expected one of {EXECUTOR_MODES})")
+
+        self.detector = detector
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self.on_timings = on_timings
+        self.profiler = profiler
+        self._semaphore: asyncio.Semaphore | None = None
+        # Reload generation per task type (None = all task types)
+        self._generations: dict[str | None, int] = {}
+        self._in_flight = 0
+        # Artifact signatures last seen by reload_changed_models()
+        self._signatures = detector.models.artifact_signatures()
+
+        # Started on first use, so the service can start again after shutdown()
+        self._pool: Executor | None = None
+        self._reload_pool: ThreadPoolExecutor | None = None
+
+    def _detector_pool(self) -> Executor:
+        """Thread or process pool running the detector."""
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="detector",
+                )
+            else:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+        return self._pool
+
+    def _reloads(self) -> ThreadPoolExecutor:
+        """Reloads always run on a thread so joblib.load never blocks the loop."""
+        if self._reload_pool is None:
+            self._reload_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reload")
+        return self._reload_pool
+
+    @property
+    def in_flight(self) -> int:
+        """Number of detector calls currently running or waiting for a slot."""
+        return self._in_flight
+
+    def generation(self, task_type: str) -> tuple[int, int, int]:
+        """Reload generations (all models, this task type's model, stat bounds) serving task_type."""
+        return (
+            self._generations.get(None, 0),
+            self._generations.get(task_type, 0),
+            self._generations.get(_BOUNDS, 0),
+        )
+
+    async def verify_many(self, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Verify a batch of items on the configured backend."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        timings = [] if self.on_timings is not None else None
+        profile = self.profiler is not None and self.profiler.sample()
+        self._in_flight += 1
+        try:
+            async with self._semaphore:
+                if self.mode == "inline":
+                    verdicts = self._call_detector(items, timings, profile)
+                elif self.mode == "thread":
+                    verdicts = await asyncio.get_running_loop().run_in_executor(
+                        self._detector_pool(), self._call_detector, items, timings, profile,
+                    )
+                else:
+                    start = time.perf_counter()
+                    verdicts, timings, stats = await asyncio.get_running_loop().run_in_executor(
+                        self._detector_pool(), _worker_verify_many, dict(self._generations), items,
+                        timings is not None, profile,
+                    )
+                    if stats is not None:
+                        self.profiler.add_stats("detector", stats, time.perf_counter() - start)
+        finally:
+            self._in_flight -= 1
+
+        if timings:
+            self.on_timings(timings)
+        return verdicts
+
+    def _call_detector(
+        self,
+        items: list[dict[str, Any]],
+        timings: list[tuple[str, str, float]] | None,
+        profile: bool,
+    ) -> list[dict[str, Any]]:
+        """verify_many on this thread, under the profiler if the call was sampled."""
+        if not profile:
+            return self.detector.verify_many(items, timings)
+        with self.profiler.profiled("detector"):
+            return self.detector.verify_many(items, timings)
+
+    async def verify(self, item: dict[str, Any]) -> dict[str, Any]:
+        """Verify a single item on the configured backend."""
+        return (await self.verify_many([item]))[0]
+
+    async def reload_model(self, task_type: str | None = None) -> dict[str, str | None]:
+        """
+        Reload one task type's model (or all) without blocking the event loop.
+
+        Returns task_type -> model version now serving.
+        """
+        loop = asyncio.get_running_loop()
+        versions = await loop.run_in_executor(
+            self._reloads(), self.detector.reload_model, task_type,
+        )
+        # Process workers pick up the new model on their next call
+        self._generations[task_type] = self._generations.get(task_type, 0) + 1
+        return versions
+
+    async def reload_bounds(self):
+        """Re-read statistical bounds without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._reloads(), self.detector.reload_bounds)
+        self._generations[_BOUNDS] = self._generations.get(_BOUNDS, 0) + 1
+
+    async def reload_changed_models(self) -> dict[str, str | None]:
+        """Reload every task type whose artifact changed on disk since last checked."""
+        loop = asyncio.get_running_loop()
+        signatures = await loop.run_in_executor(
+            self._reloads(), self.detector.models.artifact_signatures,
+        )
+        changed = [t for t, sig in signatures.items() if self._signatures.get(t) != sig]
+        self._signatures = signatures
+
+        # A changed shared fallback means a full reload
+        if None in changed:
+            return await self.reload_model()
+        versions: dict[str, str | None] = {}
+        for task_type in changed:
+            versions.update(await self.reload_model(task_type))
+        return versions
+
+    def shutdown(self):
+        """Release pool threads and worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._reload_pool is not None:
+            self._reload_pool.shutdown(wait=False, cancel_futures=True)
+            self._reload_pool = None
+        self._semaphore = None  # Bound to this event loop
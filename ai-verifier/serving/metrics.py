@@ -0,0 +1,379 @@
+"""
+Prometheus text-format metrics for the verification service.
+
+A minimal in-process implementation of counters, histograms and
+callback gauges and counters, rendered in the Prometheus text exposition format at
+/metrics. Recording is a dict lookup plus a bisect on fixed buckets, and all
+recording happens on the event loop, so no locks are taken. Detector layer
+timings measured in pool threads or worker processes travel back with the
+results and are recorded by the executor once the call returns.
+
+Gauges (queue depths, model versions and load times) and the monotonic
+counts the serving components keep themselves (cache lookups, admissions,
+batches) are read from the live objects only when /metrics is scraped.
+
+Series are labelled by task type, layer, endpoint, method and status, so
+their number stays bounded. Paths that are not app routes are reported as
+"other", and task types that are not in TASK_SPECS as "unknown".
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+from models.pipeline import SKIP_DEADLINE
+from models.task_specs import TASK_SPECS
+
+# Seconds; scoring one item takes ~0.1 ms, a large batch up to seconds
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Histogram:
+    """Fixed-bucket histogram per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last = +Inf), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: Any):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time: a number, or {labels: number}."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], float | dict[tuple, float]],
+        labelnames: tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.read = read
+
+    def samples(self) -> list[str]:
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for labels, value in values.items()
+            if value is not None
+        ]
+
+
+class CallbackCounter(Gauge):
+    """Monotonic count kept by another object, read at scrape time like a Gauge."""
+
+    kind = "counter"
+
+
+class MetricsRegistry:
+    """Named metrics, rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | Gauge | CallbackCounter] = {}
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], float | dict[tuple, float]],
+        labelnames: tuple[str, ...] = (),
+    ) -> Gauge:
+        return self._add(Gauge(name, help, read, labelnames))
+
+    def callback_counter(
+        self,
+        name: str,
+        help: str,
+        read: Callable[[], float | dict[tuple, float]],
+        labelnames: tuple[str, ...] = (),
+    ) -> CallbackCounter:
+        return self._add(CallbackCounter(name, help, read, labelnames))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+class VerifierMetrics:
+    """The service's metrics and the hooks that record them."""
+
+    def __init__(self, registry: MetricsRegistry | None = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.http_latency = r.histogram(
+            "verifier_http_request_duration_seconds",
+            "Request latency by endpoint, method and status.",
+            ("path", "method", "status"),
+        )
+        self.layer_latency = r.histogram(
+            "verifier_layer_duration_seconds",
+            "Detector layer time per task-type group in a verify_many call.",
+            ("layer", "task_type"),
+        )
+        self.verdicts = r.counter(
+            "verifier_verdicts_total",
+            "Verdicts by task type and recommendation.",
+            ("task_type", "recommendation"),
+        )
+        self.degraded = r.counter(
+            "verifier_degraded_verdicts_total",
+            "Verdicts from a partial check, by task type and cause (deadline, shed under load).",
+            ("task_type", "cause"),
+        )
+        self.validation_failures = r.counter(
+            "verifier_validation_failures_total",
+            "Results rejected by structural validation, by task type.",
+            ("task_type",),
+        )
+        self.started_at = time.time()
+        r.gauge("verifier_start_time_seconds", "Unix time the service started.", lambda: self.started_at)
+
+    def observe_layers(self, timings: list[tuple[str, str, float]]):
+        """Record (layer, task_type, seconds) timings from a detector call."""
+        for layer, task_type, seconds in timings:
+            self.layer_latency.observe(seconds, layer, task_type)
+
+    def observe_validation_failure(self, task_type: str):
+        """Count a rejected result; task types outside TASK_SPECS share "unknown"."""
+        self.validation_failures.inc(task_type if task_type in TASK_SPECS else "unknown")
+
+    def observe_verdicts(self, task_types: list[str], verdicts: list[dict[str, Any]], shed: bool = False):
+        for task_type, verdict in zip(task_types, verdicts):
+            self.verdicts.inc(task_type, verdict["recommendation"])
+            if shed:
+                self.degraded.inc(task_type, "shed")
+            elif SKIP_DEADLINE in verdict.get("layers_skipped", {}).values():
+                self.degraded.inc(task_type, "deadline")
+
+    def watch(
+        self, detector: Any, executor: Any, batcher: Any,
+        cache: Any = None, admission: Any = None, reference: Any = None,
+    ):
+        """Register scrape-time gauges and counters over the live detector, executor, batcher, cache, admission and reference engine."""
+        r = self.registry
+        r.gauge(
+            "verifier_model_info",
+            "Model version serving each task type loaded in this process (always 1).",
+            lambda: {
+                (task_type, entry.version): 1
+                for task_type, entry in detector.models.snapshots().items()
+            },
+            ("task_type", "version"),
+        )
+        r.gauge(
+            "verifier_model_load_seconds",
+            "Time the serving model took to load (and compile).",
+            lambda: {
+                (task_type,): entry.load_seconds
+                for task_type, entry in detector.models.snapshots().items()
+            },
+            ("task_type",),
+        )
+        r.gauge(
+            "verifier_model_loaded_timestamp_seconds",
+            "Unix time the serving model was loaded.",
+            lambda: {
+                (task_type,): entry.loaded_at
+                for task_type, entry in detector.models.snapshots().items()
+            },
+            ("task_type",),
+        )
+        r.gauge(
+            "verifier_executor_in_flight",
+            "Detector calls running or waiting for an executor slot.",
+            lambda: executor.in_flight,
+        )
+        r.gauge(
+            "verifier_batcher_queue_depth",
+            "/verify items waiting to be micro-batched.",
+            lambda: batcher.queue_depth,
+        )
+        r.callback_counter("verifier_batcher_batches_total", "Micro-batches dispatched.", lambda: batcher.stats.batches)
+        r.callback_counter("verifier_batcher_items_total", "Items dispatched in micro-batches.", lambda: batcher.stats.items)
+        if cache is not None:
+            r.gauge("verifier_cache_entries", "Verdicts held in the verify cache.", lambda: len(cache))
+            r.callback_counter(
+                "verifier_cache_lookups_total",
+                "Verify cache lookups by outcome (hit, coalesced with an in-flight request, miss).",
+                lambda: {("hit",): cache.hits, ("coalesced",): cache.coalesced, ("miss",): cache.misses},
+                ("outcome",),
+            )
+            r.callback_counter(
+                "verifier_cache_evictions_total", "Verdicts evicted from the verify cache (LRU).", lambda: cache.evictions,
+            )
+            r.callback_counter(
+                "verifier_cache_invalidations_total", "Verify cache clears on model or bounds reloads.",
+                lambda: cache.invalidations,
+            )
+        if admission is not None:
+            r.gauge("verifier_admission_in_flight", "Requests holding an admission slot.", lambda: admission.in_flight)
+            r.gauge("verifier_admission_queued", "Requests queued for an admission slot.", lambda: admission.queued)
+            r.callback_counter(
+                "verifier_admission_admitted_total", "Requests admitted to the detector.", lambda: admission.admitted,
+            )
+            r.callback_counter(
+                "verifier_admission_shed_total",
+                "Requests shed to a statistical-only verdict, by reason.",
+                lambda: {(reason,): count for reason, count in admission.shed.items()},
+                ("reason",),
+            )
+            r.gauge(
+                "verifier_admission_expected_wait_seconds",
+                "Expected queue time of a request arriving now.",
+                lambda: admission.expected_wait_s(),
+            )
+        if reference is not None:
+            r.callback_counter(
+                "verifier_reference_lookups_total",
+                "Reference result lookups by outcome (hit, coalesced with an in-flight recompute, miss).",
+                lambda: {("hit",): reference.hits, ("coalesced",): reference.coalesced, ("miss",): reference.misses},
+                ("outcome",),
+            )
+            r.gauge("verifier_reference_in_flight", "Reference recomputes running.", lambda: reference.in_flight)
+            r.callback_counter(
+                "verifier_reference_mismatches_total", "Spot-checked results that did not match the reference.",
+                lambda: reference.mismatches,
+            )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-endpoint latency (pure ASGI, no per-request task)."""
+
+    def __init__(self, app: Any, metrics: VerifierMetrics):
+        self.app = app
+        self.metrics = metrics
+        self._paths: set[str] | None = None
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: dict):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.http_latency.observe(
+                time.perf_counter() - start, self._path(scope), scope["method"], status,
+            )
+
+    def _path(self, scope: dict) -> str:
+        """The route path, or "other" (keeps label cardinality bounded)."""
+        if self._paths is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._paths = {route.path for route in routes if hasattr(route, "path")}
+        path = scope["path"]
+        return path if path in self._paths else "other"
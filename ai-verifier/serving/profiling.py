@@ -0,0 +1,274 @@
+"""
+On-demand sampled profiling of the verify hot path.
+
+An admin opens a profiling window at runtime (POST /admin/profile/start).
+For its duration a fraction of /verify and /verify/batch calls is sampled:
+
+    request   the ASGI call on the event loop: pydantic parsing of
+              VerifyRequest, structural validation, response serialization
+              (other coroutines interleaving on the loop are included)
+    detector  each sampled AnomalyDetector.verify_many call wherever the
+              executor runs it (pool thread, worker process or inline):
+              sklearn/compiled scoring, NumPy work in the layers
+
+Each sampled call runs under cProfile, and its stats are merged per source.
+With memory tracing on, tracemalloc also runs for the call (request and
+inline/thread detector calls). The sizes of blocks still alive when the call
+returns are summed per allocation site, and per-call peaks are kept.
+GET /admin/profile returns the top functions and allocation sites so far.
+
+Outside a window the hooks cost one attribute check per call. cProfile is
+per thread before Python 3.12 and process-wide from 3.12 on (sys.monitoring
+allows a single profiler), so sampled calls that would overlap an active
+profile are skipped and counted. Memory tracing is process-wide, so at
+most one call is traced at a time.
+"""
+
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+_PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The event loop waiting for I/O: idle time, not hot-path cost
+_IDLE_FUNCTIONS = ("<method 'poll' of 'select.", "<method 'select' of 'select.", "<method 'control' of 'select.")
+
+
+class _RawStats:
+    """pstats input for stats dicts returned by worker processes."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def profile_call(fn: Any, *args: Any) -> tuple[Any, dict]:
+    """Run fn(*args) under cProfile and return (result, raw stats), for worker processes."""
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        result = fn(*args)
+    finally:
+        profile.disable()
+    profile.create_stats()
+    return result, profile.stats
+
+
+class Profiler:
+    """Sampling window state and the aggregated profiles."""
+
+    def __init__(self):
+        self.active = False
+        self.sample_rate = 0.0
+        self.memory = False
+        self.started_at: float | None = None
+        self.ends_at = 0.0
+        self._stats_lock = threading.Lock()
+        self._process_gate = threading.Lock()
+        self._thread_gates = threading.local()
+        self._memory_gate = threading.Lock()
+        self._reset()
+
+    def start(self, sample_rate: float, window_s: float, memory: bool = True):
+        """Open a sampling window, discarding the previous window's results."""
+        with self._stats_lock:
+            self._reset()
+            self.sample_rate = min(1.0, max(0.0, sample_rate))
+            self.memory = memory
+            self.started_at = time.time()
+            self.ends_at = time.monotonic() + window_s
+            self.active = True
+
+    def stop(self):
+        """Close the window early (results are kept until the next start)."""
+        self.active = False
+
+    def sample(self) -> bool:
+        """Whether to profile this call (False outside a window)."""
+        if not self.active:
+            return False
+        if time.monotonic() >= self.ends_at:
+            self.active = False
+            return False
+        self.seen += 1
+        return random.random() < self.sample_rate
+
+    @contextmanager
+    def profiled(self, source: str, memory: bool = True) -> Iterator[None]:
+        """Profile the enclosed call (and trace its memory) into `source`."""
+        gate = self._gate()
+        if not gate.acquire(blocking=False):
+            self.skipped += 1
+            yield
+            return
+
+        tracing = memory and self.memory and self._start_tracing()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler (e.g. a debugger) is active
+            profile = None
+            self.skipped += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            gate.release()
+            if tracing:
+                self._stop_tracing(source)
+            if profile is not None:
+                self.add_stats(source, profile, elapsed)
+
+    def add_stats(self, source: str, profile: Any, elapsed: float):
+        """Merge a cProfile.Profile, or a raw stats dict from a worker, into `source`."""
+        if isinstance(profile, dict):
+            profile = _RawStats(profile)
+        with self._stats_lock:
+            stats = self._stats.get(source)
+            if stats is None:
+                stats = self._stats[source] = pstats.Stats()
+            stats.add(profile)
+            self.sampled[source] = self.sampled.get(source, 0) + 1
+            self.sampled_seconds[source] = self.sampled_seconds.get(source, 0.0) + elapsed
+
+    def report(self, top: int = 25) -> dict[str, Any]:
+        """Top functions per source and top allocation sites for the window."""
+        with self._stats_lock:
+            profiles = {
+                source: {
+                    "calls_sampled": self.sampled[source],
+                    "sampled_ms": round(self.sampled_seconds[source] * 1000, 3),
+                    "by_own_time": _top_functions(stats, top, own=True),
+                    "by_cumulative_time": _top_functions(stats, top, own=False),
+                }
+                for source, stats in self._stats.items()
+            }
+            allocations = sorted(self._allocations.items(), key=lambda kv: -kv[1][0])[:top]
+            peaks = sorted(self._memory_peaks)
+
+        return {
+            "active": self.active,
+            "started_at": self.started_at,
+            "remaining_s": round(max(0.0, self.ends_at - time.monotonic()), 1) if self.active else 0.0,
+            "sample_rate": self.sample_rate,
+            "calls_seen": self.seen,
+            "calls_skipped": self.skipped,
+            "profiles": profiles,
+            "memory": {
+                "enabled": self.memory,
+                "calls_traced": len(peaks),
+                "peak_kb": {
+                    "p50": round(peaks[len(peaks) // 2] / 1024, 1) if peaks else None,
+                    "max": round(peaks[-1] / 1024, 1) if peaks else None,
+                },
+                "top_sites": [
+                    {"site": site, "retained_kb": round(size / 1024, 1), "blocks": count}
+                    for site, (size, count) in allocations
+                ],
+            },
+        }
+
+    def _reset(self):
+        self.seen = 0
+        self.skipped = 0
+        self.sampled: dict[str, int] = {}
+        self.sampled_seconds: dict[str, float] = {}
+        self._stats: dict[str, pstats.Stats] = {}
+        self._allocations: dict[str, list[int]] = {}
+        self._memory_peaks: list[int] = []
+
+    def _gate(self) -> threading.Lock:
+        """Lock allowing one active cProfile where cProfile can have only one."""
+        if _PROCESS_WIDE_PROFILER:
+            return self._process_gate
+        gate = getattr(self._thread_gates, "lock", None)
+        if gate is None:
+            gate = self._thread_gates.lock = threading.Lock()
+        return gate
+
+    def _start_tracing(self) -> bool:
+        if tracemalloc.is_tracing() or not self._memory_gate.acquire(blocking=False):
+            return False  # Traced elsewhere (another call, or -X tracemalloc)
+        tracemalloc.start()
+        return True
+
+    def _stop_tracing(self, source: str):
+        try:
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            tracemalloc.stop()
+            self._memory_gate.release()
+
+        # Leave out the profiler's own bookkeeping (other threads merging stats)
+        statistics = snapshot.filter_traces([
+            tracemalloc.Filter(False, module.__file__) for module in (tracemalloc, pstats, cProfile)
+        ] + [tracemalloc.Filter(False, __file__)]).statistics("lineno")
+        with self._stats_lock:
+            self._memory_peaks.append(peak)
+            for stat in statistics:
+                frame = stat.traceback[0]
+                site = f"{source} {_short_path(frame.filename)}:{frame.lineno}"
+                entry = self._allocations.setdefault(site, [0, 0])
+                entry[0] += stat.size
+                entry[1] += stat.count
+
+
+class ProfilingMiddleware:
+    """ASGI middleware sampling request-level profiles for the given paths."""
+
+    def __init__(self, app: Any, profiler: Profiler, paths: tuple[str, ...] = ("/verify", "/verify/batch")):
+        self.app = app
+        self.profiler = profiler
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: dict, receive: Any, send: Any):
+        if not (
+            self.profiler.active
+            and scope["type"] == "http"
+            and scope["path"] in self.paths
+            and self.profiler.sample()
+        ):
+            return await self.app(scope, receive, send)
+        with self.profiler.profiled("request"):
+            await self.app(scope, receive, send)
+
+
+def _top_functions(stats: pstats.Stats, top: int, own: bool) -> list[dict[str, Any]]:
+    """Top entries of merged stats by own (tottime) or cumulative time."""
+    column = 2 if own else 3
+    rows = sorted(
+        (kv for kv in stats.stats.items() if not kv[0][2].startswith(_IDLE_FUNCTIONS)),
+        key=lambda kv: -kv[1][column],
+    )[:top]
+    return [
+        {
+            "function": f"{_short_path(filename)}:{lineno}({name})",
+            "calls": calls,
+            "own_ms": round(own_time * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, lineno, name), (_, calls, own_time, cumulative, _) in rows
+    ]
+
+
+def _short_path(filename: str) -> str:
+    """Service-relative or site-packages-relative path for display."""
+    if filename.startswith(_SERVICE_DIR):
+        return os.path.relpath(filename, _SERVICE_DIR)
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
@@ -0,0 +1,145 @@
+"""
+Reference computation (Layer 4) for the running service.
+
+Recomputing a task (models/reference_compute.py) takes from milliseconds
+to seconds of NumPy, so it runs in a spawned process pool, never on the
+event loop or the detector pools. Many devices receive the same task, so
+reference results are cached by the canonical hash of the task's
+parameters (payload_key): a task is recomputed once however many devices
+submit it, and a submission arriving while its task is being recomputed
+waits for that computation instead of starting another.
+
+Failed recomputes are not cached. The least recently used results are
+evicted beyond max_entries.
+"""
+
+import asyncio
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from config import REFERENCE_WORKERS, REFERENCE_CACHE_SIZE
+from models import reference_compute
+from models.reference_compute import compare, payload_key
+
+# layers_skipped reason when the reference could not be recomputed
+SKIP_UNAVAILABLE = "unavailable"
+
+
+class ReferenceEngine:
+    """Process-pool reference recomputes behind an LRU cache with request coalescing."""
+
+    def __init__(self, workers: int = REFERENCE_WORKERS, max_entries: int = REFERENCE_CACHE_SIZE):
+        self.workers = workers  # 0 = recompute on a thread of this process
+        self.max_entries = max_entries
+        self._pool: ProcessPoolExecutor | None = None
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._pending: dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self.checks = 0
+        self.mismatches = 0
+        self.compute_s = 0.0
+
+    @property
+    def in_flight(self) -> int:
+        """Distinct recomputes running."""
+        return len(self._pending)
+
+    async def reference(self, task_type: str, payload: dict[str, Any], task_id: str | None = None) -> dict[str, Any]:
+        """Reference result of a task, recomputed at most once per distinct payload."""
+        key = payload_key(task_type, payload, task_id)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await self._recompute(task_type, payload, task_id)
+        except BaseException as e:
+            self.errors += 1
+            future.set_exception(e)
+            future.exception()  # Retrieved: waiters re-raise it, no "never retrieved" warning
+            raise
+        finally:
+            del self._pending[key]
+
+        future.set_result(result)
+        if self.max_entries > 0:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    async def spot_check(
+        self, task_type: str, payload: dict[str, Any], result: dict[str, Any], task_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Compare a submitted result against the task's reference (see compare())."""
+        reference = await self.reference(task_type, payload, task_id)
+        check = compare(task_type, reference, result)
+        self.checks += 1
+        if not check["passed"]:
+            self.mismatches += 1
+        return check
+
+    async def _recompute(self, task_type: str, payload: dict[str, Any], task_id: str | None) -> dict[str, Any]:
+        start = time.perf_counter()
+        if self.workers <= 0:
+            result = await asyncio.to_thread(reference_compute.recompute, task_type, payload, task_id)
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                )
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, reference_compute.recompute, task_type, payload, task_id,
+                )
+            except BrokenProcessPool:
+                self._pool = None  # A worker died (e.g. OOM): start fresh ones next time
+                raise
+        self.compute_s += time.perf_counter() - start
+        return result
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict[str, Any]:
+        """JSON-serializable cache, recompute and spot-check statistics."""
+        lookups = self.hits + self.coalesced + self.misses
+        computed = self.misses - self.errors
+        return {
+            "workers": self.workers,
+            "task_types": sorted(reference_compute.REFERENCE_COMPUTES),
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "in_flight": self.in_flight,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "mean_compute_ms": round(self.compute_s * 1000.0 / computed, 3) if computed > 0 else 0.0,
+            "checks": self.checks,
+            "mismatches": self.mismatches,
+        }
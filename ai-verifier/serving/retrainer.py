@@ -0,0 +1,110 @@
+"""
+Background retraining for the running service.
+
+Retraining (training/retrain.py) is CPU-heavy, so it runs in a separate
+spawned process and never on the event loop or the detector pools. When a
+run publishes new artifacts, the on_published callback hot-swaps them (the
+registry loads each new version off to the side and swaps it in), so
+requests keep scoring on the old model until the new one is ready.
+
+At most one run is active at a time. Runs are started through the API,
+on a fixed interval, or once at startup when no model exists yet.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+def _run_retrain(task_types: list[str] | None) -> dict[str, Any]:
+    """Process-pool entry point (training code is only imported in the worker)."""
+    from training.retrain import retrain
+    return retrain(task_types)
+
+
+class Retrainer:
+    """Run retraining in a background process and publish the results."""
+
+    def __init__(self, on_published: Callable[[list[str]], Awaitable[Any]]):
+        self.on_published = on_published
+        self._pool: ProcessPoolExecutor | None = None
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.last_started: float | None = None
+        self.last_finished: float | None = None
+        self.last_report: dict[str, Any] | None = None
+        self.last_error: str | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, task_type: str | None = None) -> bool:
+        """Start a run in the background; False if one is already running."""
+        if self.running:
+            return False
+        self._task = asyncio.get_running_loop().create_task(self._run(task_type))
+        return True
+
+    async def run(self, task_type: str | None = None) -> dict[str, Any]:
+        """Start a run (or join the active one) and wait for it to finish."""
+        self.start(task_type)
+        await asyncio.shield(self._task)
+        return self.status()
+
+    async def schedule(self, interval_s: float):
+        """Start a run every interval_s seconds (skipped while one is running)."""
+        while True:
+            await asyncio.sleep(interval_s)
+            self.start()
+
+    def status(self) -> dict[str, Any]:
+        """JSON-serializable state of the last and current run."""
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_error": self.last_error,
+            "last_report": self.last_report,
+        }
+
+    def shutdown(self):
+        """Cancel a pending run and stop the worker process."""
+        if self._task is not None:
+            self._task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self, task_type: str | None):
+        """One retraining run: train off-process, then hot-swap what was published."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+            )
+        self.runs += 1
+        self.last_started = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            report = await loop.run_in_executor(
+                self._pool, _run_retrain, [task_type] if task_type else None,
+            )
+            self.last_report = report
+            self.last_error = None
+            if report["published"]:
+                await self.on_published(report["published"])
+                logger.info("Retrained models: %s", report["published"])
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._pool = None  # Worker died (e.g. OOM): start a fresh one next run
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Retraining failed")
+        finally:
+            self.last_finished = time.time()
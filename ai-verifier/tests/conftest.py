@@ -0,0 +1,81 @@
+"""
+Shared fixtures. The service imports its modules as top-level packages
+(config, models, serving, training), so ai-verifier/ goes on sys.path.
+
+Models are trained on synthetic data into a temporary directory, so tests
+never depend on (or write to) models/trained/.
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing main must not train in the background or spawn reference workers
+os.environ.setdefault("AI_VERIFIER_RETRAIN_BOOTSTRAP", "false")
+os.environ.setdefault("AI_VERIFIER_REFERENCE_WORKERS", "0")
+
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from config import STAT_BOUNDS
+from models.anomaly_detector import AnomalyDetector
+from models.features import feature_matrix
+from models.model_registry import ModelRegistry, model_path_for, publish_model
+from models.stat_bounds import StatBounds
+from training.fetch_data import generate_synthetic_data
+
+ML_TASK_TYPES = ("protein", "climate", "signal", "drugscreen")
+
+
+def fit_forest(task_type: str, n: int = 400, seed: int = 0, **params) -> IsolationForest:
+    """A small Isolation Forest fitted on synthetic results of one task type."""
+    samples = [s for s in generate_synthetic_data(n, seed=seed) if s["task_type"] == task_type]
+    matrix = feature_matrix(task_type, [s["result"] for s in samples], [s["compute_time_ms"] for s in samples])
+    params = {"n_estimators": 25, "contamination": 0.05, "random_state": seed, **params}
+    return IsolationForest(**params).fit(matrix.X)
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory) -> str:
+    """Directory with a published model per ML task type."""
+    path = str(tmp_path_factory.mktemp("trained"))
+    for task_type in ML_TASK_TYPES:
+        publish_model(fit_forest(task_type), model_path_for(task_type, path))
+    return path
+
+
+@pytest.fixture
+def detector(model_dir) -> AnomalyDetector:
+    """Detector over the session's models and the config default bounds."""
+    return AnomalyDetector(ModelRegistry(model_dir, fallback_path=None, mmap=False), StatBounds(STAT_BOUNDS))
+
+
+@pytest.fixture
+def results() -> list[dict]:
+    """Synthetic mining results of every ML task type, with a few obvious outliers."""
+    rng = random.Random(7)
+    items = [
+        {"task_type": s["task_type"], "result": s["result"], "compute_time_ms": s["compute_time_ms"]}
+        for s in generate_synthetic_data(12, seed=3)
+    ]
+    items += [
+        {"task_type": "protein", "result": {"finalEnergy": 900.0, "residueCount": 15, "iterations": 1000},
+         "compute_time_ms": 5},
+        {"task_type": "climate", "result": {"maxTemperature": 400.0, "avgTemperature": -90.0, "centerTemp": 1.0},
+         "compute_time_ms": 90000},
+    ]
+    rng.shuffle(items)
+    return items
+
+
+@pytest.fixture(scope="module")
+def client():
+    """TestClient over the service app, lifespan included."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
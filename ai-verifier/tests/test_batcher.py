@@ -0,0 +1,100 @@
+"""MicroBatcher: coalescing, per-caller result routing, failures and close()."""
+
+import asyncio
+
+import pytest
+
+from serving.batcher import MicroBatcher
+
+
+def test_each_caller_gets_its_own_result():
+    batches = []
+
+    def run_batch(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+        await batcher.close()
+        return results, batcher.stats.snapshot()
+
+    results, stats = asyncio.run(main())
+    assert results == [i * 10 for i in range(20)]
+    assert sorted(item for batch in batches for item in batch) == list(range(20))
+    assert all(len(batch) <= 8 for batch in batches)
+    assert len(batches) < 20  # Concurrent calls were coalesced
+    assert stats["items"] == 20 and stats["batches"] == len(batches)
+    assert stats["max_observed_batch"] == max(len(batch) for batch in batches)
+
+
+def test_coroutine_run_batch_and_routing_when_batches_overlap():
+    async def run_batch(items):
+        # Later batches finish first, so results must follow their own batch
+        await asyncio.sleep(0.02 if items[0] == 0 else 0.0)
+        return [{"item": item} for item in items]
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(9)))
+        await batcher.close()
+        return results
+
+    assert asyncio.run(main()) == [{"item": i} for i in range(9)]
+
+
+def test_batch_failure_fails_only_that_batch():
+    def run_batch(items):
+        if 0 in items:
+            raise ValueError("bad batch")
+        return items
+
+    async def main():
+        batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=50)
+        first = asyncio.gather(batcher.submit(0), batcher.submit(1), return_exceptions=True)
+        failed = await first
+        ok = await asyncio.gather(batcher.submit(2), batcher.submit(3))
+        await batcher.close()
+        return failed, ok, batcher.stats.errors
+
+    failed, ok, errors = asyncio.run(main())
+    assert all(isinstance(e, ValueError) for e in failed)
+    assert ok == [2, 3]
+    assert errors == 1
+
+
+def test_close_fails_pending_callers():
+    release = None
+
+    async def run_batch(items):
+        await release.wait()
+        return items
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=0)
+        waiting = [asyncio.create_task(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.01)  # First batch dispatched and blocked
+        await batcher.close()
+        return await asyncio.gather(*waiting, return_exceptions=True)
+
+    outcomes = asyncio.run(main())
+    assert len(outcomes) == 3
+    assert all(isinstance(e, RuntimeError) and "closed" in str(e) for e in outcomes)
+
+
+def test_max_wait_dispatches_a_partial_batch():
+    async def main():
+        batcher = MicroBatcher(lambda items: items, max_batch_size=64, max_wait_ms=1)
+        result = await asyncio.wait_for(batcher.submit("x"), timeout=1.0)
+        await batcher.close()
+        return result
+
+    assert asyncio.run(main()) == "x"
+
+
+@pytest.mark.parametrize("size", [0, -5])
+def test_batch_size_is_at_least_one(size):
+    assert MicroBatcher(lambda items: items, max_batch_size=size).max_batch_size == 1
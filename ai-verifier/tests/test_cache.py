@@ -0,0 +1,136 @@
+"""VerificationCache keys, coalescing, expiry and invalidation."""
+
+import asyncio
+
+from models.pipeline import SKIP_DEADLINE
+from serving import cache as cache_module
+from serving.cache import VerificationCache
+
+RESULT = {"finalEnergy": -15.2, "residueCount": 12, "iterations": 1000}
+
+
+def verdict(confidence: float = 0.9, **extra) -> dict:
+    return {"confidence": confidence, "recommendation": "accept", "layers_skipped": {}, **extra}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_key_ignores_peer_order_and_dict_order():
+    cache = VerificationCache()
+    peers = [{"finalEnergy": -14.0}, {"finalEnergy": -16.0}]
+    reordered = {"iterations": 1000, "residueCount": 12, "finalEnergy": -15.2}
+    assert cache.key("protein", RESULT, 3000, peers) == cache.key("protein", reordered, 3000, peers[::-1])
+
+
+def test_key_separates_submitters_and_detector_state():
+    cache = VerificationCache()
+    base = cache.key("protein", RESULT, 3000, task_id="t", device_id="a")
+    assert base != cache.key("protein", RESULT, 3000, task_id="t", device_id="b")
+    assert base != cache.key("protein", RESULT, 3000, task_id="t", device_id=None)
+    assert base != cache.key("protein", RESULT, 3000, task_id="t", device_id="a", state=("v2",))
+    assert base != cache.key("protein", RESULT, 3001, task_id="t", device_id="a")
+    assert base == cache.key("protein", dict(RESULT), 3000, task_id="t", device_id="a")
+
+
+def test_identical_requests_are_computed_once():
+    cache = VerificationCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return verdict()
+
+    async def main():
+        first = await asyncio.gather(*(cache.get_or_compute(b"k", compute) for _ in range(5)))
+        again = await cache.get_or_compute(b"k", compute)
+        return first, again
+
+    first, again = run(main())
+    assert len(calls) == 1
+    assert [cached for _, cached in first].count(False) == 1
+    assert again == (verdict(), True)
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 1)
+
+
+def test_invalidate_drops_entries_and_verdicts_computed_across_it():
+    cache = VerificationCache()
+
+    async def compute_invalidated():
+        cache.invalidate()  # Models reloaded while this verdict was computed
+        return verdict(0.1)
+
+    async def main():
+        await cache.get_or_compute(b"a", lambda: asyncio.sleep(0, verdict()))
+        assert len(cache) == 1
+        cache.invalidate()
+        assert len(cache) == 0
+        await cache.get_or_compute(b"b", compute_invalidated)
+
+    run(main())
+    assert len(cache) == 0
+    assert cache.invalidations == 2
+
+
+def test_deadline_skipped_verdicts_are_not_cached():
+    cache = VerificationCache()
+    partial = verdict(layers_skipped={"ml": SKIP_DEADLINE})
+    run(cache.get_or_compute(b"k", lambda: asyncio.sleep(0, partial)))
+    assert len(cache) == 0
+
+
+def test_entries_expire_and_lru_is_bounded(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = VerificationCache(max_entries=2, ttl_s=10)
+    for key in (b"a", b"b", b"c"):
+        cache.put(key, verdict())
+    assert cache.get(b"a") is None and cache.evictions == 1
+    now[0] = 11.0
+    assert cache.get(b"b") is None and cache.expirations == 1
+
+
+def test_failures_are_not_cached_and_reach_waiters():
+    cache = VerificationCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("detector down")
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_compute(b"k", fail) for _ in range(3)), return_exceptions=True)
+
+    outcomes = run(main())
+    assert all(isinstance(e, RuntimeError) for e in outcomes)
+    assert len(cache) == 0
+
+
+def test_get_or_compute_many_scores_only_misses_once():
+    cache = VerificationCache()
+    computed = []
+
+    async def compute(indices):
+        computed.append(list(indices))
+        return [verdict(0.5 + i / 100) for i in indices]
+
+    async def main():
+        await cache.get_or_compute(b"hit", lambda: asyncio.sleep(0, verdict(0.99)))
+        return await cache.get_or_compute_many([b"x", b"hit", b"y", b"x"], compute)
+
+    outcomes = run(main())
+    assert computed == [[0, 2]]  # The repeated b"x" is computed once
+    assert outcomes == [(verdict(0.5), False), (verdict(0.99), True), (verdict(0.52), False), (verdict(0.5), True)]
+
+
+def test_same_result_from_other_devices_is_recorded(client):
+    import main
+
+    body = {"task_type": "protein", "result": RESULT, "compute_time_ms": 3000, "task_id": "cache-devices"}
+    hits = main.verdict_cache.hits
+    for device_id in ("device-a", "device-b", "device-a"):
+        assert client.post("/verify", json={**body, "device_id": device_id}).status_code == 200
+
+    assert main.verdict_cache.hits == hits + 1  # Only device-a's retry was deduplicated
+    assert main.peer_store.stats("cache-devices")["finalEnergy"][0] == 2
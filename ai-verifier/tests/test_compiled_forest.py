@@ -0,0 +1,59 @@
+"""CompiledIsolationForest against the sklearn IsolationForest it was compiled from."""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from models.compiled_forest import CHUNK_ROWS, CompiledIsolationForest
+
+
+def data(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4)) * [3000.0, 10.0, 1.0, 500.0] + [3000.0, -15.0, 0.0, 1000.0]
+    X[:, 2] = rng.integers(0, 50, n)  # An integer-valued column, like residueCount
+    return X
+
+
+@pytest.mark.parametrize("params", [
+    {"n_estimators": 50},
+    {"n_estimators": 30, "max_samples": 64, "contamination": 0.05},
+    {"n_estimators": 20, "max_features": 0.5, "bootstrap": True},
+])
+def test_decision_function_matches_sklearn(params):
+    model = IsolationForest(random_state=1, **params).fit(data(2000))
+    compiled = CompiledIsolationForest.from_sklearn(model)
+    X = np.vstack([data(CHUNK_ROWS * 2 + 7, seed=2), data(50, seed=3) * 20.0])  # Several chunks, outliers
+    np.testing.assert_allclose(compiled.decision_function(X), model.decision_function(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    predictions, decision = compiled.score(X)
+    np.testing.assert_array_equal(predictions, model.predict(X))
+    np.testing.assert_allclose(decision, model.decision_function(X), rtol=0, atol=1e-12)
+
+
+def test_single_row_and_feature_count_check():
+    model = IsolationForest(n_estimators=10, random_state=0).fit(data(300))
+    compiled = CompiledIsolationForest.from_sklearn(model)
+    row = data(1, seed=5)[0]
+    np.testing.assert_allclose(compiled.decision_function(row), model.decision_function(row[None, :]), atol=1e-12)
+    with pytest.raises(ValueError):
+        compiled.decision_function(np.zeros((2, 3)))
+
+
+def test_saved_arrays_memory_map_to_the_same_scores(tmp_path):
+    model = IsolationForest(n_estimators=15, random_state=0).fit(data(500))
+    compiled = CompiledIsolationForest.from_sklearn(model)
+    path = str(tmp_path / "forest.joblib")
+    compiled.save(path)
+    loaded = CompiledIsolationForest.load(path, mmap_mode="r")
+    assert isinstance(loaded.feature, np.memmap)
+    assert loaded.n_estimators == 15 and loaded.nbytes == compiled.nbytes
+    X = data(100, seed=9)
+    np.testing.assert_array_equal(loaded.decision_function(X), compiled.decision_function(X))
+
+
+def test_float32_thresholds_keep_decisions():
+    model = IsolationForest(n_estimators=25, random_state=0).fit(data(1000))
+    compiled = CompiledIsolationForest.from_sklearn(model, threshold_dtype=np.float32)
+    X = data(1000, seed=4)
+    assert compiled.threshold.dtype == np.float32
+    np.testing.assert_allclose(compiled.decision_function(X), model.decision_function(X), atol=1e-6)
@@ -0,0 +1,99 @@
+"""DeviceProfiles pool growth and eviction, and the device history layer capping confidence."""
+
+import numpy as np
+import pytest
+
+from models import device_profiles as dp
+from models.device_profiles import DeviceProfiles
+from models.features import feature_matrix
+
+PROTEIN = {"finalEnergy": -15.343394, "residueCount": 17, "iterations": 1000}
+
+
+def features(result: dict, compute_time_ms: float = 3000) -> list[float]:
+    return feature_matrix("protein", [result], [compute_time_ms]).X[0].tolist()
+
+
+def test_pool_starts_empty_and_doubles_up_to_max_devices():
+    profiles = DeviceProfiles(max_devices=dp._INITIAL_SLOTS * 3, window=4)
+    assert profiles.capacity == 0 and profiles.memory_bytes == 0
+
+    profiles.record("d0", "protein", features(PROTEIN), "accept")
+    assert profiles.capacity == dp._INITIAL_SLOTS
+
+    for i in range(1, dp._INITIAL_SLOTS + 1):
+        profiles.record(f"d{i}", "protein", features({**PROTEIN, "finalEnergy": -float(i)}), "review")
+    assert len(profiles) == dp._INITIAL_SLOTS + 1
+    assert profiles.capacity == 2 * dp._INITIAL_SLOTS
+
+    for i in range(dp._INITIAL_SLOTS + 1, 2 * dp._INITIAL_SLOTS + 1):
+        profiles.record(f"d{i}", "protein", None, "accept")
+    assert profiles.capacity == 3 * dp._INITIAL_SLOTS  # Capped at max_devices, not 4x
+    assert profiles.evictions == 0
+
+    # Rings recorded before each reallocation survive it
+    first = profiles.history("d0", "protein")
+    assert first.features[0, 1] == pytest.approx(-15.343394) and first.verdicts[0] == 0
+    middle = profiles.history(f"d{dp._INITIAL_SLOTS}", "protein")
+    assert middle.features[0, 1] == pytest.approx(-float(dp._INITIAL_SLOTS)) and middle.verdicts[0] == 1
+
+
+def test_least_recently_active_device_gives_up_its_slot():
+    profiles = DeviceProfiles(max_devices=3, window=4)
+    for device in ("a", "b", "c"):
+        profiles.record(device, "protein", features(PROTEIN), "reject")
+    profiles.record("a", "protein", features(PROTEIN), "accept")  # a is now the most recent
+
+    profiles.record("d", "protein", features({**PROTEIN, "finalEnergy": -5.0}), "accept")
+    assert profiles.evictions == 1 and len(profiles) == 3 and profiles.capacity == 3
+    assert profiles.history("b", "protein") is None
+    assert profiles.history("a", "protein") is not None
+
+    # The reused slot starts empty: nothing of b's rings leaks into d's history
+    history = profiles.history("d", "protein")
+    assert np.count_nonzero(history.verdicts >= 0) == 1
+    assert np.count_nonzero(~np.isnan(history.features[:, 0])) == 1
+    assert history.features[0, 1] == pytest.approx(-5.0)
+
+
+def test_ring_keeps_the_last_window_submissions():
+    profiles = DeviceProfiles(max_devices=2, window=3)
+    for i in range(5):
+        profiles.record("a", "protein", features({**PROTEIN, "finalEnergy": -float(i)}), "accept")
+    profiles.record("a", "climate", None, "reject")
+    history = profiles.history("a", "protein")
+    energies = sorted(history.features[~np.isnan(history.features[:, 0]), 1].tolist())
+    assert energies == [-4.0, -3.0]  # The climate result took the oldest remaining position
+    assert sorted(history.verdicts.tolist()) == [0, 0, 2]
+
+
+def test_reset_on_empty_load():
+    profiles = DeviceProfiles(max_devices=8, window=4)
+    profiles.record("a", "protein", features(PROTEIN), "accept")
+    assert profiles.load([]) == 0
+    assert len(profiles) == 0 and profiles.capacity == 0
+
+
+def test_repeating_device_is_capped_at_review(detector):
+    item = {"task_type": "protein", "result": PROTEIN, "compute_time_ms": 3000}
+    clean = detector.verify_many([item])[0]
+    assert clean["recommendation"] == "accept"
+
+    # The device has sent the very same energy again and again
+    profiles = DeviceProfiles(max_devices=4, window=16)
+    for _ in range(10):
+        profiles.record("copycat", "protein", features(PROTEIN), "accept")
+    verdict = detector.verify_many([{**item, "device_history": profiles.history("copycat", "protein")}])[0]
+    assert verdict["recommendation"] == "review"
+    assert verdict["layer_scores"]["history"] < clean["confidence"]
+    assert verdict["confidence"] <= verdict["layer_scores"]["history"]
+    assert any(flag.startswith("Device history: finalEnergy repeated") for flag in verdict["flags"])
+
+    # A varied history of the same length leaves the verdict alone
+    honest = DeviceProfiles(max_devices=4, window=16)
+    for i in range(10):
+        honest.record("honest", "protein", features({**PROTEIN, "finalEnergy": -12.0 - 1.3 * i}), "accept")
+    verdict = detector.verify_many([{**item, "device_history": honest.history("honest", "protein")}])[0]
+    assert verdict["recommendation"] == "accept"
+    assert verdict["layer_scores"]["history"] == 1.0
+
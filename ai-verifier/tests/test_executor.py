@@ -0,0 +1,92 @@
+"""DetectorExecutor: backends match the detector, reload generations, restart after shutdown."""
+
+import asyncio
+
+import pytest
+
+from conftest import fit_forest
+from config import STAT_BOUNDS
+from models.anomaly_detector import AnomalyDetector
+from models.model_registry import ModelRegistry, model_path_for, publish_model
+from models.stat_bounds import StatBounds
+from serving.executor import DetectorExecutor
+
+
+@pytest.fixture
+def own_detector(tmp_path) -> AnomalyDetector:
+    """Detector over a model directory this test may republish into."""
+    publish_model(fit_forest("protein"), model_path_for("protein", str(tmp_path)))
+    return AnomalyDetector(ModelRegistry(str(tmp_path), fallback_path=None, mmap=False), StatBounds(STAT_BOUNDS))
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread"])
+def test_verify_many_matches_detector(detector, results, mode):
+    executor = DetectorExecutor(detector, mode=mode, workers=2)
+    try:
+        verdicts = asyncio.run(executor.verify_many(results))
+        single = asyncio.run(executor.verify(results[0]))
+    finally:
+        executor.shutdown()
+    assert verdicts == detector.verify_many(results)
+    assert single == verdicts[0]
+    assert executor.in_flight == 0
+
+
+def test_timings_reach_the_callback(detector, results):
+    seen = []
+    executor = DetectorExecutor(detector, mode="thread", on_timings=seen.extend)
+    try:
+        asyncio.run(executor.verify_many(results))
+    finally:
+        executor.shutdown()
+    assert seen and {task_type for _, task_type, _ in seen} <= {item["task_type"] for item in results}
+
+
+def test_unknown_mode_is_rejected(detector):
+    with pytest.raises(ValueError):
+        DetectorExecutor(detector, mode="fork")
+
+
+def test_reloads_bump_generations(own_detector):
+    executor = DetectorExecutor(own_detector, mode="thread")
+    try:
+        before = executor.generation("protein")
+        versions = asyncio.run(executor.reload_model("protein"))
+        assert set(versions) == {"protein"}
+        after_model = executor.generation("protein")
+        assert after_model[1] == before[1] + 1
+        assert executor.generation("climate") == before  # Other task types are untouched
+
+        asyncio.run(executor.reload_bounds())
+        assert executor.generation("climate")[2] == before[2] + 1
+
+        asyncio.run(executor.reload_model())
+        assert executor.generation("climate")[0] == before[0] + 1
+    finally:
+        executor.shutdown()
+
+
+def test_reload_changed_models_picks_up_republished_artifacts(own_detector, tmp_path):
+    executor = DetectorExecutor(own_detector, mode="thread")
+    try:
+        old_version = own_detector.models.entry("protein").version
+        assert asyncio.run(executor.reload_changed_models()) == {}
+
+        publish_model(fit_forest("protein", seed=5), model_path_for("protein", str(tmp_path)))
+        versions = asyncio.run(executor.reload_changed_models())
+        assert set(versions) == {"protein"} and versions["protein"] != old_version
+        assert own_detector.models.entry("protein").version == versions["protein"]
+        assert asyncio.run(executor.reload_changed_models()) == {}
+    finally:
+        executor.shutdown()
+
+
+def test_verify_after_shutdown_starts_new_pools(detector, results):
+    executor = DetectorExecutor(detector, mode="thread")
+    first = asyncio.run(executor.verify_many(results))
+    executor.shutdown()
+    # A new event loop, as when the service starts again in the same process
+    assert asyncio.run(executor.verify_many(results)) == first
+    asyncio.run(executor.reload_model("protein"))
+    executor.shutdown()
+    executor.shutdown()  # Idempotent
@@ -0,0 +1,102 @@
+"""Result fingerprints and peer consensus, including worker-shaped results with list fields."""
+
+import pytest
+
+from models.fingerprint import Consensus, consensus, fingerprint, peer_fingerprints, quantize
+
+DIGITS = 9
+
+
+def signal_result(max_magnitude: float = 2261.4958298630977) -> dict:
+    """A signal result as compute.worker.ts returns it, peak list included."""
+    return {
+        "sampleRate": 1000,
+        "duration": 5,
+        "numSamples": 5000,
+        "fftSize": 8192,
+        "peakFrequencies": [
+            {"hz": 50.048828125, "magnitude": 0.45229916597261954},
+            {"hz": 119.9951171875, "magnitude": 0.24891191725030248},
+        ],
+        "maxMagnitude": max_magnitude,
+    }
+
+
+def drugscreen_result(affinity: float = -12.345678901) -> dict:
+    """A drugscreen result as compute.worker.ts returns it, translation object included."""
+    return {
+        "compoundName": "Aspirin",
+        "bindingAffinity": affinity,
+        "bestOrientation": 412,
+        "bestTranslation": {"x": 1.5, "y": 0, "z": 0},
+        "interactionCount": 37,
+        "bindingSiteResidues": 52,
+        "orientationsScanned": 720,
+    }
+
+
+def test_quantize_absorbs_last_digit_noise():
+    assert quantize(2261.4958298630977, DIGITS) == quantize(2261.4958298630981, DIGITS)
+    assert quantize(2261.4958298630977, DIGITS) != quantize(2261.4958398630977, DIGITS)
+    assert quantize(-0.0, DIGITS) == quantize(0.0, DIGITS)
+    assert quantize(10**400, DIGITS) == quantize(float("inf"), DIGITS)
+
+
+def test_fingerprint_ignores_key_order_and_non_numeric_fields():
+    result = signal_result()
+    reordered = dict(reversed(list(result.items())))
+    assert fingerprint(result, DIGITS) == fingerprint(reordered, DIGITS)
+    assert fingerprint({**result, "peakFrequencies": []}, DIGITS) == fingerprint(result, DIGITS)
+    assert fingerprint(result, DIGITS) != fingerprint(signal_result(2261.5), DIGITS)
+    assert fingerprint({"name": "x", "ok": True}, DIGITS) is None
+
+
+@pytest.mark.parametrize("make", [signal_result, drugscreen_result])
+def test_peer_fingerprints_accept_unhashable_values(make):
+    result = make()
+    peers = [result, dict(result), make()]
+    assert list(peer_fingerprints(peers, DIGITS)) == [fingerprint(result, DIGITS)] * 3
+
+
+def test_peer_fingerprints_hash_identical_flat_results_once():
+    flat = {"numSamples": 5000, "maxMagnitude": 1.5}
+    assert list(peer_fingerprints([flat, dict(flat), {"maxMagnitude": 2.0}], DIGITS)) == [
+        fingerprint(flat, DIGITS), fingerprint(flat, DIGITS), fingerprint({"maxMagnitude": 2.0}, DIGITS),
+    ]
+
+
+def test_consensus_majorities():
+    assert consensus(None, [1, 1]) is None
+    assert consensus(1, [None, None]) is None
+    agree = consensus(1, [1, 1, 2])
+    assert agree == Consensus(2, 3, 2) and agree.agrees and not agree.disagrees
+    differ = consensus(1, [2, 2, 1])
+    assert not differ.agrees and differ.disagrees
+    # A single dissenting peer is no majority against us
+    assert not consensus(1, [2]).disagrees
+    # Counting stops once no fingerprint can reach a majority
+    assert consensus(1, iter([2, 3, 4, 5, 6, 7]), n_peers=6).total < 6
+
+
+@pytest.mark.parametrize("task_type,make,changed", [
+    ("signal", signal_result, {"maxMagnitude": 3000.0}),
+    ("drugscreen", drugscreen_result, {"bindingAffinity": -3.0}),
+])
+def test_verify_with_worker_shaped_peers(detector, task_type, make, changed):
+    result = make()
+    agreed = detector.verify(task_type, result, 2000, peer_results=[make(), make(), make()])
+    assert agreed["layer_scores"]["consistency"] == 1.0
+    assert not any("consensus" in flag for flag in agreed["flags"])
+
+    outvoted = detector.verify(task_type, {**result, **changed}, 2000, peer_results=[make(), make(), make()])
+    assert any(flag.startswith("Peer consensus mismatch: 3/3") for flag in outvoted["flags"])
+
+
+def test_api_verify_with_signal_peers(client):
+    result = signal_result()
+    response = client.post(
+        "/verify",
+        json={"task_type": "signal", "result": result, "compute_time_ms": 2000, "peer_results": [result, result]},
+    )
+    assert response.status_code == 200
+    assert response.json()["layer_scores"]["consistency"] == 1.0
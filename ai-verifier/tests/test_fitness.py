@@ -0,0 +1,56 @@
+"""Fitness layer through the API: /verify with a raw workout and /fitness/check validation."""
+
+import pytest
+
+CHECKS = {
+    "hrPlausible": True,
+    "paceReasonable": True,
+    "caloriesReasonable": True,
+    "noTimeOverlap": True,
+    "withinBaseline": True,
+}
+RESULT = {"checks": CHECKS, "confidence": 0.9, "verified": True}
+
+
+def workout() -> dict:
+    """A steady 30-minute run: 5 s samples, 150 bpm, 3 m/s."""
+    return {
+        "activity_type": "run",
+        "start_time": 1700000000,
+        "streams": {
+            "time": list(range(0, 1800, 5)),
+            "heartrate": [150] * 360,
+            "distance": [i * 15.0 for i in range(360)],
+        },
+    }
+
+
+def test_verify_scores_the_workout(client):
+    response = client.post(
+        "/verify",
+        json={"task_type": "fitness_verify", "result": RESULT, "compute_time_ms": 100, "workout": workout()},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert "fitness_workout" in body["layer_scores"]
+    assert body["layer_scores"]["fitness_workout"] > 0.5
+
+
+@pytest.mark.parametrize("streams", ["abc", ["abc"], 5])
+def test_malformed_streams_are_rejected(client, streams):
+    response = client.post("/fitness/check", json={"workouts": [{"streams": streams}]})
+    assert response.status_code == 400
+
+
+def test_verify_flags_malformed_workout(client):
+    response = client.post(
+        "/verify",
+        json={"task_type": "fitness_verify", "result": RESULT, "compute_time_ms": 100, "workout": {"streams": "abc"}},
+    )
+    assert response.status_code == 200
+    assert any(flag.startswith("Invalid workout data") for flag in response.json()["flags"])
+
+
+def test_unknown_task_type_is_rejected(client):
+    response = client.post("/verify", json={"task_type": "nope", "result": {}, "compute_time_ms": 1})
+    assert response.status_code == 400
@@ -0,0 +1,73 @@
+"""/metrics: valid Prometheus text, bounded labels, and scrapes that never load models."""
+
+import math
+import re
+
+import pytest
+
+import main
+from models.task_specs import TASK_SPECS
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{((?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"')
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def parse(text: str) -> dict[str, list[tuple[dict[str, str], float]]]:
+    """Samples by family name, checking each line against the text exposition format."""
+    types: dict[str, str] = {}
+    samples: dict[str, list[tuple[dict[str, str], float]]] = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            continue
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind in ("counter", "gauge", "histogram"), line
+            assert name not in types, f"Duplicate family {name}"
+            types[name] = kind
+            samples[name] = []
+            continue
+        match = SAMPLE.match(line)
+        assert match, f"Malformed sample line: {line!r}"
+        name, labels, value = match.groups()
+        candidates = [name] + [name.removesuffix(s) for s in HISTOGRAM_SUFFIXES if name.endswith(s)]
+        family = next((f for f in candidates if f in types), None)
+        assert family is not None, f"Sample without a # TYPE line: {line!r}"
+        assert name == family or types[family] == "histogram", line
+        parsed = float(value)
+        assert not math.isnan(parsed), line
+        samples[family].append((dict(LABEL.findall(labels or "")), parsed))
+    for name, kind in types.items():
+        if kind == "counter":
+            assert name.endswith("_total"), name
+    return samples
+
+
+def test_metrics_parse_as_prometheus_text(client):
+    client.post("/verify", json={"task_type": "protein", "result": {"finalEnergy": -120.5, "residueCount": 20,
+                                                                      "iterations": 1000}, "compute_time_ms": 2000})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    samples = parse(response.text)
+    assert "verifier_http_request_duration_seconds" in samples
+    assert any(labels.get("task_type") == "protein" for labels, _ in samples["verifier_verdicts_total"])
+
+
+def test_validation_failure_labels_stay_bounded(client):
+    for i in range(20):
+        client.post("/verify", json={"task_type": f"made-up-{i}", "result": {}, "compute_time_ms": 1})
+    client.post("/verify", json={"task_type": "protein", "result": {"finalEnergy": "x"}, "compute_time_ms": 1})
+    samples = parse(client.get("/metrics").text)["verifier_validation_failures_total"]
+    labels = {labels["task_type"] for labels, _ in samples}
+    assert labels <= set(TASK_SPECS) | {"unknown"}
+    assert dict((labels["task_type"], value) for labels, value in samples)["unknown"] >= 20
+
+
+def test_scrape_does_not_load_models(client, monkeypatch):
+    def refuse(task_type):
+        pytest.fail(f"/metrics loaded the {task_type} model")
+
+    monkeypatch.setattr(main.detector.models, "entry", refuse)
+    monkeypatch.setattr(main.detector.models, "get", refuse)
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,101 @@
+"""ModelRegistry: atomic publishing, snapshot swaps and the compiled cache."""
+
+import os
+
+import numpy as np
+import pytest
+
+from conftest import fit_forest
+from models.compiled_forest import CompiledIsolationForest
+from models.model_registry import ModelRegistry, artifact_version, model_path_for, publish_model
+
+
+@pytest.fixture
+def registry_dir(tmp_path) -> str:
+    for task_type in ("protein", "climate"):
+        publish_model(fit_forest(task_type, seed=1), model_path_for(task_type, str(tmp_path)))
+    return str(tmp_path)
+
+
+def test_publish_is_atomic_and_versioned(tmp_path):
+    path = model_path_for("protein", str(tmp_path))
+    version = publish_model(fit_forest("protein"), path)
+    assert version == artifact_version(path)
+    assert os.listdir(tmp_path) == ["protein.joblib"]  # No temporary file left behind
+
+
+def test_reload_swaps_in_a_new_snapshot_without_touching_the_old_one(registry_dir):
+    registry = ModelRegistry(registry_dir, fallback_path=None, mmap=False)
+    before = registry.entry("protein")
+    climate = registry.entry("climate")
+    X = np.array([[3000.0, -15.0, 15.0, 1000.0]])
+    score_before = before.model.decision_function(X)
+
+    publish_model(fit_forest("protein", seed=2), model_path_for("protein", registry_dir))
+    versions = registry.reload("protein")
+
+    after = registry.entry("protein")
+    assert versions == {"protein": after.version}
+    assert after.version != before.version
+    assert registry.entry("climate") is climate  # Other task types untouched
+    # A request still holding the old snapshot keeps scoring with it
+    np.testing.assert_array_equal(before.model.decision_function(X), score_before)
+
+
+def test_unchanged_artifact_keeps_its_snapshot(registry_dir):
+    registry = ModelRegistry(registry_dir, fallback_path=None, mmap=False)
+    entry = registry.entry("protein")
+    registry.reload()
+    assert registry.entry("protein") is entry
+
+
+def test_unreadable_artifact_keeps_the_previous_model(registry_dir):
+    registry = ModelRegistry(registry_dir, fallback_path=None, mmap=False)
+    entry = registry.entry("protein")
+    with open(model_path_for("protein", registry_dir), "wb") as f:
+        f.write(b"half a pickle")
+    registry.reload("protein")
+    assert registry.entry("protein") is entry
+    assert "protein" in registry.errors
+
+
+def test_compiled_models_are_memory_mapped(registry_dir):
+    registry = ModelRegistry(registry_dir, fallback_path=None, mmap=True)
+    entry = registry.entry("protein")
+    assert isinstance(entry.model, CompiledIsolationForest)
+    assert isinstance(entry.model.threshold, np.memmap)
+    assert os.path.exists(os.path.join(registry_dir, "compiled", f"{entry.version}.joblib"))
+
+
+def test_prune_removes_only_superseded_caches(registry_dir):
+    registry = ModelRegistry(registry_dir, fallback_path=None, mmap=True)
+    old = registry.entry("protein").version
+    climate = registry.entry("climate").version
+    cache_dir = os.path.join(registry_dir, "compiled")
+
+    def cache(version: str) -> str:
+        return os.path.join(cache_dir, f"{version}.joblib")
+
+    # The protein model and a foreign cache were compiled long before climate's
+    os.utime(cache(old), (1_000_000, 1_000_000))
+    stale = cache("0123456789ab")
+    with open(stale, "wb") as f:
+        f.write(b"x")
+    os.utime(stale, (1_000_000, 1_000_000))
+
+    publish_model(fit_forest("protein", seed=3), model_path_for("protein", registry_dir))
+    registry.reload("protein")
+    new = registry.entry("protein").version
+
+    # Compiled by another worker after the new artifact: it may still be loading it
+    newer = cache("ba9876543210")
+    with open(newer, "wb") as f:
+        f.write(b"x")
+    registry.reload("protein")
+
+    remaining = set(os.listdir(cache_dir))
+    assert f"{new}.joblib" in remaining
+    assert f"{climate}.joblib" in remaining  # Still published
+    assert os.path.basename(newer) in remaining
+    assert f"{old}.joblib" not in remaining
+    assert os.path.basename(stale) not in remaining
@@ -0,0 +1,75 @@
+"""PeerStore running statistics, consensus counts, expiry and eviction."""
+
+import numpy as np
+import pytest
+
+from models import peer_store
+from models.fingerprint import Consensus
+from models.peer_store import PeerStore, numeric_fields
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the store."""
+    now = [1000.0]
+    monkeypatch.setattr(peer_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_running_stats_match_numpy():
+    store = PeerStore()
+    rng = np.random.default_rng(0)
+    energies = rng.normal(-15, 8, 200)
+    for energy in energies:
+        store.add("task", {"finalEnergy": float(energy), "iterations": 1000, "compoundName": "x"})
+    stats = store.stats("task")
+    assert set(stats) == {"finalEnergy", "iterations"}
+    n, mean, std = stats["finalEnergy"]
+    assert n == 200
+    assert mean == pytest.approx(energies.mean(), rel=1e-12)
+    assert std == pytest.approx(energies.std(), rel=1e-9)
+    assert stats["iterations"] == (200, 1000.0, 0.0)
+
+
+def test_numeric_fields_skips_bools_non_finite_and_oversized_ints():
+    result = {"a": 1, "b": 2.5, "flag": True, "nan": float("nan"), "inf": float("inf"), "huge": 10 ** 400, "s": "1"}
+    assert numeric_fields(result) == {"a": 1.0, "b": 2.5}
+
+
+def test_oversized_ints_do_not_break_stats():
+    store = PeerStore()
+    store.add("task", {"x": 10 ** 400, "y": 1})
+    assert store.stats("task") == {"y": (1, 1.0, 0.0)}
+
+
+def test_consensus_counts_fingerprints():
+    store = PeerStore()
+    assert store.consensus("task", 7) is None
+    for fingerprint in (7, 7, 9, None):
+        store.add("task", {"x": 1.0}, fingerprint)
+    assert store.consensus("task", 7) == Consensus(2, 3, 2)
+    assert store.consensus("task", 9) == Consensus(1, 3, 2)
+    assert store.consensus("task", 5) == Consensus(0, 3, 2)
+    assert store.consensus("task", None) is None
+
+
+def test_tasks_expire_after_ttl(clock):
+    store = PeerStore(ttl_s=60)
+    store.add("task", {"x": 1.0}, 7)
+    clock[0] += 61
+    assert store.stats("task") is None
+    assert store.consensus("task", 7) is None
+    # A result arriving after expiry starts the task over
+    store.add("task", {"x": 5.0})
+    assert store.stats("task") == {"x": (1, 5.0, 0.0)}
+
+
+def test_least_recently_used_tasks_are_evicted(clock):
+    store = PeerStore(max_tasks=2)
+    store.add("a", {"x": 1.0})
+    store.add("b", {"x": 1.0})
+    store.stats("a")  # a is now the most recently used
+    store.add("c", {"x": 1.0})
+    assert len(store) == 2
+    assert store.stats("b") is None
+    assert store.stats("a") is not None and store.stats("c") is not None
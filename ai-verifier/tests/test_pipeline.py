@@ -0,0 +1,89 @@
+"""LayerPipeline early exit never changes a recommendation; deadlines cap it at review."""
+
+import copy
+import math
+import random
+import time
+
+import numpy as np
+import pytest
+
+from models.anomaly_detector import AnomalyDetector
+from models.pipeline import SKIP_DEADLINE, SKIP_DECIDED, Layer, LayerGroup, LayerPipeline
+
+ACCEPT, REVIEW = 0.8, 0.5
+
+
+def random_layers(rng: random.Random, n: int) -> tuple[list[Layer], dict[str, list[float]]]:
+    """Three layers with fixed per-row scores, some with declared score ranges."""
+    truth = {name: [rng.choice([1.0, rng.random(), 0.0]) for _ in range(n)] for name in ("a", "b", "c")}
+
+    def scorer(name):
+        return lambda group, rows: [truth[name][row] for row in rows]
+
+    layers = [
+        Layer("a", 0.3, 0.02, scorer("a")),
+        # Declares a tight range: the scores it can produce for each row
+        Layer("b", 0.4, 0.25, scorer("b"), lambda group: (
+            [min(truth["b"][r], 0.5) for r in range(n)], [max(truth["b"][r], 0.5) for r in range(n)],
+        )),
+        Layer("c", 0.3, 0.05, scorer("c")),
+    ]
+    return layers, truth
+
+
+def group(n: int) -> LayerGroup:
+    return LayerGroup("t", None, [{}] * n, [None] * n, [[] for _ in range(n)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_early_exit_keeps_every_recommendation(seed):
+    rng = random.Random(seed)
+    n = 200
+    layers, truth = random_layers(rng, n)
+    full = LayerPipeline(layers, ACCEPT, REVIEW, early_exit=False).run(group(n))
+    early = LayerPipeline(layers, ACCEPT, REVIEW, early_exit=True).run(group(n))
+
+    exact = [sum(layer.weight * truth[layer.name][row] for layer in layers) for row in range(n)]
+    assert full.confidences == pytest.approx(exact)
+    pipeline = LayerPipeline(layers, ACCEPT, REVIEW)
+    assert [pipeline.recommendation(c) for c in early.confidences] == [
+        pipeline.recommendation(c) for c in full.confidences
+    ]
+    assert not any(early.undecided)
+    decided = sum(reason == SKIP_DECIDED for reasons in early.skipped.values() for reason in reasons)
+    assert decided > 0  # Early exit actually skipped work
+    # Skipped layers report NaN scores
+    for name, reasons in early.skipped.items():
+        for row, reason in enumerate(reasons):
+            assert (reason is None) != math.isnan(early.scores[name][row])
+
+
+def test_expired_deadline_runs_only_the_cheapest_layer_and_caps_at_review():
+    n = 10
+    layers, _ = random_layers(random.Random(0), n)
+    perfect = [layer._replace(score=lambda group, rows: [1.0] * len(rows)) for layer in layers]
+    pipeline = LayerPipeline(perfect, ACCEPT, REVIEW, early_exit=False)
+    result = pipeline.run(group(n), deadlines=[time.monotonic() - 1.0] * n)
+
+    assert all(reason is None for reason in result.skipped["a"])
+    assert all(reason == SKIP_DEADLINE for reason in result.skipped["b"] + result.skipped["c"])
+    assert all(result.undecided)
+    assert {pipeline.recommendation(c, u) for c, u in zip(result.confidences, result.undecided)} == {"review"}
+
+
+def test_detector_recommendations_do_not_depend_on_early_exit(detector, results):
+    items = copy.deepcopy(results)
+    for i, item in enumerate(items):
+        if i % 3 == 0:
+            item["peer_results"] = [other["result"] for other in items if other["task_type"] == item["task_type"]][:5]
+    exhaustive = AnomalyDetector(detector.models, detector.bounds, early_exit=False)
+    early = detector.verify_many(copy.deepcopy(items))
+    full = exhaustive.verify_many(copy.deepcopy(items))
+
+    assert [v["recommendation"] for v in early] == [v["recommendation"] for v in full]
+    for e, f in zip(early, full):
+        for layer in e["layers_run"]:
+            assert e["layer_scores"][layer] == f["layer_scores"][layer]
+        assert set(e["layers_run"]) | set(e["layers_skipped"]) == set(f["layers_run"])
+    assert np.all([0.0 <= v["confidence"] <= 1.0 for v in early])
@@ -0,0 +1,50 @@
+"""
+reference_compute against the browser worker.
+
+tests/fixtures/reference_worker.json holds the outputs of the compute
+worker (website/src/app/mine/workers/compute.worker.ts, compiled and run
+under node) for a few seeds and payloads. The PRNG must match bit for bit;
+simulation and FFT outputs to floating-point tolerance.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from models.reference_compute import Xorshift128Plus, compare, reference_climate, reference_signal
+
+CASES = json.loads((Path(__file__).parent / "fixtures" / "reference_worker.json").read_text())
+
+
+def cases(kind: str) -> list:
+    return [pytest.param(case["params"], case["expected"], id=f"{kind}-{i}")
+            for i, case in enumerate(CASES) if case["kind"] == kind]
+
+
+@pytest.mark.parametrize("params,expected", cases("rng"))
+def test_rng_matches_worker_exactly(params, expected):
+    rng = Xorshift128Plus(params["seed"])
+    assert [rng.next() for _ in range(params["n"])] == expected
+    assert Xorshift128Plus(params["seed"]).values(params["n"]).tolist() == expected
+
+
+@pytest.mark.parametrize("params,expected", cases("climate"))
+def test_climate_matches_worker(params, expected):
+    ours = reference_climate(params)
+    for key, value in expected.items():
+        assert ours[key] == pytest.approx(value, rel=1e-9, abs=1e-9), key
+    assert compare("climate", ours, expected)["passed"]
+
+
+@pytest.mark.parametrize("params,expected", cases("signal"))
+def test_signal_matches_worker(params, expected):
+    ours = reference_signal(params, params["seed"])
+    for key, value in expected.items():
+        if key == "peakFrequencies":
+            assert [peak["hz"] for peak in ours[key]] == pytest.approx([peak["hz"] for peak in value])
+            assert [peak["magnitude"] for peak in ours[key]] == pytest.approx(
+                [peak["magnitude"] for peak in value], rel=1e-6)
+        else:
+            assert ours[key] == pytest.approx(value, rel=1e-6), key
+    assert compare("signal", ours, expected)["passed"]
@@ -0,0 +1,125 @@
+"""
+Incremental retraining: warm-started trees, trimming (which edits private
+IsolationForest caches), recalibration and the window/state bookkeeping.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from conftest import fit_forest
+from config import CONTAMINATION
+from models.compiled_forest import CompiledIsolationForest
+from models.features import feature_matrix
+from models.model_registry import model_path_for
+from training import retrain as retrain_module
+from training.columnar_store import ColumnarStore
+from training.fetch_data import generate_synthetic_data
+from training.retrain import add_trees, recalibrate, retrain, trim_oldest_trees
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def protein_matrix(n: int, seed: int) -> np.ndarray:
+    rows = [s for s in generate_synthetic_data(n, seed=seed) if s["task_type"] == "protein"]
+    return feature_matrix("protein", [s["result"] for s in rows], [s["compute_time_ms"] for s in rows]).X
+
+
+def samples(n: int, seed: int, start: datetime, step_s: float = 60.0) -> list[dict]:
+    """Protein samples submitted every step_s seconds from start."""
+    rows = [s for s in generate_synthetic_data(n, seed=seed) if s["task_type"] == "protein"]
+    return [{**s, "submitted_at": (start + timedelta(seconds=i * step_s)).isoformat()} for i, s in enumerate(rows)]
+
+
+def test_add_then_trim_keeps_the_newest_trees_and_scores_consistently():
+    model = fit_forest("protein", n_estimators=25)
+    X = protein_matrix(300, seed=4)
+    add_trees(model, X, 10, seed=9)
+    assert len(model.estimators_) == model.n_estimators == 35
+    assert not model.warm_start
+    newest = model.estimators_[-25:]
+
+    trim_oldest_trees(model, 25)
+    assert model.estimators_ == newest and model.n_estimators == 25
+    # The private per-tree caches sklearn scores with must be trimmed alongside
+    assert len(model.estimators_features_) == 25
+    assert len(model._decision_path_lengths) == 25
+    assert len(model._average_path_length_per_tree) == 25
+
+    np.testing.assert_allclose(
+        CompiledIsolationForest.from_sklearn(model).score_samples(X), model.score_samples(X), rtol=0, atol=1e-12,
+    )
+    trim_oldest_trees(model, 40)  # Fewer trees than the cap: untouched
+    assert len(model.estimators_) == 25
+
+
+def test_recalibrate_flags_contamination_of_the_window():
+    model = fit_forest("protein")
+    X_window = protein_matrix(2000, seed=11)
+    recalibrate(model, X_window)
+    outliers = np.mean(model.predict(X_window) == -1)
+    assert outliers == pytest.approx(CONTAMINATION, abs=2.0 / len(X_window))
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    """Point retrain's artifacts, bounds and state at tmp_path, with small tree counts."""
+    model_dir = tmp_path / "trained"
+    monkeypatch.setattr(retrain_module, "model_path_for", lambda task_type: model_path_for(task_type, str(model_dir)))
+    monkeypatch.setattr(retrain_module, "STAT_BOUNDS_PATH", str(tmp_path / "stat_bounds.json"))
+    monkeypatch.setattr(retrain_module, "RETRAIN_STATE_PATH", str(tmp_path / "retrain_state.json"))
+    monkeypatch.setattr(retrain_module, "RETRAIN_MAX_TREES", 30)
+    monkeypatch.setattr(retrain_module, "RETRAIN_NEW_TREES", 10)
+    monkeypatch.setattr(retrain_module, "RETRAIN_MIN_NEW_ROWS", 100)
+    monkeypatch.setattr(retrain_module, "RETRAIN_WINDOW_S", 3 * 86400)
+    return tmp_path
+
+
+def test_retrain_runs_full_then_skips_then_adds_trees(paths):
+    store = ColumnarStore(str(paths / "store"))
+    # 400 old rows, a day-long gap, then 300 rows: only the latter are in the window
+    store.append(samples(400, seed=1, start=START - timedelta(days=10)))
+    store.append(samples(300, seed=2, start=START))
+
+    first = retrain(["protein"], fetch=False, store=store)
+    report = first["tasks"]["protein"]
+    assert first["published"] == ["protein"]
+    assert report["status"] == "full" and report["trees"] == 30
+    assert report["window_rows"] == 300
+    state = json.loads((paths / "retrain_state.json").read_text())
+    assert state["protein"]["trained_until"] == store.latest("protein") == report["trained_until"]
+    assert state["protein"]["version"] == report["version"]
+    assert "protein" in json.loads((paths / "stat_bounds.json").read_text())
+
+    # Nothing new since: the existing model is kept
+    second = retrain(["protein"], fetch=False, store=store)
+    assert second["published"] == [] and second["tasks"]["protein"]["status"] == "skipped"
+    assert second["tasks"]["protein"]["new_rows"] == 0
+
+    store.append(samples(200, seed=3, start=START + timedelta(days=1)))
+    third = retrain(["protein"], fetch=False, store=store)
+    report = third["tasks"]["protein"]
+    assert report["status"] == "incremental"
+    assert report["new_rows"] == 200
+    assert report["trees"] == 30  # 10 added, the 10 oldest trimmed
+    assert report["version"] != first["tasks"]["protein"]["version"]
+    state = json.loads((paths / "retrain_state.json").read_text())
+    assert state["protein"]["trained_until"] == store.latest("protein")
+
+    published = retrain_module._load_own_model("protein", 4)
+    X = np.asarray(store.features("protein"))
+    np.testing.assert_allclose(
+        CompiledIsolationForest.from_sklearn(published).score_samples(X), published.score_samples(X),
+        rtol=0, atol=1e-12,
+    )
+
+
+def test_too_few_window_rows_are_skipped(paths):
+    store = ColumnarStore(str(paths / "store"))
+    store.append(samples(20, seed=1, start=START))
+    report = retrain(["protein"], fetch=False, store=store)
+    assert report["published"] == []
+    assert report["tasks"]["protein"]["reason"].startswith("not enough samples in window")
+    assert not (paths / "retrain_state.json").exists()
@@ -0,0 +1,85 @@
+"""/verify/stream and /verify/ws: per-message replies, failures that do not end the stream, encodings."""
+
+import io
+import json
+
+import pytest
+
+import main
+from serving import encoding
+
+needs_msgpack = pytest.mark.skipif(encoding.msgpack is None, reason="msgpack is optional")
+
+PROTEIN = {"task_type": "protein", "result": {"finalEnergy": -120.5, "residueCount": 20, "iterations": 1000},
+           "compute_time_ms": 2000}
+
+
+def ndjson(*messages: dict) -> bytes:
+    return b"".join(json.dumps(message).encode() + b"\n" for message in messages)
+
+
+@pytest.fixture
+def failing_message(monkeypatch):
+    """verify_one raises an unexpected error for the message with id "boom"."""
+    verify_one = main.verify_one
+
+    async def flaky(req, client=None):
+        if req.id == "boom":
+            raise RuntimeError("detector crashed")
+        return await verify_one(req, client)
+
+    monkeypatch.setattr(main, "verify_one", flaky)
+
+
+def test_ndjson_stream_replies_per_message(client):
+    body = ndjson({**PROTEIN, "id": "a"}, {"id": "bad", "task_type": "protein"}, {**PROTEIN, "id": 7})
+    response = client.post("/verify/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    replies = {reply["seq"]: reply for reply in map(json.loads, response.text.splitlines())}
+    assert sorted(replies) == [0, 1, 2]
+    assert replies[0]["id"] == "a" and replies[0]["recommendation"] in ("accept", "review", "reject")
+    assert replies[1]["id"] == "bad" and replies[1]["status"] == 422
+    assert replies[2]["id"] == 7 and "confidence" in replies[2]
+
+
+def test_failing_message_does_not_end_the_stream(client, failing_message):
+    body = ndjson({**PROTEIN, "id": "boom"}, {**PROTEIN, "id": "b"}, {**PROTEIN, "id": "c"})
+    response = client.post("/verify/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    replies = {reply["id"]: reply for reply in map(json.loads, response.text.splitlines())}
+    assert replies["boom"]["status"] == 500 and replies["boom"]["seq"] == 0
+    assert "confidence" in replies["b"] and "confidence" in replies["c"]
+
+
+@needs_msgpack
+def test_msgpack_stream(client):
+    msgpack = encoding.msgpack
+    body = msgpack.packb({**PROTEIN, "id": 1}) + msgpack.packb({**PROTEIN, "id": 2})
+    response = client.post("/verify/stream", content=body, headers={"Content-Type": "application/msgpack"})
+    assert response.headers["content-type"].startswith("application/msgpack")
+    replies = list(msgpack.Unpacker(io.BytesIO(response.content)))
+    assert sorted(reply["id"] for reply in replies) == [1, 2]
+
+
+def test_unsupported_stream_encoding(client):
+    response = client.post("/verify/stream", content=b"x", headers={"Content-Type": "text/csv"})
+    assert response.status_code == 415
+
+
+def test_websocket_json(client, failing_message):
+    with client.websocket_connect("/verify/ws") as ws:
+        ws.send_text(json.dumps({**PROTEIN, "id": "boom"}) + "\n" + json.dumps({**PROTEIN, "id": "ok"}))
+        replies = {reply["id"]: reply for reply in (json.loads(ws.receive_text()) for _ in range(2))}
+    assert replies["boom"]["status"] == 500
+    assert "confidence" in replies["ok"]
+
+
+@needs_msgpack
+def test_websocket_msgpack(client):
+    msgpack = encoding.msgpack
+    with client.websocket_connect("/verify/ws?encoding=msgpack") as ws:
+        ws.send_bytes(msgpack.packb({**PROTEIN, "id": "m"}))
+        reply = msgpack.unpackb(ws.receive_bytes())
+        ws.send_bytes(b"\xc1")  # Never used in msgpack
+        error = msgpack.unpackb(ws.receive_bytes())
+    assert reply["id"] == "m" and "confidence" in reply
+    assert error["status"] == 400
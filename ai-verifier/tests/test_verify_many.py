@@ -0,0 +1,53 @@
+"""AnomalyDetector.verify_many() against one verify() call per item."""
+
+import copy
+
+from models.anomaly_detector import AnomalyDetector
+
+
+def with_peers(items: list[dict]) -> list[dict]:
+    """Give every other item the other results of its task type as peers."""
+    for i, item in enumerate(items):
+        if i % 2:
+            item["peer_results"] = [
+                other["result"] for other in items
+                if other is not item and other["task_type"] == item["task_type"]
+            ][:4]
+    return items
+
+
+def verify_each(detector: AnomalyDetector, items: list[dict]) -> list[dict]:
+    return [
+        detector.verify(item["task_type"], item["result"], item["compute_time_ms"], item.get("peer_results"))
+        for item in items
+    ]
+
+
+def test_verify_many_matches_verify(detector, results):
+    items = with_peers(results)
+    assert detector.verify_many(copy.deepcopy(items)) == verify_each(detector, items)
+
+
+def test_verify_many_matches_verify_without_early_exit(detector, results):
+    exhaustive = AnomalyDetector(detector.models, detector.bounds, early_exit=False)
+    items = with_peers(results)
+    verdicts = exhaustive.verify_many(copy.deepcopy(items))
+    assert verdicts == verify_each(exhaustive, items)
+    assert all(not v["layers_skipped"] for v in verdicts)
+
+
+def test_verify_many_keeps_input_order_across_task_types(detector, results):
+    verdicts = detector.verify_many(copy.deepcopy(results))
+    reversed_verdicts = detector.verify_many(copy.deepcopy(results[::-1]))
+    assert verdicts == reversed_verdicts[::-1]
+
+
+def test_verify_many_records_layer_timings(detector, results):
+    timings = []
+    detector.verify_many(copy.deepcopy(results), timings)
+    assert {task_type for _, task_type, _ in timings} == {item["task_type"] for item in results}
+    assert all(seconds >= 0 for _, _, seconds in timings)
+
+
+def test_verify_many_empty(detector):
+    assert detector.verify_many([]) == []
@@ -0,0 +1,309 @@
+"""
+Columnar on-disk store for training data.
+
+Fetched results are appended as per-task-type shards of plain .npy arrays,
+so training can memory-map them instead of parsing one large JSON file:
+
+    store/
+      manifest.json                 shard list + fetch checkpoint
+      protein/
+        <shard>.features.npy        (rows, n_features) float64, model input order
+        <shard>.fields.npy          (rows, n_fields) float64, NaN = missing
+        <shard>.time.npy            (rows,) submitted_at as Unix seconds
+
+Only results whose Isolation Forest features could be extracted are stored
+(the same rows train.py trains on). The fields array holds compute_time_ms
+plus every top-level numeric result field, for computing stat bounds.
+Per-row timestamps let training select a rolling time window; the manifest
+keeps each shard's time range so older shards are skipped without reading.
+
+Shards are written first and only become visible once the manifest, which
+also records the delta-fetch checkpoint, is atomically replaced. A fetch
+that dies halfway leaves unreferenced files behind but never a torn store.
+A full refetch replaces the manifest the same way, and only then removes
+the old shards, so a failed refetch leaves the previous store intact.
+
+Rows are only verified (is_match=true) some time after they are submitted,
+so delta fetches re-scan a lookback window behind the checkpoint. The ids
+of rows stored within that window are kept in the manifest ("recent") so
+re-scanned rows are not stored twice.
+"""
+
+import json
+import math
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import TRAINING_STORE_DIR
+from models.features import feature_columns, feature_matrix
+
+MANIFEST = "manifest.json"
+
+
+class ColumnarStore:
+    """Append-only per-task-type .npy shards with a manifest and checkpoint."""
+
+    def __init__(self, root: str = TRAINING_STORE_DIR):
+        self.root = root
+        self.manifest = self._read_manifest()
+
+    @property
+    def checkpoint(self) -> dict[str, str] | None:
+        """Last fetched row as {"submitted_at", "id"}, or None before the first fetch."""
+        return self.manifest.get("checkpoint")
+
+    @property
+    def recent(self) -> dict[str, str]:
+        """submitted_at by id of rows fetched within the lookback window."""
+        return self.manifest.get("recent", {})
+
+    def task_types(self) -> list[str]:
+        """Task types with at least one committed row."""
+        return sorted(t for t, info in self.manifest["tasks"].items() if info["rows"])
+
+    def rows(self, task_type: str | None = None) -> int:
+        """Committed row count for one task type, or for the whole store."""
+        tasks = self.manifest["tasks"]
+        if task_type is not None:
+            return tasks.get(task_type, {}).get("rows", 0)
+        return sum(info["rows"] for info in tasks.values())
+
+    def write_shard(self, task_type: str, samples: list[dict[str, Any]]) -> dict[str, Any] | None:
+        """
+        Write one shard for samples of a single task type.
+
+        The shard is not visible until commit() is called with the returned
+        entry. Returns None if no sample had extractable features.
+        """
+        matrix = feature_matrix(
+            task_type,
+            [s["result"] for s in samples],
+            [s["compute_time_ms"] for s in samples],
+        )
+        if matrix is None or not len(matrix.rows):
+            return None
+
+        kept = [samples[i] for i in matrix.rows.tolist()]
+        now = time.time()
+        times = np.array(
+            [parse_timestamp(s["submitted_at"]) if s.get("submitted_at") else now for s in kept],
+            dtype=np.float64,
+        )
+        fields = ["compute_time_ms"]
+        for sample in kept:
+            for key, value in sample["result"].items():
+                if _is_number(value) and key not in fields:
+                    fields.append(key)
+
+        index = {field: col for col, field in enumerate(fields)}
+        values = np.full((len(kept), len(fields)), np.nan, dtype=np.float64)
+        for row, sample in enumerate(kept):
+            values[row, 0] = sample["compute_time_ms"]
+            for key, value in sample["result"].items():
+                if _is_number(value):
+                    values[row, index[key]] = value
+
+        name = uuid.uuid4().hex[:16]
+        task_dir = os.path.join(self.root, task_type)
+        os.makedirs(task_dir, exist_ok=True)
+        _save_npy(os.path.join(task_dir, f"{name}.features.npy"), matrix.X)
+        _save_npy(os.path.join(task_dir, f"{name}.fields.npy"), values)
+        _save_npy(os.path.join(task_dir, f"{name}.time.npy"), times)
+        return {
+            "task_type": task_type,
+            "name": name,
+            "rows": len(kept),
+            "fields": fields,
+            "first_at": float(times.min()),
+            "last_at": float(times.max()),
+        }
+
+    def append(self, samples: list[dict[str, Any]], checkpoint: dict[str, str] | None = None) -> int:
+        """Write and commit samples of any task types. Returns rows stored."""
+        by_type: dict[str, list[dict[str, Any]]] = {}
+        for sample in samples:
+            by_type.setdefault(sample["task_type"], []).append(sample)
+        shards = [self.write_shard(t, group) for t, group in sorted(by_type.items())]
+        shards = [s for s in shards if s is not None]
+        self.commit(shards, checkpoint)
+        return sum(s["rows"] for s in shards)
+
+    def commit(
+        self,
+        shards: list[dict[str, Any]],
+        checkpoint: dict[str, str] | None = None,
+        recent: dict[str, str] | None = None,
+        replace: bool = False,
+    ):
+        """
+        Publish written shards (and the new checkpoint) in one manifest swap.
+
+        With replace=True the shards replace everything committed before;
+        the old shard files are removed once the new manifest is in place.
+        """
+        previous = self.manifest
+        manifest = _empty_manifest() if replace else json.loads(json.dumps(previous))
+        for shard in shards:
+            info = manifest["tasks"].setdefault(
+                shard["task_type"],
+                {"columns": feature_columns(shard["task_type"]), "rows": 0, "shards": []},
+            )
+            info["shards"].append({k: v for k, v in shard.items() if k != "task_type"})
+            info["rows"] += shard["rows"]
+        if checkpoint is not None:
+            manifest["checkpoint"] = checkpoint
+        if recent is not None:
+            manifest["recent"] = recent
+
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, MANIFEST)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.manifest = manifest
+        if replace:
+            self._remove_shards(previous)
+
+    def latest(self, task_type: str) -> float | None:
+        """Newest submitted_at (Unix seconds) stored for a task type."""
+        shards = self.manifest["tasks"].get(task_type, {}).get("shards", [])
+        return max((shard.get("last_at", 0.0) for shard in shards), default=None)
+
+    def features(
+        self,
+        task_type: str,
+        mmap_mode: str | None = "r",
+        since: float | None = None,
+    ) -> np.ndarray:
+        """
+        Feature matrix for a task type, in model input order.
+
+        With `since` (Unix seconds, inclusive) only rows submitted from then
+        on are returned. A single unfiltered shard is returned memory-mapped
+        as-is; otherwise shards are concatenated into one in-memory array.
+        """
+        arrays = [
+            _select(np.load(self._shard_path(task_type, shard, "features"), mmap_mode=mmap_mode), mask)
+            for shard, mask in self._shards_since(task_type, since)
+        ]
+        if not arrays:
+            columns = feature_columns(task_type) or []
+            return np.empty((0, len(columns)), dtype=np.float64)
+        return arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+
+    def fields(self, task_type: str, since: float | None = None) -> dict[str, np.ndarray]:
+        """Numeric result fields (plus compute_time_ms) as columns, NaN = missing."""
+        shards = self._shards_since(task_type, since)
+        names: list[str] = []
+        for shard, _ in shards:
+            names.extend(f for f in shard["fields"] if f not in names)
+
+        columns = {name: [] for name in names}
+        for shard, mask in shards:
+            values = _select(np.load(self._shard_path(task_type, shard, "fields"), mmap_mode="r"), mask)
+            for name in names:
+                if name in shard["fields"]:
+                    columns[name].append(values[:, shard["fields"].index(name)])
+                else:
+                    columns[name].append(np.full(len(values), np.nan))
+        return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+    def stat_bounds(self, task_types: list[str] | None = None, since: float | None = None) -> dict:
+        """Stat bounds ({"mean", "std", "count"} per field) from the stored rows."""
+        bounds = {}
+        for task_type in task_types or self.task_types():
+            bounds[task_type] = {}
+            for field, column in self.fields(task_type, since).items():
+                values = column[~np.isnan(column)]
+                if not len(values):
+                    continue
+                bounds[task_type][field] = {
+                    "mean": float(values.mean()),
+                    "std": float(max(values.std(), 0.001)),
+                    "count": len(values),
+                }
+        return bounds
+
+    def clear(self):
+        """Forget every shard and the checkpoint (files are removed too)."""
+        self.commit([], replace=True)
+
+    def _remove_shards(self, manifest: dict[str, Any]):
+        """Delete the files of every shard listed in a manifest."""
+        for task_type, info in manifest["tasks"].items():
+            for shard in info["shards"]:
+                for kind in ("features", "fields", "time"):
+                    try:
+                        os.remove(self._shard_path(task_type, shard, kind))
+                    except OSError:
+                        pass
+
+    def _shards_since(
+        self,
+        task_type: str,
+        since: float | None,
+    ) -> list[tuple[dict[str, Any], np.ndarray | None]]:
+        """Shards with rows at or after `since`, each with a row mask (None = all rows)."""
+        selected = []
+        for shard in self.manifest["tasks"].get(task_type, {}).get("shards", []):
+            if since is None or shard["first_at"] >= since:
+                selected.append((shard, None))
+            elif shard["last_at"] >= since:
+                times = np.load(self._shard_path(task_type, shard, "time"), mmap_mode="r")
+                selected.append((shard, times >= since))
+        return selected
+
+    def _shard_path(self, task_type: str, shard: dict[str, Any], kind: str) -> str:
+        return os.path.join(self.root, task_type, f"{shard['name']}.{kind}.npy")
+
+    def _read_manifest(self) -> dict[str, Any]:
+        try:
+            with open(os.path.join(self.root, MANIFEST)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return _empty_manifest()
+
+
+def _empty_manifest() -> dict[str, Any]:
+    return {"version": 1, "checkpoint": None, "tasks": {}}
+
+
+def parse_timestamp(value: str) -> float:
+    """Unix seconds from a PostgREST timestamptz (UTC when no offset is given)."""
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _select(array: np.ndarray, mask: np.ndarray | None) -> np.ndarray:
+    return array if mask is None else array[mask]
+
+
+def _is_number(value: Any) -> bool:
+    """Finite int/float that is not a bool (what stat bounds are computed over)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+
+def _save_npy(path: str, array: np.ndarray):
+    """Write an array to a temporary file and rename it into place."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
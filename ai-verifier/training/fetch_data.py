@@ -3,94 +3,396 @@ Fetch training data from Supabase for model training.
 
 Pulls all verified (is_match=true) task_assignments with their
 compute times and results, organized by task type.
+
+Rows are streamed page by page over one pooled HTTP client with keyset
+pagination on (submitted_at, id), and appended to the columnar store in
+training/store/. Each run only fetches rows submitted after the store's
+checkpoint, less a lookback window (AI_VERIFIER_FETCH_LOOKBACK_S) that
+catches rows verified after the previous run; rows already stored are
+skipped by id. With --concurrency N the window is split into N time slices
+that are paged through in parallel.
+
+Usage:
+    python training/fetch_data.py                  # delta fetch into the store
+    python training/fetch_data.py --full           # refetch everything
+    python training/fetch_data.py --concurrency 4
+    python training/fetch_data.py --json           # legacy training/data.json
+
+Without Supabase credentials, synthetic data is generated for bootstrapping.
+Point SUPABASE_URL at training/supabase_standin.py to run against a local
+stand-in.
 """
 
+import argparse
 import json
+import random
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Iterator
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import httpx
-from config import SUPABASE_URL, SUPABASE_SERVICE_KEY
+from config import (
+    SUPABASE_URL, SUPABASE_SERVICE_KEY,
+    FETCH_PAGE_SIZE, FETCH_CONCURRENCY, FETCH_SHARD_ROWS, FETCH_TIMEOUT_S, FETCH_LOOKBACK_S,
+)
+from training.columnar_store import ColumnarStore, parse_timestamp
+
+ASSIGNMENTS_PATH = "/rest/v1/task_assignments"
+SELECT = "id,submitted_at,result,compute_time_ms,compute_tasks(task_type)"
+
+
+def supabase_client(
+    base_url: str = SUPABASE_URL,
+    service_key: str = SUPABASE_SERVICE_KEY,
+    max_connections: int = 8,
+) -> httpx.Client:
+    """Pooled client for the Supabase REST API (keep-alive across pages)."""
+    return httpx.Client(
+        base_url=base_url,
+        headers={
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+        },
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        timeout=FETCH_TIMEOUT_S,
+    )
+
+
+def to_sample(row: dict[str, Any]) -> dict[str, Any] | None:
+    """Training sample from a task_assignments row, or None without a task type."""
+    task_info = row.get("compute_tasks", {})
+    if not task_info:
+        return None
+    return {
+        "task_type": task_info.get("task_type", "unknown"),
+        "result": row.get("result") or {},
+        "compute_time_ms": row.get("compute_time_ms") or 0,
+        "submitted_at": row.get("submitted_at"),
+    }
+
+
+def iter_pages(
+    client: httpx.Client,
+    after: dict[str, str] | None = None,
+    until: str | None = None,
+    page_size: int = FETCH_PAGE_SIZE,
+    descending: bool = False,
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Page through verified assignments in (submitted_at, id) order.
+
+    Each page starts strictly after the last row of the previous one, so
+    pages stay cheap however deep the scan goes (no OFFSET). `after` is a
+    {"submitted_at", "id"} cursor, `until` an inclusive upper bound on
+    submitted_at (lower bound when descending).
+    """
+    direction = "desc" if descending else "asc"
+    past = "lt" if descending else "gt"
+    cursor = after
+    while True:
+        params: list[tuple[str, str]] = [
+            ("select", SELECT),
+            ("is_match", "eq.true"),
+            ("submitted_at", "not.is.null"),
+            ("order", f"submitted_at.{direction},id.{direction}"),
+            ("limit", str(page_size)),
+        ]
+        if until is not None:
+            params.append(("submitted_at", f"{'gte' if descending else 'lte'}.{until}"))
+        if cursor is not None:
+            ts, row_id = cursor["submitted_at"], cursor["id"]
+            params.append((
+                "or",
+                f'(submitted_at.{past}."{ts}",'
+                f'and(submitted_at.eq."{ts}",id.{past}.{row_id}))',
+            ))
+
+        response = client.get(ASSIGNMENTS_PATH, params=params)
+        response.raise_for_status()
+        rows = response.json()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        cursor = {"submitted_at": rows[-1]["submitted_at"], "id": rows[-1]["id"]}
 
 
-def fetch_training_data(limit: int = 10000) -> list[dict]:
+def fetch_training_data(limit: int = 10000, client: httpx.Client | None = None) -> list[dict]:
     """
-    Fetch verified task results from Supabase.
+    Fetch the most recent verified task results from Supabase.
 
     Returns list of dicts with: task_type, result, compute_time_ms
     """
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+    if client is None and (not SUPABASE_URL or not SUPABASE_SERVICE_KEY):
         print("Error: SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
         return []
 
-    headers = {
-        "apikey": SUPABASE_SERVICE_KEY,
-        "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-    }
+    training_data: list[dict] = []
+    http = client or supabase_client()
+    try:
+        for rows in iter_pages(http, page_size=min(FETCH_PAGE_SIZE, limit), descending=True):
+            for row in rows:
+                sample = to_sample(row)
+                if sample is not None:
+                    training_data.append(sample)
+            if len(training_data) >= limit:
+                break
+    except httpx.HTTPError as e:
+        print(f"Error fetching data: {e}")
+        return []
+    finally:
+        if client is None:
+            http.close()
+
+    return training_data[:limit]
+
+
+def fetch_into_store(
+    store: ColumnarStore,
+    client: httpx.Client | None = None,
+    concurrency: int = FETCH_CONCURRENCY,
+    page_size: int = FETCH_PAGE_SIZE,
+    shard_rows: int = FETCH_SHARD_ROWS,
+    lookback_s: float = FETCH_LOOKBACK_S,
+    full: bool = False,
+) -> int:
+    """
+    Append every verified row not yet in the store.
+
+    The scan starts `lookback_s` before the store's checkpoint, because a
+    row only matches is_match=true once it has been verified, which can be
+    after a previous fetch passed its submitted_at. Rows already stored
+    within the lookback window are skipped by id. With full=True everything
+    is refetched and replaces the store's contents.
+
+    Pages are streamed into shards of at most `shard_rows` rows per task
+    type; nothing is held beyond one shard per task type and slice. The
+    shards and the new checkpoint are committed together at the end, so an
+    interrupted fetch is simply repeated next time (and an interrupted full
+    fetch leaves the previous store in place). Returns rows stored.
+    """
+    checkpoint = None if full else store.checkpoint
+    seen = {} if full else store.recent
+    # Stores from before the lookback have no ids to dedupe against
+    after = _lookback(checkpoint, lookback_s) if "recent" in store.manifest else checkpoint
+
+    http = client or supabase_client(max_connections=max(1, concurrency))
+    try:
+        # Fixed upper bound, so concurrent inserts land in the next delta
+        until = _latest_submitted_at(http)
+        if until is None:
+            return 0  # Nothing verified yet
+
+        slices = [(after, until)]
+        if concurrency > 1:
+            start = after["submitted_at"] if after else _latest_submitted_at(http, earliest=True)
+            slices = _time_slices(after, start, until, concurrency)
 
-    # Fetch verified task assignments joined with task type
-    url = (
-        f"{SUPABASE_URL}/rest/v1/task_assignments"
-        f"?is_match=eq.true"
-        f"&select=result,compute_time_ms,compute_tasks(task_type)"
-        f"&limit={limit}"
-        f"&order=submitted_at.desc"
+        def run(bounds: tuple[dict[str, str] | None, str]) -> tuple[int, list, dict[str, str]]:
+            return _fetch_slice(store, http, bounds[0], bounds[1], page_size, shard_rows, seen)
+
+        if len(slices) == 1:
+            outcomes = [run(slices[0])]
+        else:
+            # httpx.Client is thread-safe; the slices share its connection pool
+            with ThreadPoolExecutor(max_workers=len(slices)) as pool:
+                outcomes = list(pool.map(run, slices))
+    finally:
+        if client is None:
+            http.close()
+
+    fetched = sum(count for count, _, _ in outcomes)
+    shards = [shard for _, slice_shards, _ in outcomes for shard in slice_shards]
+    recent = dict(seen)
+    for _, _, fetched_ids in outcomes:
+        recent.update(fetched_ids)
+
+    # The checkpoint only moves forward: a delta may find nothing past it
+    latest = max(
+        [{"submitted_at": ts, "id": row_id} for row_id, ts in recent.items()]
+        + ([checkpoint] if checkpoint else []),
+        key=_position,
+        default=None,
     )
+    if latest is not None:
+        horizon = parse_timestamp(latest["submitted_at"]) - lookback_s
+        recent = {row_id: ts for row_id, ts in recent.items() if parse_timestamp(ts) >= horizon}
+    store.commit(shards, latest, recent, replace=full)
+    return fetched
 
-    response = httpx.get(url, headers=headers)
 
-    if response.status_code != 200:
-        print(f"Error fetching data: {response.status_code} {response.text}")
-        return []
+def _fetch_slice(
+    store: ColumnarStore,
+    client: httpx.Client,
+    after: dict[str, str] | None,
+    until: str,
+    page_size: int,
+    shard_rows: int,
+    seen: dict[str, str],
+) -> tuple[int, list[dict[str, Any]], dict[str, str]]:
+    """
+    Page through one time slice into shards, skipping ids in `seen`.
+
+    Returns (rows, shards, submitted_at by id of the rows fetched).
+    """
+    fetched = 0
+    shards: list[dict[str, Any]] = []
+    pending: dict[str, list[dict[str, Any]]] = {}
+    fetched_ids: dict[str, str] = {}
+
+    def flush(task_type: str):
+        shard = store.write_shard(task_type, pending.pop(task_type))
+        if shard is not None:
+            shards.append(shard)
+
+    for rows in iter_pages(client, after=after, until=until, page_size=page_size):
+        for row in rows:
+            if row["id"] in seen:
+                continue
+            fetched += 1
+            fetched_ids[row["id"]] = row["submitted_at"]
+            sample = to_sample(row)
+            if sample is None:
+                continue
+            group = pending.setdefault(sample["task_type"], [])
+            group.append(sample)
+            if len(group) >= shard_rows:
+                flush(sample["task_type"])
+
+    for task_type in list(pending):
+        flush(task_type)
+    return fetched, shards, fetched_ids
+
+
+def _lookback(checkpoint: dict[str, str] | None, lookback_s: float) -> dict[str, str] | None:
+    """Keyset cursor `lookback_s` before a checkpoint (None scans from the start)."""
+    if checkpoint is None:
+        return None
+    ts = parse_timestamp(checkpoint["submitted_at"]) - lookback_s
+    return {"submitted_at": datetime.fromtimestamp(ts, timezone.utc).isoformat(), "id": _MIN_UUID}
+
+
+def _position(cursor: dict[str, str]) -> tuple[float, str]:
+    """Sort key of a {"submitted_at", "id"} cursor in keyset order."""
+    return parse_timestamp(cursor["submitted_at"]), cursor["id"]
 
+
+def _latest_submitted_at(client: httpx.Client, earliest: bool = False) -> str | None:
+    """submitted_at of the newest (or oldest) verified row."""
+    direction = "asc" if earliest else "desc"
+    response = client.get(ASSIGNMENTS_PATH, params=[
+        ("select", "submitted_at"),
+        ("is_match", "eq.true"),
+        ("submitted_at", "not.is.null"),
+        ("order", f"submitted_at.{direction}"),
+        ("limit", "1"),
+    ])
+    response.raise_for_status()
     rows = response.json()
-    training_data = []
+    return rows[0]["submitted_at"] if rows else None
+
+
+def _time_slices(
+    after: dict[str, str] | None,
+    start: str,
+    until: str,
+    n: int,
+) -> list[tuple[dict[str, str] | None, str]]:
+    """
+    Split (after, until] into n contiguous keyset slices.
+
+    Slice i ends at boundary b_i inclusive and slice i+1 starts after
+    (b_i, max id), so every row falls into exactly one slice. Without a
+    checkpoint the first slice has no lower bound.
+    """
+    t0, t1 = parse_timestamp(start), parse_timestamp(until)
+    if t1 <= t0:
+        return [(after, until)]
+    step = (t1 - t0) / n
+    boundaries = [
+        datetime.fromtimestamp(t0 + step * i, timezone.utc).isoformat() for i in range(1, n)
+    ] + [until]
+
+    slices = []
+    cursor = after
+    for boundary in boundaries:
+        slices.append((cursor, boundary))
+        cursor = {"submitted_at": boundary, "id": _MAX_UUID}
+    return slices
 
-    for row in rows:
-        task_info = row.get("compute_tasks", {})
-        if not task_info:
-            continue
 
-        training_data.append({
-            "task_type": task_info.get("task_type", "unknown"),
-            "result": row.get("result", {}),
-            "compute_time_ms": row.get("compute_time_ms", 0),
-        })
+_MIN_UUID = "00000000-0000-0000-0000-000000000000"
+_MAX_UUID = "ffffffff-ffff-ffff-ffff-ffffffffffff"
 
-    return training_data
+
+def generate_synthetic_data(per_type: int = 250, seed: int | None = None) -> list[dict]:
+    """Synthetic training samples for bootstrapping (no Supabase data yet)."""
+    rng = random.Random(seed)
+    synthetic = []
+    for task_type, params in {
+        "protein": lambda: {"finalEnergy": rng.gauss(-15, 8), "residueCount": rng.randint(10, 20), "iterations": 1000},
+        "climate": lambda: {"maxTemperature": rng.gauss(25, 12), "avgTemperature": rng.gauss(15, 8), "centerTemp": rng.gauss(18, 10)},
+        "signal": lambda: {"maxMagnitude": rng.gauss(5000, 2500), "fftSize": 8192, "numSamples": rng.randint(5000, 15000)},
+        "drugscreen": lambda: {"bindingAffinity": rng.gauss(-8, 4), "interactionCount": rng.randint(5, 50), "orientationsScanned": 360},
+    }.items():
+        for _ in range(per_type):
+            synthetic.append({
+                "task_type": task_type,
+                "result": params(),
+                "compute_time_ms": max(100, int(rng.gauss(3000, 1000))),
+            })
+    return synthetic
 
 
 def save_training_data(data: list[dict], path: str = "training/data.json"):
     """Save fetched data to local JSON file."""
     os.makedirs(os.path.dirname(path), exist_ok=True)
     with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+        json.dump(data, f)
     print(f"Saved {len(data)} training samples to {path}")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Fetch verified results for training")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and refetch everything")
+    parser.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY, help="Time slices fetched in parallel")
+    parser.add_argument("--json", action="store_true", help="Write training/data.json instead of the store")
+    args = parser.parse_args()
+
+    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
+        print("No Supabase credentials. Using synthetic data for initial model.")
+        synthetic = generate_synthetic_data()
+        if args.json:
+            save_training_data(synthetic)
+            return
+        store = ColumnarStore()
+        if store.rows() == 0:
+            stored = store.append(synthetic)
+            print(f"Stored {stored} synthetic samples in {store.root}")
+        return
+
+    if args.json:
+        data = fetch_training_data()
+        if data:
+            save_training_data(data)
+        return
+
+    store = ColumnarStore()
+    try:
+        fetched = fetch_into_store(store, concurrency=args.concurrency, full=args.full)
+    except httpx.HTTPError as e:
+        print(f"Error fetching data: {e}")
+        sys.exit(1)
+    print(f"Fetched {fetched} rows; store has {store.rows()} training samples in {store.root}")
+
+
 if __name__ == "__main__":
-    data = fetch_training_data()
-    if data:
-        save_training_data(data)
-    else:
-        print("No training data fetched. Using synthetic data for initial model.")
-        # Generate synthetic training data for bootstrapping
-        import random
-
-        synthetic = []
-        for task_type, params in {
-            "protein": lambda: {"finalEnergy": random.gauss(-15, 8), "residueCount": random.randint(10, 20), "iterations": 1000},
-            "climate": lambda: {"maxTemperature": random.gauss(25, 12), "avgTemperature": random.gauss(15, 8), "centerTemp": random.gauss(18, 10)},
-            "signal": lambda: {"maxMagnitude": random.gauss(5000, 2500), "fftSize": 8192, "numSamples": random.randint(5000, 15000)},
-            "drugscreen": lambda: {"bindingAffinity": random.gauss(-8, 4), "interactionCount": random.randint(5, 50), "orientationsScanned": 360},
-        }.items():
-            for _ in range(250):
-                synthetic.append({
-                    "task_type": task_type,
-                    "result": params(),
-                    "compute_time_ms": max(100, int(random.gauss(3000, 1000))),
-                })
-
-        save_training_data(synthetic)
+    main()
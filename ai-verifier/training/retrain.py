@@ -0,0 +1,231 @@
+"""
+Incremental retraining on a rolling time window.
+
+Instead of refitting every tree on all data, each run:
+
+1. Delta-fetches new verified results into the columnar store (optional)
+2. Per task type, selects the rolling window of the last RETRAIN_WINDOW_S
+   seconds (ending at the newest stored row) and the rows added since the
+   previous run
+3. Adds RETRAIN_NEW_TREES trees fitted on the new rows to the current model
+   (IsolationForest warm_start), drops the oldest trees beyond
+   RETRAIN_MAX_TREES, and recalibrates the outlier threshold on the window
+4. Publishes the artifact atomically (a new content-hash version) and
+   refreshes the trained stat bounds from the window
+
+A task type without a model of its own is fitted from scratch on the window.
+The service runs this in a background process (see serving/retrainer.py)
+and hot-swaps whatever was published; it can also be run by hand:
+
+Usage:
+    python training/retrain.py
+    python training/retrain.py --task-type protein --no-fetch
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+
+from config import (
+    CONTAMINATION, SUPABASE_URL, SUPABASE_SERVICE_KEY, STAT_BOUNDS_PATH,
+    RETRAIN_WINDOW_S, RETRAIN_NEW_TREES, RETRAIN_MAX_TREES, RETRAIN_MIN_NEW_ROWS,
+    RETRAIN_FETCH, RETRAIN_STATE_PATH,
+)
+from models.compiled_forest import CompiledIsolationForest
+from models.model_registry import model_path_for, publish_model
+from models.stat_bounds import write_json
+from training.columnar_store import ColumnarStore
+from training.fetch_data import fetch_into_store, generate_synthetic_data
+
+MIN_TRAIN_ROWS = 50  # Same floor as train.py
+
+
+def retrain(
+    task_types: list[str] | None = None,
+    fetch: bool = RETRAIN_FETCH,
+    store: ColumnarStore | None = None,
+) -> dict[str, Any]:
+    """
+    Run one retraining pass and publish updated models.
+
+    Returns {"fetched", "fetch_error", "tasks": {task_type: report},
+    "published": [task types with a new artifact]}.
+    """
+    store = store or ColumnarStore()
+    report: dict[str, Any] = {"fetched": None, "fetch_error": None, "tasks": {}, "published": []}
+
+    if fetch and SUPABASE_URL and SUPABASE_SERVICE_KEY:
+        try:
+            report["fetched"] = fetch_into_store(store)
+        except httpx.HTTPError as e:
+            report["fetch_error"] = f"{type(e).__name__}: {e}"  # Train on what is stored
+    if store.rows() == 0:
+        report["fetched"] = store.append(generate_synthetic_data())  # Bootstrap
+
+    state = _read_state()
+    windows: dict[str, float] = {}
+    for task_type in task_types or store.task_types():
+        task_report, windows[task_type] = retrain_task(task_type, store, state.get(task_type, {}))
+        report["tasks"][task_type] = task_report
+        if task_report["status"] != "skipped":
+            state[task_type] = {
+                "trained_until": task_report["trained_until"],
+                "version": task_report["version"],
+                "trees": task_report["trees"],
+                "updated_at": time.time(),
+            }
+            report["published"].append(task_type)
+
+    if report["published"]:
+        _update_bounds(store, {t: windows[t] for t in report["published"]})
+        _write_state(state)
+    return report
+
+
+def retrain_task(
+    task_type: str,
+    store: ColumnarStore,
+    state: dict[str, Any],
+) -> tuple[dict[str, Any], float]:
+    """Retrain one task type. Returns (report, window start)."""
+    start = time.perf_counter()
+    latest = store.latest(task_type) or 0.0
+    window_start = latest - RETRAIN_WINDOW_S
+    X_window = np.asarray(store.features(task_type, since=window_start))
+
+    trained_until = state.get("trained_until")
+    if trained_until is not None:
+        X_new = np.asarray(store.features(task_type, since=np.nextafter(trained_until, np.inf)))
+    else:
+        X_new = X_window
+
+    report: dict[str, Any] = {
+        "status": "skipped",
+        "window_rows": len(X_window),
+        "new_rows": len(X_new),
+        "trained_until": latest,
+    }
+    if len(X_window) < MIN_TRAIN_ROWS:
+        report["reason"] = f"not enough samples in window ({len(X_window)})"
+        return report, window_start
+
+    model = _load_own_model(task_type, X_window.shape[1])
+    if model is not None and len(X_new) < RETRAIN_MIN_NEW_ROWS:
+        report["reason"] = f"not enough new samples ({len(X_new)} < {RETRAIN_MIN_NEW_ROWS})"
+        return report, window_start
+
+    if model is None:
+        model = IsolationForest(
+            n_estimators=RETRAIN_MAX_TREES,
+            contamination=CONTAMINATION,
+            random_state=42,
+            n_jobs=1,  # Background job: leave the other cores to the service
+        ).fit(X_window)
+        report["status"] = "full"
+    else:
+        # Fit on at least as many rows as the existing trees subsampled, so
+        # their path-length normalization still applies to the new trees
+        X_fit = X_new if len(X_new) >= model._max_samples else X_window[-model._max_samples:]
+        add_trees(model, X_fit, RETRAIN_NEW_TREES, seed=int(latest) % (2 ** 31))
+        trim_oldest_trees(model, RETRAIN_MAX_TREES)
+        recalibrate(model, X_window)
+        report["status"] = "incremental"
+
+    report["version"] = publish_model(model, model_path_for(task_type))
+    report["trees"] = len(model.estimators_)
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    return report, window_start
+
+
+def add_trees(model: IsolationForest, X: np.ndarray, n_trees: int, seed: int):
+    """Warm-start `n_trees` more trees fitted on X onto an existing forest."""
+    model.set_params(
+        warm_start=True,
+        n_estimators=len(model.estimators_) + n_trees,
+        random_state=seed,  # Fresh subsamples, not a replay of earlier runs' seeds
+        n_jobs=1,
+    )
+    model.fit(X)
+    model.set_params(warm_start=False)
+
+
+def trim_oldest_trees(model: IsolationForest, max_trees: int):
+    """Drop the oldest trees (and their per-tree caches) beyond max_trees."""
+    drop = len(model.estimators_) - max_trees
+    if drop <= 0:
+        return
+    model.estimators_ = model.estimators_[drop:]
+    model.estimators_features_ = model.estimators_features_[drop:]
+    model._decision_path_lengths = model._decision_path_lengths[drop:]
+    model._average_path_length_per_tree = model._average_path_length_per_tree[drop:]
+    model.n_estimators = len(model.estimators_)
+
+
+def recalibrate(model: IsolationForest, X_window: np.ndarray):
+    """Set offset_ so CONTAMINATION of the window scores as outliers."""
+    scores = CompiledIsolationForest.from_sklearn(model).score_samples(X_window)
+    model.offset_ = float(np.percentile(scores, 100.0 * CONTAMINATION))
+
+
+def _load_own_model(task_type: str, n_features: int) -> IsolationForest | None:
+    """The task type's own IsolationForest artifact, if compatible."""
+    path = model_path_for(task_type)
+    if not os.path.exists(path):
+        return None
+    try:
+        model = joblib.load(path)
+    except Exception:
+        return None
+    if not isinstance(model, IsolationForest) or model.n_features_in_ != n_features:
+        return None
+    return model
+
+
+def _update_bounds(store: ColumnarStore, window_starts: dict[str, float]):
+    """Replace the retrained task types' trained bounds with window bounds."""
+    bounds = {}
+    if os.path.exists(STAT_BOUNDS_PATH):
+        with open(STAT_BOUNDS_PATH) as f:
+            bounds = json.load(f)
+    for task_type, since in window_starts.items():
+        bounds.update(store.stat_bounds([task_type], since=since))
+    write_json(STAT_BOUNDS_PATH, bounds)
+
+
+def _read_state() -> dict[str, Any]:
+    try:
+        with open(RETRAIN_STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(state: dict[str, Any]):
+    write_json(RETRAIN_STATE_PATH, state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally retrain task-type models")
+    parser.add_argument("--task-type", help="Only retrain this task type's model")
+    parser.add_argument("--no-fetch", action="store_true", help="Skip the delta fetch")
+    args = parser.parse_args()
+
+    report = retrain(
+        [args.task_type] if args.task_type else None,
+        fetch=RETRAIN_FETCH and not args.no_fetch,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Local HTTP stand-in for the Supabase REST endpoint fetch_data.py reads.
+
+Serves GET /rest/v1/task_assignments from an in-memory table, supporting
+the PostgREST subset the fetcher uses: eq/gt/gte/lt/lte/not.is.null
+filters, the (submitted_at, id) keyset `or` filter, multi-column `order`
+and `limit`. Rows carry compute_tasks(task_type) already embedded.
+
+Usage:
+    python training/supabase_standin.py --rows 100000 --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=dev \\
+        python training/fetch_data.py
+
+serve() runs it on a background thread for scripted checks.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from training.fetch_data import ASSIGNMENTS_PATH, generate_synthetic_data
+
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+_KEYSET = re.compile(
+    r'^\(submitted_at\.(gt|lt)\."([^"]+)",and\(submitted_at\.eq\."([^"]+)",id\.(gt|lt)\.([^)]+)\)\)$'
+)
+
+
+def synthetic_rows(n: int, seed: int = 0, start: datetime | None = None) -> list[dict[str, Any]]:
+    """task_assignments rows with synthetic results, some sharing a timestamp."""
+    rng = random.Random(seed)
+    start = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    per_type = max(1, n // 4 + 1)
+    samples = generate_synthetic_data(per_type, seed=seed)
+    rng.shuffle(samples)
+
+    rows = []
+    ts = start
+    for sample in samples[:n]:
+        # Whole seconds and repeats, so the id tiebreak actually matters
+        ts += timedelta(seconds=rng.choice([0, 0, 1, 2]))
+        rows.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "submitted_at": ts.isoformat(),
+            "is_match": rng.random() > 0.05,
+            "result": sample["result"],
+            "compute_time_ms": sample["compute_time_ms"],
+            "compute_tasks": {"task_type": sample["task_type"]},
+        })
+    return rows
+
+
+def _value(row: dict[str, Any], column: str) -> Any:
+    value = row.get(column)
+    if column == "submitted_at" and value is not None:
+        return _parse_ts(value)
+    return value
+
+
+def _parse_ts(value: str) -> datetime:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _literal(column: str, raw: str) -> Any:
+    raw = raw.strip('"')
+    if column == "submitted_at":
+        return _parse_ts(raw)
+    if raw in ("true", "false"):
+        return raw == "true"
+    return raw
+
+
+def query(rows: list[dict[str, Any]], params: list[tuple[str, str]]) -> list[dict[str, Any]]:
+    """Apply PostgREST-style filters, order and limit to the table."""
+    selected = rows
+    order: list[tuple[str, bool]] = []
+    limit = None
+    columns = None
+
+    for key, value in params:
+        if key == "select":
+            columns = [c.split("(")[0] for c in re.split(r",(?![^(]*\))", value)]
+        elif key == "order":
+            order = [
+                (part.split(".")[0], part.endswith(".desc"))
+                for part in value.split(",")
+            ]
+        elif key == "limit":
+            limit = int(value)
+        elif key == "or":
+            match = _KEYSET.match(value)
+            if not match:
+                raise ValueError(f"unsupported or filter: {value}")
+            op, ts, _, id_op, row_id = match.groups()
+            ts = _parse_ts(ts)
+            selected = [
+                r for r in selected
+                if _OPS[op](_value(r, "submitted_at"), ts)
+                or (_value(r, "submitted_at") == ts and _OPS[id_op](r["id"], row_id))
+            ]
+        elif value == "not.is.null":
+            selected = [r for r in selected if r.get(key) is not None]
+        else:
+            op, _, raw = value.partition(".")
+            literal = _literal(key, raw)
+            selected = [r for r in selected if _OPS[op](_value(r, key), literal)]
+
+    for column, desc in reversed(order):
+        selected = sorted(selected, key=lambda r: _value(r, column), reverse=desc)
+    if limit is not None:
+        selected = selected[:limit]
+    if columns is not None:
+        selected = [{c: r.get(c) for c in columns} for r in selected]
+    return selected
+
+
+def make_handler(rows: list[dict[str, Any]]) -> type[BaseHTTPRequestHandler]:
+    """Request handler class serving the given table."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like PostgREST
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path != ASSIGNMENTS_PATH:
+                return self._send(404, {"message": "not found"})
+            try:
+                body = query(rows, parse_qsl(url.query, keep_blank_values=True))
+            except (ValueError, KeyError) as e:
+                return self._send(400, {"message": str(e)})
+            self._send(200, body)
+
+        def _send(self, status: int, body: Any):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(rows: list[dict[str, Any]], host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in on a daemon thread; server.server_address has the port."""
+    server = ThreadingHTTPServer((host, port), make_handler(rows))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Supabase stand-in for fetch_data.py")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(synthetic_rows(args.rows, args.seed)))
+    print(f"Serving {args.rows} rows on http://{args.host}:{args.port}{ASSIGNMENTS_PATH}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
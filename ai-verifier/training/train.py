@@ -1,13 +1,21 @@
 """
-Train the Isolation Forest anomaly detection model.
+Train the Isolation Forest anomaly detection models.
 
-Uses historical verified mining results to learn normal patterns.
-Run after fetch_data.py (or it will generate synthetic data).
+Uses historical verified mining results to learn normal patterns. One
+model is trained per task type, because each type's feature columns mean
+different things. Run after fetch_data.py (or it will generate synthetic data).
+
+Training reads the columnar store (training/store/) that fetch_data.py
+appends to, memory-mapping the feature shards. A legacy training/data.json
+is still used when the store is empty.
 
 Usage:
     python training/train.py
+    python training/train.py --task-type protein   # retrain one task type
+    python training/train.py --tune                # sweep sizes, publish the smallest meeting targets
 """
 
+import argparse
 import json
 import os
 import sys
@@ -15,50 +23,18 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import numpy as np
+import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-import joblib
-
-from config import MODEL_PATH, CONTAMINATION, STAT_BOUNDS
-
-
-def extract_features(sample: dict) -> list[float] | None:
-    """Extract numeric feature vector from a training sample."""
-    task_type = sample["task_type"]
-    result = sample["result"]
-    compute_time_ms = sample["compute_time_ms"]
-
-    features = [float(compute_time_ms)]
-
-    if task_type == "protein":
-        features.extend([
-            float(result.get("finalEnergy", 0)),
-            float(result.get("residueCount", 0)),
-            float(result.get("iterations", 0)),
-        ])
-    elif task_type == "climate":
-        features.extend([
-            float(result.get("maxTemperature", 0)),
-            float(result.get("avgTemperature", 0)),
-            float(result.get("centerTemp", 0)),
-        ])
-    elif task_type == "signal":
-        features.extend([
-            float(result.get("maxMagnitude", 0)),
-            float(result.get("fftSize", 0)),
-            float(result.get("numSamples", 0)),
-        ])
-    elif task_type == "drugscreen":
-        features.extend([
-            float(result.get("bindingAffinity", 0)),
-            float(result.get("interactionCount", 0)),
-            float(result.get("orientationsScanned", 0)),
-        ])
-    else:
-        return None
 
-    return features
+from config import CONTAMINATION, N_ESTIMATORS, STAT_BOUNDS_PATH
+from models.features import feature_matrix
+from models.model_registry import model_path_for, publish_model
+from models.stat_bounds import write_json
+from training.columnar_store import ColumnarStore
+from training.fetch_data import generate_synthetic_data
+from training.tune import tune_task_model, write_report
 
 
 def compute_stat_bounds(data: list[dict]) -> dict:
@@ -87,44 +63,19 @@ def compute_stat_bounds(data: list[dict]) -> dict:
             bounds[task_type][field] = {
                 "mean": float(arr.mean()),
                 "std": float(max(arr.std(), 0.001)),
+                "count": len(values),
             }
 
     return bounds
 
 
-def main():
-    data_path = os.path.join(os.path.dirname(__file__), "data.json")
-
-    if not os.path.exists(data_path):
-        print("No training data found. Run fetch_data.py first.")
-        print("Generating synthetic data for bootstrap training...")
-        # Run fetch_data which will generate synthetic if no Supabase data
-        from fetch_data import fetch_training_data, save_training_data
-        data = fetch_training_data()
-        if not data:
-            # Will be generated in fetch_data __main__
-            import subprocess
-            subprocess.run([sys.executable, os.path.join(os.path.dirname(__file__), "fetch_data.py")])
-
-    with open(data_path) as f:
-        data = json.load(f)
-
-    print(f"Loaded {len(data)} training samples")
-
-    # Extract features
-    features_list = []
-    valid_samples = []
-    for sample in data:
-        feats = extract_features(sample)
-        if feats:
-            features_list.append(feats)
-            valid_samples.append(sample)
-
-    if len(features_list) < 50:
-        print(f"Not enough valid samples ({len(features_list)}). Need at least 50.")
-        return
+def train_task_model(task_type: str, X: np.ndarray) -> IsolationForest | None:
+    """Train, evaluate and save the Isolation Forest for one task type."""
+    print(f"\n── {task_type} ──")
+    if len(X) < 50:
+        print(f"Not enough valid samples ({len(X)}). Need at least 50.")
+        return None
 
-    X = np.array(features_list)
     print(f"Feature matrix shape: {X.shape}")
 
     # Split for evaluation
@@ -132,7 +83,7 @@ def main():
 
     # Train Isolation Forest
     model = IsolationForest(
-        n_estimators=200,
+        n_estimators=N_ESTIMATORS,
         contamination=CONTAMINATION,
         random_state=42,
         n_jobs=-1,
@@ -146,30 +97,95 @@ def main():
     train_inlier_pct = (train_pred == 1).sum() / len(train_pred) * 100
     test_inlier_pct = (test_pred == 1).sum() / len(test_pred) * 100
 
-    print(f"\nTrain: {train_inlier_pct:.1f}% inliers, {100-train_inlier_pct:.1f}% outliers")
+    print(f"Train: {train_inlier_pct:.1f}% inliers, {100-train_inlier_pct:.1f}% outliers")
     print(f"Test:  {test_inlier_pct:.1f}% inliers, {100-test_inlier_pct:.1f}% outliers")
 
     # Decision function scores
     test_scores = model.decision_function(X_test)
-    print(f"\nDecision function — min: {test_scores.min():.3f}, max: {test_scores.max():.3f}, mean: {test_scores.mean():.3f}")
+    print(f"Decision function — min: {test_scores.min():.3f}, max: {test_scores.max():.3f}, mean: {test_scores.mean():.3f}")
+
+    # Save model (atomic rename, so a serving registry never sees a partial file)
+    model_path = model_path_for(task_type)
+    version = publish_model(model, model_path)
+    print(f"Model saved to {model_path} (version {version})")
+
+    return model
+
 
-    # Save model
-    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print(f"\nModel saved to {MODEL_PATH}")
+def load_json_data(data_path: str, task_type: str | None = None) -> tuple[dict, dict]:
+    """Feature matrices and stat bounds from a legacy data.json."""
+    with open(data_path) as f:
+        data = json.load(f)
+
+    print(f"Loaded {len(data)} training samples from {data_path}")
+
+    # Extract features per task type, one column at a time (same feature
+    # definitions the service scores with)
+    samples = pd.DataFrame(data, columns=["task_type", "result", "compute_time_ms"])
+    if task_type:
+        samples = samples[samples["task_type"] == task_type]
+
+    features_by_type: dict[str, np.ndarray] = {}
+    valid_samples = []
+    for name, group in samples.groupby("task_type", sort=True):
+        matrix = feature_matrix(name, group["result"].tolist(), group["compute_time_ms"])
+        if matrix is None or not len(matrix.rows):
+            continue
+        features_by_type[name] = matrix.X
+        valid_samples.extend(group.iloc[matrix.rows].to_dict("records"))
+
+    return features_by_type, compute_stat_bounds(valid_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train per-task-type Isolation Forest models")
+    parser.add_argument("--task-type", help="Only retrain this task type's model")
+    parser.add_argument(
+        "--tune", action="store_true",
+        help="Sweep forest size, max_samples and threshold precision (see training/tune.py)",
+    )
+    args = parser.parse_args()
+
+    data_path = os.path.join(os.path.dirname(__file__), "data.json")
+    store = ColumnarStore()
+
+    if store.rows() == 0 and os.path.exists(data_path):
+        features_by_type, bounds = load_json_data(data_path, args.task_type)
+    else:
+        if store.rows() == 0:
+            print("No training data found. Run fetch_data.py first.")
+            print("Generating synthetic data for bootstrap training...")
+            store.append(generate_synthetic_data())
+
+        print(f"Loaded {store.rows()} training samples from {store.root}")
+        task_types = [args.task_type] if args.task_type else store.task_types()
+        features_by_type = {t: store.features(t) for t in task_types if store.rows(t)}
+        bounds = store.stat_bounds(list(features_by_type))
+
+    if not features_by_type:
+        print("No valid samples to train on.")
+        return
+
+    if args.tune:
+        reports = {t: tune_task_model(t, X) for t, X in features_by_type.items()}
+        write_report({t: r for t, r in reports.items() if r is not None})
+    else:
+        for task_type, X in features_by_type.items():
+            train_task_model(task_type, X)
 
-    # Compute and print statistical bounds
-    bounds = compute_stat_bounds(valid_samples)
+    # Print statistical bounds
     print("\nStatistical bounds computed:")
     for task_type, fields in bounds.items():
         print(f"  {task_type}:")
         for field, stats in fields.items():
             print(f"    {field}: mean={stats['mean']:.2f}, std={stats['std']:.2f}")
 
-    # Save bounds
-    bounds_path = os.path.join(os.path.dirname(MODEL_PATH), "stat_bounds.json")
-    with open(bounds_path, "w") as f:
-        json.dump(bounds, f, indent=2)
+    # Save bounds (merged, so a single-type retrain keeps the other types)
+    bounds_path = STAT_BOUNDS_PATH
+    if args.task_type and os.path.exists(bounds_path):
+        with open(bounds_path) as f:
+            bounds = {**json.load(f), **bounds}
+    write_json(bounds_path, bounds)  # The service may be reading it: never expose a torn file
     print(f"\nBounds saved to {bounds_path}")
 
 
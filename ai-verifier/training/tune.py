@@ -0,0 +1,193 @@
+"""
+Latency-budgeted model tuning (python training/train.py --tune).
+
+Sweeps forest size (TUNE_N_ESTIMATORS), max_samples (TUNE_MAX_SAMPLES) and
+float32 vs float64 threshold storage in the compiled scorer. Every candidate
+is trained on the same 80% split and measured on the held-out 20%:
+
+    row_ms         median latency scoring one row (compiled scorer)
+    batch_ms       median latency scoring TUNE_BATCH_ROWS rows
+    model_kb       joblib artifact size
+    compiled_kb    node arrays each worker maps (MODEL_MMAP shares them)
+    score_peak_kb  peak memory allocated while scoring a batch
+    rss_kb         compiled_kb + score_peak_kb: resident memory the model
+                   adds to a worker, for sizing pods
+    agreement      share of held-out rows with the same inlier/outlier
+                   decision as the full model (N_ESTIMATORS trees,
+                   max_samples="auto", float64)
+
+The smallest candidate (by compiled_kb, then row_ms) meeting
+TUNE_MAX_ROW_LATENCY_MS, TUNE_MAX_BATCH_LATENCY_MS and TUNE_MIN_AGREEMENT is
+published. If none does, the full model is published. A float32 choice is
+recorded on the artifact, and the registry compiles it that way. The whole
+sweep is written to TUNE_REPORT_PATH.
+"""
+
+import io
+import json
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.model_selection import train_test_split
+
+from config import (
+    CONTAMINATION, N_ESTIMATORS, TUNE_N_ESTIMATORS, TUNE_MAX_SAMPLES,
+    TUNE_MAX_ROW_LATENCY_MS, TUNE_MAX_BATCH_LATENCY_MS, TUNE_BATCH_ROWS,
+    TUNE_MIN_AGREEMENT, TUNE_REPORT_PATH,
+)
+from models.compiled_forest import CompiledIsolationForest
+from models.model_registry import model_path_for, publish_model
+
+THRESHOLD_DTYPES = ("float64", "float32")
+ROW_REPEATS = 200
+BATCH_REPEATS = 30
+
+
+def tune_task_model(task_type: str, X: np.ndarray) -> dict[str, Any] | None:
+    """Sweep candidates for one task type and publish the smallest that meets the targets."""
+    print(f"\n── {task_type} (tuning) ──")
+    if len(X) < 50:
+        print(f"Not enough valid samples ({len(X)}). Need at least 50.")
+        return None
+
+    X = np.asarray(X)
+    X_train, X_test = train_test_split(X, test_size=0.2, random_state=42)
+    reference = _fit(X_train, N_ESTIMATORS, "auto")
+    expected = reference.predict(X_test)
+
+    candidates = []
+    for max_samples in sorted({min(n, len(X_train)) for n in TUNE_MAX_SAMPLES}):
+        for n_estimators in sorted(set(TUNE_N_ESTIMATORS)):
+            model = _fit(X_train, n_estimators, max_samples)
+            for dtype in THRESHOLD_DTYPES:
+                result = measure(model, X_test, expected, dtype)
+                result.update(n_estimators=n_estimators, max_samples=max_samples)
+                candidates.append((result, model))
+
+    passing = [(r, m) for r, m in candidates if _meets_targets(r)]
+    if passing:
+        best, model = min(passing, key=lambda c: (c[0]["compiled_kb"], c[0]["row_ms"]))
+    else:
+        print("No candidate met the targets; publishing the full model.")
+        best = measure(reference, X_test, expected, "float64")
+        best.update(n_estimators=N_ESTIMATORS, max_samples=int(reference.max_samples_))
+        model = reference
+
+    _print_table([r for r, _ in candidates], best)
+    model.compiled_threshold_dtype_ = best["threshold_dtype"]
+    version = publish_model(model, model_path_for(task_type))
+    print(
+        f"Published {best['n_estimators']} trees, max_samples={best['max_samples']}, "
+        f"{best['threshold_dtype']} thresholds (version {version})"
+    )
+    return {
+        "rows": len(X),
+        "selected": {**best, "version": version, "met_targets": bool(passing)},
+        "candidates": [r for r, _ in candidates],
+    }
+
+
+def measure(
+    model: IsolationForest,
+    X_test: np.ndarray,
+    expected: np.ndarray,
+    threshold_dtype: str,
+) -> dict[str, Any]:
+    """Latency, size, memory and agreement of one candidate as the service would score it."""
+    compiled = CompiledIsolationForest.from_sklearn(model, threshold_dtype=threshold_dtype)
+    batch = np.resize(X_test, (TUNE_BATCH_ROWS, X_test.shape[1]))
+    rows = [X_test[i:i + 1] for i in range(len(X_test))]
+
+    compiled.score(batch)  # Warm up
+    row_ms = _median_ms(lambda i: compiled.score(rows[i % len(rows)]), ROW_REPEATS)
+    batch_ms = _median_ms(lambda _: compiled.score(batch), BATCH_REPEATS)
+
+    tracemalloc.start()
+    compiled.score(batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    predictions = compiled.predict(X_test)
+    reference_outliers = expected == -1
+
+    return {
+        "threshold_dtype": threshold_dtype,
+        "row_ms": round(row_ms, 4),
+        "batch_ms": round(batch_ms, 4),
+        "model_kb": round(buffer.tell() / 1024, 1),
+        "compiled_kb": round(compiled.nbytes / 1024, 1),
+        "score_peak_kb": round(peak / 1024, 1),
+        "rss_kb": round((compiled.nbytes + peak) / 1024, 1),
+        "agreement": round(float((predictions == expected).mean()), 4),
+        "outlier_agreement": (
+            round(float((predictions[reference_outliers] == -1).mean()), 4)
+            if reference_outliers.any() else None
+        ),
+    }
+
+
+def write_report(reports: dict[str, Any], path: str = TUNE_REPORT_PATH):
+    """Write the sweep results with the targets they were selected against."""
+    report = {
+        "generated_at": time.time(),
+        "targets": {
+            "max_row_latency_ms": TUNE_MAX_ROW_LATENCY_MS,
+            "max_batch_latency_ms": TUNE_MAX_BATCH_LATENCY_MS,
+            "batch_rows": TUNE_BATCH_ROWS,
+            "min_agreement": TUNE_MIN_AGREEMENT,
+        },
+        # Linux reports ru_maxrss in KiB: the tuning process's high-water mark
+        "process_peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "tasks": reports,
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nTuning report saved to {path}")
+
+
+def _fit(X: np.ndarray, n_estimators: int, max_samples: int | str) -> IsolationForest:
+    return IsolationForest(
+        n_estimators=n_estimators,
+        max_samples=max_samples,
+        contamination=CONTAMINATION,
+        random_state=42,
+        n_jobs=-1,
+    ).fit(X)
+
+
+def _meets_targets(result: dict[str, Any]) -> bool:
+    return (
+        result["row_ms"] <= TUNE_MAX_ROW_LATENCY_MS
+        and result["batch_ms"] <= TUNE_MAX_BATCH_LATENCY_MS
+        and result["agreement"] >= TUNE_MIN_AGREEMENT
+    )
+
+
+def _median_ms(fn: Callable[[int], Any], repeats: int) -> float:
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def _print_table(results: list[dict[str, Any]], best: dict[str, Any]):
+    print(f"{'trees':>5} {'samples':>7} {'dtype':>7} {'row ms':>8} {'batch ms':>9} "
+          f"{'compiled kB':>11} {'rss kB':>8} {'agree':>6}")
+    for r in results:
+        marker = " *" if all(r[k] == best[k] for k in ("n_estimators", "max_samples", "threshold_dtype")) else ""
+        ok = "" if _meets_targets(r) else "  (misses targets)"
+        print(f"{r['n_estimators']:>5} {r['max_samples']:>7} {r['threshold_dtype']:>7} "
+              f"{r['row_ms']:>8.3f} {r['batch_ms']:>9.3f} {r['compiled_kb']:>11.1f} "
+              f"{r['rss_kb']:>8.1f} {r['agreement']:>6.3f}{ok}{marker}")